@@ -1,3 +1,7 @@
+import time
+# cold start report: the first run of the process includes the imports
+_SCRIPT_START = time.perf_counter()
+
 import logging
 
 import streamlit as st
@@ -5,11 +9,15 @@ from streamlit_extras.st_keyup import st_keyup
 
 from src.config_and_settings import (SessionKeys, 
                                      EMPTY_TEXT_PLACEHOLDER,
-                                     MODEL_ID_LOGREG, MODEL_ID_BERT,
+                                     MODEL_ID_LOGREG, MODEL_ID_AUTO, 
+                                     MODEL_ID_LLM,
                                      load_config)
 from src.model_loader import (load_sentiment_logreg_cached,
-                              load_sentiment_bert_cached, 
-                              load_llm_chatbot_cached)
+                              load_sentiment_auto_cached,
+                              load_model_registry_cached,
+                              load_explain_pool_cached,
+                              load_metrics_cached)
+from src.model_registry import ModelRegistry
 from src.sentiment_analysis import analyze_text_sentiment
 from src.ui_components import (
     configure_page, 
@@ -18,12 +26,16 @@ from src.ui_components import (
     display_chat_history,
     display_sentiment_model_selector
 )
-from src.app_state import initialize_session_state
+from src.app_state import initialize_session_state, get_draft_scorer
+from src.metrics import METRICS
+from src.async_explain import DraftExplanation
 from src.chat_logic import (process_user_send_action, 
                             handle_bot_response_generation)
 
 from src.models.logreg_classifier import LogRegClassifier
 
+_IMPORTS_END = time.perf_counter()
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -32,16 +44,18 @@ logging.basicConfig(
 
 
 # -- UI Column Rendering --
+@st.fragment
 def render_left_column(sentiment_model: LogRegClassifier) -> None:
-    """Renders the left UI column (user input, sentiment analysis)."""
+    """Renders the left UI column (user input, sentiment analysis).
+    A fragment: keystrokes rerun only this column, not the chat."""
     
     bot_is_typing_now = st.session_state.get(SessionKeys.BOT_IS_TYPING, False)
     current_draft_from_state = \
         st.session_state.get(SessionKeys.USER_DRAFT_INPUT, "")
 
     text_for_analysis = st.session_state.get(SessionKeys.USER_DRAFT_INPUT, "")
-    draft_sentiment_score = analyze_text_sentiment(text_for_analysis, 
-                                                   sentiment_model)
+    draft_sentiment_score = analyze_text_sentiment(
+        text_for_analysis, sentiment_model, get_draft_scorer(sentiment_model))
 
     display_current_input_sentiment_analysis(draft_sentiment_score, 
                                              text_for_analysis, 
@@ -74,9 +88,19 @@ def render_left_column(sentiment_model: LogRegClassifier) -> None:
 
 
 def render_right_column(sentiment_model: LogRegClassifier, 
-                        llm_chatbot) -> None:
+                        llm_chatbot,
+                        model_registry: ModelRegistry) -> None:
     """Renders the right UI column (chat history, bot response)."""
     st.caption("Модель учитывает тональность вашего сообщения при ответе.")
+    llm_status = model_registry.status(MODEL_ID_LLM)
+    llm_detail = model_registry.detail(MODEL_ID_LLM)
+    if llm_status == ModelRegistry.LOADING:
+        st.caption(f"⏳ ИИ-модель загружается"
+                   f"{f' ({llm_detail})' if llm_detail else ''}, "
+                   f"ответ начнётся после загрузки.")
+    elif llm_status == ModelRegistry.FAILED:
+        st.error(f"ИИ-модель не загружена"
+                 f"{f': {llm_detail}' if llm_detail else ''}")
 
     chat_display_area = st.container(height=500, border=False)
     with chat_display_area:
@@ -90,7 +114,16 @@ def render_right_column(sentiment_model: LogRegClassifier,
             st.session_state.get(SessionKeys.BOT_IS_TYPING, False)
 
         if user_has_sent_message and bot_should_be_typing:
-            handle_bot_response_generation(sentiment_model, llm_chatbot)
+            if llm_chatbot is None:
+                with st.spinner("Загрузка ИИ-модели..."):
+                    llm_chatbot = model_registry.get(MODEL_ID_LLM, 
+                                                     timeout=None)
+                st.session_state[SessionKeys.LLM_CHATBOT] = llm_chatbot
+
+            if llm_chatbot is not None:
+                handle_bot_response_generation(sentiment_model, llm_chatbot)
+            else:
+                st.error("Не удалось загрузить LLM чат-бота")
 
             st.session_state[SessionKeys.USER_DATA_FOR_BOT] = None
             st.session_state[SessionKeys.BOT_IS_TYPING] = False
@@ -108,22 +141,27 @@ def main_app() -> None:
         st.error("Ошибка загрузки данных")
         return
 
-    if not st.session_state.get(SessionKeys.MODELS_LOADED, False):
-        st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_LOGREG] = \
-            load_sentiment_logreg_cached(app_config)
-        st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_BERT] = \
-            load_sentiment_bert_cached(app_config)
-        st.session_state[SessionKeys.LLM_CHATBOT] = \
-            load_llm_chatbot_cached(app_config)
-
-        if (st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_LOGREG] 
-            and st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_BERT]
-            and st.session_state[SessionKeys.LLM_CHATBOT]):
+    load_metrics_cached(app_config)
+    # starts BERT and the LLM in background threads on the first run
+    model_registry = load_model_registry_cached(app_config)
+    model_registry.record("imports", _SCRIPT_START, _IMPORTS_END)
 
+    # only LogReg is needed for the first page
+    if not st.session_state.get(SessionKeys.MODELS_LOADED, False):
+        logreg_start = time.perf_counter()
+        logreg_model = load_sentiment_logreg_cached(app_config)
+        model_registry.record(f"load {MODEL_ID_LOGREG}", 
+                              logreg_start, 
+                              time.perf_counter())
+
+        if logreg_model:
+            st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_LOGREG] = \
+                logreg_model
+            st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_AUTO] = \
+                load_sentiment_auto_cached(app_config)
             st.session_state[SessionKeys.SELECTED_SENTIMENT_MODEL] = \
-                st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_LOGREG]
+                logreg_model
             st.session_state[SessionKeys.MODELS_LOADED] = True
-            st.rerun()
 
         else:
             err = "Модели не загружены, приложение остановлено"
@@ -131,17 +169,29 @@ def main_app() -> None:
             logging.error(err)
             st.stop()
 
+    if st.session_state[SessionKeys.LLM_CHATBOT] is None:
+        st.session_state[SessionKeys.LLM_CHATBOT] = \
+            model_registry.get(MODEL_ID_LLM)
+
+    if st.session_state[SessionKeys.DRAFT_EXPLANATION] is None:
+        st.session_state[SessionKeys.DRAFT_EXPLANATION] = \
+            DraftExplanation(load_explain_pool_cached(app_config))
+
     sentiment_model = st.session_state.get(SessionKeys.SELECTED_SENTIMENT_MODEL)
     llm_chatbot = st.session_state.get(SessionKeys.LLM_CHATBOT)
 
     left_column, right_column = st.columns([2, 3])
 
     with left_column:
-        display_sentiment_model_selector()
+        display_sentiment_model_selector(model_registry)
         render_left_column(sentiment_model)
 
     with right_column:
-        render_right_column(sentiment_model, llm_chatbot)
+        render_right_column(sentiment_model, llm_chatbot, model_registry)
+
+    model_registry.record("first_render", _SCRIPT_START, time.perf_counter())
 
 if __name__ == "__main__":
-    main_app()
+    # the whole script run, including reruns cut short by st.rerun()
+    with METRICS.timer("rerun"):
+        main_app()
@@ -0,0 +1,95 @@
+"""Attribution benchmark for BertClassifier explain modes.
+
+Times SHAP, gradient x input and integrated gradients on short chat
+messages and measures how well the gradient modes agree with SHAP on
+word ranking (Spearman correlation and top-1 word match).
+
+    python -m benchmarks.bert_attribution --model-dir ./models/rubert_tiny/
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.models.bert_classifier import BertClassifier
+from src.models.word_segments import word_spans
+from src.preprocessors.bert_preprocessor import BertPreprocessor
+from benchmarks.bert_padding import make_chat_messages
+
+
+def shap_to_words(text: str,
+                  shap_scores: List[Tuple[str, float]]
+                  ) -> Optional[np.ndarray]:
+    """Sums SHAP token scores into the words of split_words, or None if
+    the tokens do not line up with the text."""
+    spans = word_spans(text)
+    scores = np.zeros(len(spans))
+    position = 0
+    for token, score in shap_scores:
+        start = text.find(token.strip(), position) if token.strip() else -1
+        if start < 0:
+            continue
+        position = start + len(token.strip())
+        for i, (word_start, word_end) in enumerate(spans):
+            if word_start <= start < word_end:
+                scores[i] += score
+                break
+    return scores if position else None
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return float('nan')
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", default="./models/rubert_tiny/")
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--ig-steps", type=int, default=8)
+    args = parser.parse_args()
+
+    texts = make_chat_messages(args.messages, 3, 12)
+    modes = [BertClassifier.EXPLAIN_MODE_SHAP,
+             BertClassifier.EXPLAIN_MODE_GRADIENT,
+             BertClassifier.EXPLAIN_MODE_INTEGRATED_GRADIENTS]
+
+    results = {}
+    print(f"{'mode':<24}{'median ms':>10}{'spearman':>10}{'top-1':>8}")
+    for mode in modes:
+        classifier = BertClassifier(preprocessor=BertPreprocessor(),
+                                    model_dir=args.model_dir,
+                                    explain_mode=mode,
+                                    ig_steps=args.ig_steps)
+        if not classifier.is_ready:
+            raise SystemExit(f"Модель не загружена: {args.model_dir}")
+        classifier.explain_shap_text(texts[0])  # warm-up
+
+        timings, word_scores = [], []
+        for text in texts:
+            start = time.perf_counter()
+            explanation = classifier.explain_shap_text(text)
+            timings.append((time.perf_counter() - start) * 1000)
+            if mode == BertClassifier.EXPLAIN_MODE_SHAP:
+                word_scores.append(shap_to_words(text, explanation))
+            else:
+                word_scores.append(np.array([s for _, s in explanation]))
+        results[mode] = word_scores
+
+        correlations, top1 = [], []
+        for reference, scores in zip(results[modes[0]], word_scores):
+            if reference is None or len(reference) != len(scores):
+                continue
+            correlations.append(spearman(reference, scores))
+            top1.append(np.argmax(np.abs(reference))
+                        == np.argmax(np.abs(scores)))
+        print(f"{mode:<24}{np.median(timings):>10.1f}"
+              f"{np.nanmean(correlations):>10.2f}{np.mean(top1):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Parity check of the ONNX Runtime BERT backend against PyTorch.
+
+Scores the same texts with both backends and reports the largest
+probability difference, label agreement, accuracy (with a labelled CSV)
+and latency. Exits with code 1 if the difference exceeds --tolerance,
+so it can gate a deployment that switches `bert_backend` to "onnx".
+
+    python -m benchmarks.bert_onnx_parity --model-dir ./models/rubert_tiny/
+    python -m benchmarks.bert_onnx_parity --labelled data.csv --fp32
+"""
+import argparse
+import csv
+from typing import List, Optional
+
+import numpy as np
+
+from src.models.bert_classifier import BertClassifier
+from src.preprocessors.bert_preprocessor import BertPreprocessor
+from benchmarks.bert_padding import make_chat_messages, time_call
+
+
+def read_labelled(path: str) -> tuple[List[str], List[int]]:
+    """CSV with `text` and `label` (0 - negative, 1 - positive) columns."""
+    texts, labels = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            texts.append(row['text'])
+            labels.append(int(row['label']))
+    return texts, labels
+
+
+def accuracy(probas: np.ndarray, labels: Optional[List[int]]) -> str:
+    if labels is None:
+        return "-"
+    return f"{(probas.argmax(axis=1) == np.array(labels)).mean():.4f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", default="./models/rubert_tiny/")
+    parser.add_argument("--labelled", default=None,
+                        help="CSV with text,label columns")
+    parser.add_argument("--fp32", action="store_true",
+                        help="check the non-quantized export")
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.labelled:
+        texts, labels = read_labelled(args.labelled)
+    else:
+        texts, labels = make_chat_messages(500, 1, 30), None
+
+    torch_clf = BertClassifier(preprocessor=BertPreprocessor(),
+                               model_dir=args.model_dir,
+                               backend='torch')
+    onnx_clf = BertClassifier(preprocessor=BertPreprocessor(),
+                              model_dir=args.model_dir,
+                              backend='onnx',
+                              onnx_quantize=not args.fp32)
+    if not (torch_clf.is_ready and onnx_clf.is_ready):
+        raise SystemExit(f"Модель не загружена: {args.model_dir}")
+
+    torch_probas = torch_clf._predict_proba_batch(texts)
+    onnx_probas = onnx_clf._predict_proba_batch(texts)
+    diff = np.abs(torch_probas - onnx_probas)[:, 1]
+    agreement = (torch_probas.argmax(axis=1)
+                 == onnx_probas.argmax(axis=1)).mean()
+
+    print(f"texts: {len(texts)}, onnx: "
+          f"{'fp32' if args.fp32 else 'int8'}")
+    print(f"max |Δp|: {diff.max():.4f}, mean |Δp|: {diff.mean():.4f}, "
+          f"label agreement: {agreement:.4f}")
+    print(f"accuracy torch: {accuracy(torch_probas, labels)}, "
+          f"onnx: {accuracy(onnx_probas, labels)}")
+
+    draft = texts[:1]
+    batch = texts[:32]
+    for name, clf in (("torch", torch_clf), ("onnx", onnx_clf)):
+        single_ms = time_call(lambda: clf._predict_proba_batch(draft),
+                              args.repeats)
+        batch_ms = time_call(lambda: clf._predict_proba_batch(batch),
+                             args.repeats)
+        print(f"{name:<6} single: {single_ms:7.2f} ms   "
+              f"batch 32: {batch_ms:7.2f} ms")
+
+    if diff.max() > args.tolerance:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
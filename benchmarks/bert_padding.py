@@ -0,0 +1,89 @@
+"""Padding benchmark for BertClassifier._predict_proba_batch.
+
+Compares the old fixed padding to max_length with dynamic padding and
+length bucketing on short chat messages, for a single draft and for a
+SHAP-sized batch of masked samples.
+
+    python -m benchmarks.bert_padding --model-dir ./models/rubert_tiny/
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from src.models.bert_classifier import BertClassifier
+from src.preprocessors.bert_preprocessor import BertPreprocessor
+
+CHAT_WORDS = (
+    "привет как дела сегодня хороший день отлично плохо устал работа "
+    "люблю тебя спасибо круто ужасно грустно весело погода дом кот "
+    "вечер утро встреча друзья фильм музыка скучно рад жаль"
+).split()
+
+MODES = {
+    "max_length (old)": dict(padding='max_length', bucket_size=0),
+    "longest": dict(padding='longest', bucket_size=0),
+    "longest + buckets": dict(padding='longest', bucket_size=32),
+}
+
+
+def make_chat_messages(n: int, min_words: int, max_words: int,
+                       seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(CHAT_WORDS,
+                                 k=rng.randint(min_words, max_words)))
+            for _ in range(n)]
+
+
+def time_call(fn: Callable[[], object], repeats: int) -> float:
+    """Median wall time of fn in milliseconds."""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", default="./models/rubert_tiny/")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    classifier = BertClassifier(preprocessor=BertPreprocessor(),
+                                model_dir=args.model_dir)
+    if not classifier.is_ready:
+        raise SystemExit(f"Модель не загружена: {args.model_dir}")
+
+    workloads = {
+        "draft, 3 words": make_chat_messages(1, 3, 3),
+        "batch 30, 2-8 words": make_chat_messages(30, 2, 8, seed=1),
+        "batch 256, 1-40 words": make_chat_messages(256, 1, 40, seed=2),
+    }
+
+    reference = {}
+    print(f"{'workload':<24}{'mode':<20}{'ms':>10}{'speedup':>10}")
+    for workload, texts in workloads.items():
+        baseline_ms = None
+        for mode, settings in MODES.items():
+            classifier.padding = settings['padding']
+            classifier.bucket_size = settings['bucket_size']
+
+            probas = classifier._predict_proba_batch(texts)
+            reference.setdefault(workload, probas)
+            max_diff = np.abs(probas - reference[workload]).max()
+
+            ms = time_call(lambda: classifier._predict_proba_batch(texts),
+                           args.repeats)
+            baseline_ms = baseline_ms or ms
+            print(f"{workload:<24}{mode:<20}{ms:>10.2f}"
+                  f"{baseline_ms / ms:>9.1f}x"
+                  f"   max |Δp| {max_diff:.1e}")
+
+
+if __name__ == "__main__":
+    main()
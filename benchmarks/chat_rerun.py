@@ -0,0 +1,83 @@
+"""Per-keystroke rerun time against the chat history length.
+
+Renders the draft panel and the chat history with the app's own UI
+functions (Streamlit bare mode, so every element is built and
+serialized but not sent) and prints the median time of:
+
+- "full, cold": a whole-app rerun with annotations rebuilt for every
+  message, which is what every keystroke cost before the draft panel
+  became a fragment;
+- "full, cached": a whole-app rerun (send, model switch) with the
+  per-message annotation HTML cached;
+- "keystroke": the draft panel fragment alone.
+
+    python -m benchmarks.chat_rerun --config config.yaml \\
+        --history 0 10 50 200
+"""
+import argparse
+import logging
+
+import streamlit as st
+
+from src.model_factory import read_config, build_logreg_classifier
+from src.sentiment_analysis import (analyze_text_sentiment,
+                                    display_shap_annotated_text,
+                                    shap_annotated_html)
+from src.ui_components import display_chat_history
+from benchmarks.hot_path import make_chat_history, measure
+
+
+def with_annotations(history, sentiment_model):
+    for message in history:
+        message["shap_scores"] = sentiment_model.explain_shap_text(
+            message["content"])
+        message.setdefault("sentiment_label", "😐 Нейтральная")
+        message.setdefault("sentiment_score", 0.0)
+    return history
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--history", type=int, nargs="+",
+                        default=[0, 10, 50, 200])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    sentiment_model = build_logreg_classifier(read_config(args.config))
+    keystrokes = iter(range(10**9))
+
+    def draft_panel():
+        # a new character each time, as typed
+        draft = f"Сегодня отличный день, правда {next(keystrokes)}"
+        score = analyze_text_sentiment(draft, sentiment_model)
+        st.metric(label="Тональность", value="", delta=f"{score:.2f}")
+        display_shap_annotated_text(
+            sentiment_model.explain_shap_text(draft))
+
+    print(f"{'messages':>9}{'full, cold ms':>16}{'full, cached ms':>18}"
+          f"{'keystroke ms':>15}")
+    for n_messages in args.history:
+        history = with_annotations(make_chat_history(n_messages),
+                                   sentiment_model)
+
+        def full_cold():
+            shap_annotated_html.cache_clear()
+            draft_panel()
+            display_chat_history(history)
+
+        def full_cached():
+            draft_panel()
+            display_chat_history(history)
+
+        cold = measure(full_cold, args.repeats)["median_ms"]
+        cached = measure(full_cached, args.repeats)["median_ms"]
+        keystroke = measure(draft_panel, args.repeats)["median_ms"]
+        print(f"{n_messages:>9}{cold:>16.1f}{cached:>18.1f}"
+              f"{keystroke:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Per-keystroke LogReg scoring of the draft: full vs incremental.
+
+Types chat messages of several lengths character by character, with an
+occasional backspace, and prints the mean and p95 time per keystroke of
+a full `LogRegClassifier` prediction (preprocessing and vectorizing the
+whole draft, no cache) and of `IncrementalDraftScorer`, plus how many
+keystrokes scored differently (it must be 0).
+
+    python -m benchmarks.draft_scoring --config config.yaml \\
+        --words 10 50 200
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from src.model_factory import read_config, build_logreg_classifier
+from src.models.incremental_tfidf import IncrementalDraftScorer
+from benchmarks.hot_path import make_chat_corpus
+
+
+def keystrokes(text: str, seed: int) -> List[str]:
+    """Successive drafts while `text` is typed, 1 in 20 keys a backspace."""
+    rng = random.Random(seed)
+    drafts, draft = [], ""
+    for char in text:
+        if draft and rng.random() < 0.05:
+            draft = draft[:-1]
+            drafts.append(draft)
+        draft += char
+        drafts.append(draft)
+    return drafts
+
+
+def timed(score: Callable[[str], float], drafts: List[str]) -> tuple:
+    scores, latency = [], []
+    for draft in drafts:
+        start = time.perf_counter()
+        scores.append(score(draft))
+        latency.append((time.perf_counter() - start) * 1000)
+    return scores, np.array(latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--words", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--messages", type=int, default=5)
+    args = parser.parse_args()
+
+    # no prediction cache: every draft is really scored
+    classifier = build_logreg_classifier(read_config(args.config))
+    scorer = IncrementalDraftScorer.from_classifier(classifier)
+    if scorer is None:
+        raise SystemExit("Модель не поддерживает инкрементальную оценку")
+
+    def full(draft: str) -> float:
+        return classifier._predict(draft) if draft.strip() else 0.0
+
+    print(f"{'words':>6}{'keys':>7}  {'scorer':<12}{'mean ms':>9}"
+          f"{'p95 ms':>9}{'mismatches':>12}")
+    for n_words in args.words:
+        messages = make_chat_corpus(args.messages, n_words, n_words,
+                                    seed=n_words)
+        drafts = [draft for i, message in enumerate(messages)
+                  for draft in keystrokes(message, seed=i)]
+        full_scores, full_ms = timed(full, drafts)
+        scorer.reset()
+        incremental_scores, incremental_ms = timed(scorer.score, drafts)
+        mismatches = sum(a != b for a, b in zip(full_scores,
+                                                 incremental_scores))
+        for name, latency, diff in (("full", full_ms, ""),
+                                    ("incremental", incremental_ms,
+                                     mismatches)):
+            print(f"{n_words:>6}{len(drafts):>7}  {name:<12}"
+                  f"{latency.mean():>9.3f}{np.percentile(latency, 95):>9.3f}"
+                  f"{diff:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Resilience scenarios for the Gemini transport against the local stub.
+
+Sends sequential requests through GeminiChatbot to StubGeminiServer
+under healthy, flaky, stalling and failing backends, and prints how
+many replies came from Gemini, from the fallback and as errors, the
+reply latency and the circuit state.
+
+    python -m benchmarks.gemini_resilience --requests 20
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from src.models.gemini_handler import GeminiChatbot
+from benchmarks.gemini_stub_server import StubGeminiServer, STUB_REPLY
+
+SCENARIOS = {
+    "healthy": dict(),
+    "flaky 30% 503": dict(error_rate=0.3),
+    "stalls 20%, no hedge": dict(stall_rate=0.2),
+    "stalls 20%, hedge": dict(stall_rate=0.2, hedge=True),
+    "down, failover": dict(error_rate=1.0),
+}
+
+FALLBACK_REPLY = "ответ локальной модели"
+
+
+class LocalStandIn:
+    is_ready = True
+
+    def generate_response(self, *args, **kwargs):
+        yield FALLBACK_REPLY
+
+
+def run_scenario(settings: dict, args: argparse.Namespace) -> None:
+    stub = StubGeminiServer(first_chunk_delay_s=args.first_chunk_delay,
+                            error_rate=settings.get("error_rate", 0.0),
+                            stall_rate=settings.get("stall_rate", 0.0),
+                            stall_s=args.first_chunk_timeout * 3,
+                            seed=args.seed).start()
+    chatbot = GeminiChatbot(
+        api_key="stub",
+        model_name="gemini-2.0-flash-lite",
+        history_compaction=False,
+        request_timeout_s=args.first_chunk_timeout * 4,
+        first_chunk_timeout_s=args.first_chunk_timeout,
+        hedge_after_s=(args.first_chunk_delay * 3
+                       if settings.get("hedge") else 0),
+        breaker_failure_threshold=3,
+        fallback_factory=LocalStandIn,
+        base_url=stub.base_url
+    )
+
+    latencies, outcomes = [], {"gemini": 0, "fallback": 0, "error": 0}
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        reply = "".join(chatbot.generate_response("привет", "😐", 0.0, []))
+        latencies.append((time.perf_counter() - start) * 1000)
+        if reply == STUB_REPLY:
+            outcomes["gemini"] += 1
+        elif reply == FALLBACK_REPLY:
+            outcomes["fallback"] += 1
+        else:
+            outcomes["error"] += 1
+    stub.stop()
+
+    print(f"{outcomes['gemini']:>8}{outcomes['fallback']:>10}"
+          f"{outcomes['error']:>7}{np.median(latencies):>10.0f}"
+          f"{np.percentile(latencies, 95):>10.0f}"
+          f"{stub.counts['requests']:>10}  {chatbot.breaker.state}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.05)
+    parser.add_argument("--first-chunk-timeout", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # failures are the point here, keep the table readable
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{'scenario':<24}{'gemini':>8}{'fallback':>10}{'error':>7}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'upstream':>10}  circuit")
+    for name, settings in SCENARIOS.items():
+        print(f"{name:<24}", end="", flush=True)
+        run_scenario(settings, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Local stub of the Gemini REST API with configurable latency and errors.
+
+Serves `...:streamGenerateContent?alt=sse` and `...:generateContent` in
+the wire format google-genai expects, so GeminiChatbot can be pointed at
+it with `base_url` in config.yaml. Each request may fail with an HTTP
+error or stall before its first chunk, with the given probabilities.
+
+    python -m benchmarks.gemini_stub_server --port 8765 \\
+        --first-chunk-delay 0.3 --error-rate 0.2 --stall-rate 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+STUB_REPLY = "Привет! Это ответ тестового сервера, всё работает как надо."
+
+
+class StubGeminiServer:
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 first_chunk_delay_s: float = 0.1,
+                 chunk_delay_s: float = 0.02,
+                 n_chunks: int = 5,
+                 error_rate: float = 0.0,
+                 error_status: int = 503,
+                 stall_rate: float = 0.0,
+                 stall_s: float = 30.0,
+                 seed: int = 0) -> None:
+        self.first_chunk_delay_s = first_chunk_delay_s
+        self.chunk_delay_s = chunk_delay_s
+        self.n_chunks = max(n_chunks, 1)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"requests": 0, "errors": 0,
+                                       "stalls": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubGeminiServer":
+        threading.Thread(target=self._server.serve_forever,
+                         name="gemini-stub",
+                         daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _draw(self) -> str:
+        with self._lock:
+            self.counts["requests"] += 1
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                self.counts["errors"] += 1
+                return "error"
+            if roll < self.error_rate + self.stall_rate:
+                self.counts["stalls"] += 1
+                return "stall"
+            return "ok"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                outcome = stub._draw()
+
+                if outcome == "error":
+                    body = json.dumps({"error": {
+                        "code": stub.error_status,
+                        "message": "stub error",
+                        "status": "UNAVAILABLE"}}).encode("utf-8")
+                    self.send_response(stub.error_status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                time.sleep(stub.stall_s if outcome == "stall"
+                           else stub.first_chunk_delay_s)
+                if ":streamGenerateContent" in self.path:
+                    self._stream()
+                else:
+                    self._send_json(_response(STUB_REPLY))
+
+            def _stream(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = STUB_REPLY.split(" ")
+                step = -(-len(words) // stub.n_chunks)
+                try:
+                    for i in range(0, len(words), step):
+                        if i:
+                            time.sleep(stub.chunk_delay_s)
+                        text = " ".join(words[i:i + step])
+                        event = (f"data: {json.dumps(_response(text if i == 0 else ' ' + text))}"
+                                 f"\r\n\r\n").encode("utf-8")
+                        self.wfile.write(f"{len(event):x}\r\n".encode()
+                                         + event + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (timeout or lost hedge)
+
+            def _send_json(self, payload: dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        return Handler
+
+
+def _response(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model",
+                                        "parts": [{"text": text}]}}]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.1)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=30.0)
+    args = parser.parse_args()
+
+    stub = StubGeminiServer(host=args.host,
+                            port=args.port,
+                            first_chunk_delay_s=args.first_chunk_delay,
+                            chunk_delay_s=args.chunk_delay,
+                            error_rate=args.error_rate,
+                            error_status=args.error_status,
+                            stall_rate=args.stall_rate,
+                            stall_s=args.stall).start()
+    print(f"Stub Gemini API: {stub.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Hot path benchmark: preprocess -> predict -> explain -> prompt.
+
+Times every stage of a chat turn separately, for both sentiment models,
+on synthetic Russian chat corpora of short, medium and long messages,
+for a single message and for a batch. Runs offline against the models
+from config.yaml and writes the timings to a JSON file. With --compare
+the new timings are checked against a stored baseline, and the exit
+code is 1 if any case got slower than the threshold.
+
+    python -m benchmarks.hot_path --output bench.json
+    python -m benchmarks.hot_path --compare bench_baseline.json
+    python -m benchmarks.hot_path --compare bench_baseline.json \\
+        --results bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.model_factory import (read_config,
+                               build_logreg_classifier,
+                               build_bert_classifier)
+from benchmarks.bert_padding import CHAT_WORDS
+
+CHAT_NOISE = ["))", "(((", ":)", ":-D", "xD", "!!!", "???", "@friend",
+              "https://t.co/abc", "\U0001F600", "ОЧЕНЬ", "ёлка"]
+
+CORPORA = {
+    "short": (1, 5),
+    "medium": (6, 20),
+    "long": (21, 60),
+}
+
+Results = Dict[str, Dict[str, float]]
+
+
+def make_chat_corpus(n: int, min_words: int, max_words: int,
+                     seed: int = 0) -> List[str]:
+    """Chat messages with the smileys, mentions and links the
+    preprocessors have to strip."""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        words = rng.choices(CHAT_WORDS, k=rng.randint(min_words, max_words))
+        for _ in range(len(words) // 4):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(CHAT_NOISE))
+        messages.append(" ".join(words))
+    return messages
+
+
+def make_chat_history(n_turns: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    history = []
+    for turn, text in enumerate(make_chat_corpus(n_turns, 3, 20, seed)):
+        if turn % 2 == 0:
+            history.append({"role": "user", "content": text,
+                            "sentiment_label": "Positive",
+                            "sentiment_score": rng.uniform(-1, 1)})
+        else:
+            history.append({"role": "assistant", "content": text})
+    return history
+
+
+def measure(fn: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """Median and p90 wall time of fn in milliseconds."""
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": float(np.median(timings)),
+            "p90_ms": float(np.percentile(timings, 90)),
+            "repeats": repeats}
+
+
+def bench_sentiment_model(name: str,
+                          model,
+                          predict_batch: Callable[[List[str]], object],
+                          args: argparse.Namespace,
+                          results: Results) -> None:
+    for corpus, (min_words, max_words) in CORPORA.items():
+        texts = make_chat_corpus(args.batch_size, min_words, max_words,
+                                 seed=len(results))
+        single = texts[:1]
+        cases = {
+            f"{name}/preprocess/single/{corpus}":
+                (lambda: model.preprocessor.preprocess(single[0]),
+                 args.repeats),
+            f"{name}/preprocess/batch/{corpus}":
+                (lambda: model.preprocessor.preprocess_batch(texts),
+                 args.repeats),
+            f"{name}/predict/single/{corpus}":
+                (lambda: predict_batch(single), args.repeats),
+            f"{name}/predict/batch/{corpus}":
+                (lambda: predict_batch(texts), args.repeats),
+            f"{name}/explain/single/{corpus}":
+                (lambda: model.explain_shap_text(single[0]),
+                 args.explain_repeats),
+        }
+        for case, (fn, repeats) in cases.items():
+            results[case] = measure(fn, repeats)
+            print_case(case, results[case])
+
+
+def bench_prompt(args: argparse.Namespace, results: Results) -> None:
+    try:
+        from src.models.llm_cpu_handler import LLMCPUChatbot
+        from src.models.llm_context import ContextWindow
+    except ImportError as e:
+        print(f"prompt: пропущено ({e})")
+        return
+
+    # the prompt is built without the model, do not load it; a byte-level
+    # stand-in tokenizer keeps the context window in the measured path
+    chatbot = LLMCPUChatbot.__new__(LLMCPUChatbot)
+    chatbot.context_window = ContextWindow(
+        tokenize=lambda text: list(text.encode("utf-8")),
+        detokenize=lambda tokens: bytes(tokens).decode("utf-8",
+                                                       errors="ignore")
+    )
+    message = make_chat_corpus(1, 6, 20, seed=7)[0]
+    for n_turns in (0, 10, 40, 200):
+        history = make_chat_history(n_turns, seed=n_turns)
+        case = f"prompt/format/history_{n_turns}"
+        results[case] = measure(
+            lambda: chatbot._format_prompt(message, "Positive", 0.42,
+                                           history,
+                                           LLMCPUChatbot.DEFAULT_SYSTEM_PROMPT_EN),
+            args.repeats
+        )
+        print_case(case, results[case])
+
+
+def print_case(case: str, timing: Dict[str, float]) -> None:
+    print(f"{case:<40}{timing['median_ms']:>12.3f}{timing['p90_ms']:>12.3f}")
+
+
+def run_benchmarks(args: argparse.Namespace) -> Results:
+    app_config = read_config(args.config)
+    results: Results = {}
+    print(f"{'case':<40}{'median ms':>12}{'p90 ms':>12}")
+
+    if "logreg" in args.stages:
+        logreg = build_logreg_classifier(app_config)
+        if logreg.is_ready:
+            bench_sentiment_model("logreg", logreg, logreg.predict_batch,
+                                  args, results)
+        else:
+            print("logreg: модель не загружена, пропущено")
+
+    if "bert" in args.stages:
+        bert = build_bert_classifier(app_config, micro_batching=False)
+        if bert.is_ready:
+            bench_sentiment_model("bert", bert, bert._predict_proba_batch,
+                                  args, results)
+        else:
+            print("bert: модель не загружена, пропущено")
+
+    if "prompt" in args.stages:
+        bench_prompt(args, results)
+
+    return results
+
+
+def environment() -> Dict[str, str]:
+    env = {"python": platform.python_version(),
+           "platform": platform.platform(),
+           "timestamp": datetime.now().isoformat(timespec="seconds")}
+    for module in ("numpy", "sklearn", "torch", "transformers"):
+        if module in sys.modules:
+            env[module] = getattr(sys.modules[module], "__version__", "")
+    return env
+
+
+def compare(baseline: Results,
+            results: Results,
+            threshold: float,
+            min_delta_ms: float) -> List[str]:
+    """Prints the change of every case and returns the regressed ones.
+
+    A case regresses if its median grew by more than `threshold` (relative)
+    and by more than `min_delta_ms`, so sub-microsecond noise is ignored.
+    """
+    regressions = []
+    print(f"{'case':<40}{'base ms':>12}{'new ms':>12}{'change':>10}")
+    for case in sorted(set(baseline) | set(results)):
+        if case not in results or case not in baseline:
+            status = "missing" if case not in results else "new"
+            print(f"{case:<40}{status:>34}")
+            continue
+        base_ms = baseline[case]["median_ms"]
+        new_ms = results[case]["median_ms"]
+        change = new_ms / base_ms - 1 if base_ms else 0.0
+        regressed = change > threshold and new_ms - base_ms > min_delta_ms
+        if regressed:
+            regressions.append(case)
+        print(f"{case:<40}{base_ms:>12.3f}{new_ms:>12.3f}{change:>+10.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def load_results(path: str) -> Results:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["results"]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--stages", default="logreg,bert,prompt",
+                        help="comma-separated: logreg, bert, prompt")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--explain-repeats", type=int, default=5)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="baseline results to check for regressions")
+    parser.add_argument("--results", default=None,
+                        help="compare this results file instead of "
+                             "running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed relative slowdown of the median")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    args.stages = set(args.stages.split(","))
+
+    if args.results:
+        results = load_results(args.results)
+    else:
+        results = run_benchmarks(args)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"environment": environment(), "results": results},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены: {args.output}")
+
+    if args.compare:
+        print()
+        regressions = compare(load_results(args.compare), results,
+                              args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"Регрессии: {len(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
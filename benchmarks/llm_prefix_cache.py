@@ -0,0 +1,91 @@
+"""Time-to-first-token benchmark for the LLMCPUChatbot prompt cache.
+
+Plays several synthetic conversations that take turns on one model, as
+sessions of the app do, and prints time to first token per turn with
+and without the per-conversation prompt cache. With the cache it should
+stay flat as the history grows.
+
+    python -m benchmarks.llm_prefix_cache \\
+        --model-path ./models/Phi-3-mini-4k-instruct-q4.gguf
+"""
+import argparse
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from src.models.llm_cpu_handler import LLMCPUChatbot
+from benchmarks.bert_padding import make_chat_messages
+
+
+def first_token_ms(chatbot: LLMCPUChatbot,
+                   message: str,
+                   history: List[dict]) -> tuple:
+    start = time.perf_counter()
+    ttft = None
+    reply = ""
+    for chunk in chatbot.generate_response(message, "😐 Нейтральная", 0.0,
+                                           history):
+        if ttft is None:
+            ttft = (time.perf_counter() - start) * 1000
+        reply += chunk
+    return ttft or 0.0, reply
+
+
+def play(chatbot: LLMCPUChatbot,
+         sessions: int,
+         turns: int) -> np.ndarray:
+    """TTFT in ms, shape (turns, sessions)."""
+    histories = [[] for _ in range(sessions)]
+    messages = [make_chat_messages(turns, 4, 12, seed=session)
+                for session in range(sessions)]
+    ttft = np.zeros((turns, sessions))
+    for turn in range(turns):
+        for session in range(sessions):
+            message = messages[session][turn]
+            ttft[turn, session], reply = first_token_ms(chatbot, message,
+                                                        histories[session])
+            histories[session] += [
+                {"role": "user", "content": message,
+                 "sentiment_label": "😐 Нейтральная",
+                 "sentiment_score": 0.0},
+                {"role": "assistant", "content": reply},
+            ]
+    return ttft
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--max-tokens", type=int, default=24)
+    args = parser.parse_args()
+
+    chatbot = LLMCPUChatbot(model_local_dir=os.path.dirname(args.model_path),
+                            model_url_repo="",
+                            model_filename=os.path.basename(args.model_path))
+    if not chatbot.is_ready:
+        raise SystemExit(f"Модель не загружена: {args.model_path}")
+    chatbot.max_tokens = args.max_tokens
+    chatbot.temperature = 0.0
+
+    chatbot.model.set_cache(None)
+    chatbot.model.reset()
+    no_cache = play(chatbot, args.sessions, args.turns)
+
+    chatbot.model.set_cache(chatbot.prompt_cache)
+    with_cache = play(chatbot, args.sessions, args.turns)
+
+    print(f"{'turn':<6}{'no cache, ms':>16}{'prompt cache, ms':>20}")
+    for turn in range(args.turns):
+        print(f"{turn + 1:<6}{no_cache[turn].mean():>16.0f}"
+              f"{with_cache[turn].mean():>20.0f}")
+    print(f"prompt cache: {chatbot.prompt_cache.hits} hits, "
+          f"{chatbot.prompt_cache.misses} misses, "
+          f"{chatbot.prompt_cache.cache_size / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
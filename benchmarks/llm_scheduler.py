@@ -0,0 +1,135 @@
+"""Burst of concurrent sessions on the shared local LLM.
+
+Starts `--sessions` threads that hit send at the same moment, as users
+of the app do, and prints queue wait, time to first token and total
+reply time per session (p50/p95), the throughput and whether the model
+was ever entered by two generations at once. Without `--model-path` a
+simulated model streams `--tokens` tokens at `--token-ms` each.
+
+    python -m benchmarks.llm_scheduler --sessions 10 --messages 2
+    python -m benchmarks.llm_scheduler \\
+        --model-path ./models/Phi-3-mini-4k-instruct-q4.gguf
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from src.models.llm_scheduler import (GenerationScheduler, 
+                                      QueueFullError, 
+                                      QueueTimeout)
+
+
+class SimulatedModel:
+    """Streams tokens at a fixed rate and counts overlapping calls."""
+
+    def __init__(self, tokens: int, token_s: float) -> None:
+        self.tokens = tokens
+        self.token_s = token_s
+        self.active = 0
+        self.overlaps = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.overlaps += self.active > 1
+        try:
+            for i in range(self.tokens):
+                time.sleep(self.token_s)
+                yield {"choices": [{"text": f" t{i}"}]}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def run_session(model,
+                scheduler: GenerationScheduler,
+                session_id: str,
+                messages: int,
+                max_tokens: int,
+                start: threading.Event,
+                results: List[Dict[str, float]]) -> None:
+    start.wait()
+    for turn in range(messages):
+        prompt = f"<|user|>\nsession {session_id}, message {turn}<|end|>\n"
+        job = lambda: (chunk["choices"][0]["text"] for chunk in
+                       model(prompt, max_tokens=max_tokens, stream=True))
+        sent = time.perf_counter()
+        row = {"session": session_id, "ttft": None, "outcome": "ok"}
+        try:
+            ticket = scheduler.submit(session_id, job)
+            for chunk in ticket.stream():
+                if row["ttft"] is None:
+                    row["ttft"] = time.perf_counter() - sent
+        except QueueFullError:
+            row["outcome"] = "rejected"
+        except QueueTimeout:
+            row["outcome"] = "timeout"
+        row["total"] = time.perf_counter() - sent
+        results.append(row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=1,
+                        help="messages each session sends one after another")
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--max-wait", type=float, default=120.0)
+    parser.add_argument("--model-path", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.model_path:
+        from llama_cpp import Llama
+        model = Llama(model_path=args.model_path,
+                      n_ctx=2048,
+                      n_threads=max(os.cpu_count() // 2, 1),
+                      verbose=False)
+    else:
+        model = SimulatedModel(args.tokens, args.token_ms / 1000)
+
+    scheduler = GenerationScheduler(max_queue=args.max_queue,
+                                    max_wait_s=args.max_wait,
+                                    max_chunks=args.tokens,
+                                    name="bench")
+    start, results = threading.Event(), []
+    threads = [threading.Thread(target=run_session,
+                                args=(model, scheduler, f"s{i}",
+                                      args.messages, args.tokens,
+                                      start, results))
+               for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    start.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    served = [r for r in results if r["outcome"] == "ok"]
+    ttft = np.array([r["ttft"] for r in served]) * 1000
+    total = np.array([r["total"] for r in served]) * 1000
+    print(f"{'metric':<22}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, values in (("time to first token", ttft),
+                         ("reply time", total)):
+        print(f"{name:<22}{np.median(values):>10.0f}"
+              f"{np.percentile(values, 95):>10.0f}{values.max():>10.0f}")
+    print(f"\nreplies: {len(served)}/{len(results)}, rejected: "
+          f"{sum(r['outcome'] == 'rejected' for r in results)}, timed out: "
+          f"{sum(r['outcome'] == 'timeout' for r in results)}")
+    print(f"throughput: {len(served) / elapsed:.2f} replies/s "
+          f"in {elapsed:.1f} s")
+    if isinstance(model, SimulatedModel):
+        print(f"overlapping generations: {model.overlaps}")
+
+
+if __name__ == "__main__":
+    main()
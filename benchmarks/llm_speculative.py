@@ -0,0 +1,101 @@
+"""Plain vs prompt-lookup speculative decoding of LLMCPUChatbot.
+
+Loads the model twice, without and with speculative decoding, answers
+the same fixed chat prompts greedily (temperature 0, so both modes must
+produce the same text) and prints decoding tokens/s per prompt and the
+share of drafted tokens the model accepted.
+
+    python -m benchmarks.llm_speculative \\
+        --model-path ./models/Phi-3-mini-4k-instruct-q4.gguf
+"""
+import argparse
+import gc
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from src.models.llm_cpu_handler import LLMCPUChatbot
+
+SENTIMENT = {"positive": ("😊 Позитивная", 0.93),
+             "neutral": ("😐 Нейтральная", 0.12),
+             "negative": ("😞 Негативная", -0.87)}
+
+# (sentiment, message, history of earlier user messages)
+PROMPTS = [
+    ("positive", "Сегодня сдал экзамен на отлично!", []),
+    ("negative", "Опять опоздал на поезд, весь день насмарку.", []),
+    ("neutral", "Подскажи, что почитать вечером?", []),
+    ("positive", "Спасибо, ты очень помог!",
+     ["Подскажи, что почитать вечером?"]),
+    ("negative", "Кажется, я простыл и всё болит.",
+     ["Привет!", "Настроение так себе."]),
+    ("neutral", "Повтори, пожалуйста, что ты сказал про книги.",
+     ["Подскажи, что почитать вечером?", "А что-нибудь короче?"]),
+]
+
+
+def make_history(messages: List[str]) -> List[dict]:
+    history = []
+    for message in messages:
+        label, score = SENTIMENT["neutral"]
+        history += [{"role": "user", "content": message,
+                     "sentiment_label": label, "sentiment_score": score},
+                    {"role": "assistant",
+                     "content": "Понимаю! Расскажи подробнее."}]
+    return history
+
+
+def run(args: argparse.Namespace,
+        speculative: bool) -> List[Tuple[str, dict]]:
+    chatbot = LLMCPUChatbot(model_local_dir=os.path.dirname(args.model_path),
+                            model_url_repo="",
+                            model_filename=os.path.basename(args.model_path),
+                            prompt_cache_mb=0,
+                            max_tokens=args.max_tokens,
+                            speculative_decoding=speculative,
+                            speculative_ngram_size=args.ngram_size,
+                            speculative_draft_tokens=args.draft_tokens)
+    if not chatbot.is_ready:
+        raise SystemExit(f"Модель не загружена: {args.model_path}")
+    chatbot.temperature = 0.0
+
+    results = []
+    for sentiment, message, history in PROMPTS:
+        label, score = SENTIMENT[sentiment]
+        reply = "".join(chatbot.generate_response(message, label, score,
+                                                  make_history(history)))
+        results.append((reply, chatbot.last_turn_stats))
+    del chatbot
+    gc.collect()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--max-tokens", type=int, default=120)
+    parser.add_argument("--ngram-size", type=int, default=2)
+    parser.add_argument("--draft-tokens", type=int, default=10)
+    args = parser.parse_args()
+
+    plain = run(args, speculative=False)
+    speculative = run(args, speculative=True)
+
+    print(f"{'prompt':<8}{'tokens':>8}{'plain tok/s':>14}"
+          f"{'spec tok/s':>13}{'accepted':>10}{'same text':>11}")
+    for i, ((plain_reply, plain_stats), (spec_reply, spec_stats)) in \
+            enumerate(zip(plain, speculative)):
+        print(f"{i + 1:<8}{plain_stats.get('tokens', 0):>8}"
+              f"{plain_stats.get('tokens_per_s', 0):>14.1f}"
+              f"{spec_stats.get('tokens_per_s', 0):>13.1f}"
+              f"{spec_stats.get('draft_acceptance', 0):>10.0%}"
+              f"{'yes' if plain_reply == spec_reply else 'no':>11}")
+    speedup = (np.mean([s.get("tokens_per_s", 0) for _, s in speculative])
+               / max(np.mean([s.get("tokens_per_s", 0) for _, s in plain]),
+                     1e-9))
+    print(f"\nmean speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Load test of the scoring service: throughput and latency percentiles.
+
+Waits for /readyz, then runs `--concurrency` client threads, each with
+its own keep-alive connection, that post /score (or /explain) requests
+of `--batch` chat messages back to back for `--duration` seconds, and
+prints per model and concurrency level the requests/s, texts/s, p50,
+p95 and p99 latency and the failed requests.
+
+    python -m src.scoring_service --config config.yaml &
+    python -m benchmarks.scoring_load --url http://127.0.0.1:8080 \\
+        --models logreg bert --concurrency 1 8 32 --batch 1 8 --duration 10
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.hot_path import make_chat_corpus
+
+
+def wait_ready(host: str, port: int, timeout_s: float) -> dict:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("GET", "/readyz")
+            response = connection.getresponse()
+            status = json.loads(response.read())
+            connection.close()
+            if response.status == 200:
+                return status
+        except (OSError, http.client.HTTPException, ValueError):
+            status = None
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Сервис не готов за {timeout_s:.0f} с: "
+                             f"{status}")
+        time.sleep(0.5)
+
+
+def client(host: str, port: int, path: str, bodies: List[bytes],
+           stop_at: float, latencies: List[float], errors: List[int],
+           seed: int) -> None:
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    i = seed
+    while time.monotonic() < stop_at:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request("POST", path, body=body,
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors.append(1)
+    connection.close()
+
+
+def run_level(host: str, port: int, path: str, bodies: List[bytes],
+              concurrency: int, duration_s: float
+              ) -> Tuple[np.ndarray, int, float]:
+    latencies: List[float] = []
+    errors: List[int] = []
+    stop_at = time.monotonic() + duration_s
+    threads = [threading.Thread(target=client,
+                                args=(host, port, path, bodies, stop_at,
+                                      latencies, errors, i * 7))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (np.array(latencies), len(errors),
+            time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--endpoint", choices=["score", "explain"],
+                        default="score")
+    parser.add_argument("--models", nargs="+", default=["logreg"])
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 8, 32])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1],
+                        help="texts per request")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    print(f"readyz: {wait_ready(host, port, args.ready_timeout)}\n")
+
+    messages = make_chat_corpus(1000, 3, 40)
+    print(f"{'model':<8}{'batch':>6}{'clients':>8}{'req/s':>9}"
+          f"{'texts/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}")
+    for model_id in args.models:
+        for batch in args.batch:
+            bodies = [json.dumps({"model": model_id,
+                                  "texts": messages[i:i + batch]},
+                                 ensure_ascii=False).encode("utf-8")
+                      for i in range(0, len(messages) - batch + 1, batch)]
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = run_level(
+                    host, port, f"/{args.endpoint}", bodies, concurrency,
+                    args.duration)
+                rps = len(latencies) / elapsed
+                p50, p95, p99 = (np.percentile(latencies, [50, 95, 99])
+                                 if len(latencies) else (0.0, 0.0, 0.0))
+                print(f"{model_id:<8}{batch:>6}{concurrency:>8}{rps:>9.1f}"
+                      f"{rps * batch:>10.1f}{p50:>9.1f}{p95:>9.1f}"
+                      f"{p99:>9.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
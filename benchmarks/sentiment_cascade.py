@@ -0,0 +1,109 @@
+"""Accuracy/latency trade-off of the "auto" LogReg -> BERT cascade.
+
+Scores a labelled JSONL/CSV sample once with each model, timing every
+text, and prints for LogReg alone, BERT alone and each uncertainty band
+of the cascade the share of texts escalated to BERT, the accuracy and
+the per-text latency. Labels may be positive/negative, pos/neg or 1/0.
+
+    python -m benchmarks.sentiment_cascade --input labelled.jsonl \\
+        --text-field text --label-field label --bands 0.2 0.4 0.5 0.6
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.bulk_scoring import read_rows
+from src.model_factory import (read_config,
+                               build_logreg_classifier,
+                               build_bert_classifier)
+
+POSITIVE_LABELS = {"positive", "pos", "1", "true"}
+NEGATIVE_LABELS = {"negative", "neg", "0", "-1", "false"}
+
+
+def parse_label(value) -> Optional[int]:
+    label = str(value).strip().lower()
+    if label in POSITIVE_LABELS:
+        return 1
+    if label in NEGATIVE_LABELS:
+        return 0
+    return None
+
+
+def load_sample(args: argparse.Namespace) -> Tuple[List[str], np.ndarray]:
+    input_format = args.format or ("csv" if args.input.endswith(".csv")
+                                   else "jsonl")
+    texts, labels = [], []
+    for row in read_rows(args.input, input_format):
+        label = parse_label(row.get(args.label_field))
+        text = str(row.get(args.text_field) or "")
+        if label is not None and text.strip():
+            texts.append(text)
+            labels.append(label)
+        if args.limit and len(texts) >= args.limit:
+            break
+    return texts, np.array(labels)
+
+
+def timed_scores(model, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores and per-text latency in ms, one predict call per text as
+    in the app."""
+    model.predict(texts[0])  # warm-up
+    scores, latency = [], []
+    for text in texts:
+        start = time.perf_counter()
+        scores.append(model.predict(text))
+        latency.append((time.perf_counter() - start) * 1000)
+    return np.array(scores), np.array(latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--bands", type=float, nargs="+",
+                        default=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8])
+    args = parser.parse_args()
+
+    app_config = read_config(args.config)
+    texts, labels = load_sample(args)
+    if not texts:
+        raise SystemExit(f"Нет размеченных текстов в {args.input}")
+
+    # no prediction cache: every text is really scored
+    logreg_scores, logreg_ms = timed_scores(
+        build_logreg_classifier(app_config), texts)
+    bert_scores, bert_ms = timed_scores(
+        build_bert_classifier(app_config, micro_batching=False), texts)
+    configured = app_config['sentiment_model'].get('auto_escalate_below', 0.5)
+
+    print(f"{len(texts)} texts, {labels.mean():.0%} positive\n")
+    print(f"{'model':<18}{'escalated':>10}{'accuracy':>10}"
+          f"{'mean ms':>10}{'p95 ms':>10}")
+
+    def report(name: str, escalated: np.ndarray) -> None:
+        scores = np.where(escalated, bert_scores, logreg_scores)
+        latency = logreg_ms + np.where(escalated, bert_ms, 0.0)
+        accuracy = ((scores > 0).astype(int) == labels).mean()
+        print(f"{name:<18}{escalated.mean():>10.1%}{accuracy:>10.1%}"
+              f"{latency.mean():>10.2f}{np.percentile(latency, 95):>10.2f}")
+
+    report("logreg", np.zeros(len(texts), dtype=bool))
+    for band in sorted(set(args.bands) | {configured}):
+        name = f"auto |s|<{band:g}" + (" *" if band == configured else "")
+        report(name, np.abs(logreg_scores) < band)
+    # BERT alone, without the LogReg pass in front of it
+    accuracy = ((bert_scores > 0).astype(int) == labels).mean()
+    print(f"{'bert':<18}{1:>10.1%}{accuracy:>10.1%}"
+          f"{bert_ms.mean():>10.2f}{np.percentile(bert_ms, 95):>10.2f}")
+    print("\n* auto_escalate_below in config.yaml")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Render cost of a streamed bot reply: per-chunk vs throttled rendering.
+
+Streams synthetic replies into a placeholder that serializes every
+render as the ForwardMsg Streamlit sends over the websocket, and prints
+per reply the number of messages, the bytes sent, the time spent
+rendering and the end-to-end time. "per chunk" is the former loop
+(markdown of the whole text plus a 10 ms sleep per chunk), "throttled"
+is StreamRenderer. `--token-ms` simulates the model's decoding speed,
+0 streams as fast as possible.
+
+    python -m benchmarks.stream_render --tokens 100 500 1000 --token-ms 0 20
+"""
+import argparse
+import time
+from typing import Callable, Iterator
+
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from src.stream_renderer import StreamRenderer
+
+WORDS = ("привет как дела сегодня отличный день чтобы немного отдохнуть "
+         "и подумать о хорошем").split()
+
+
+class WebsocketPlaceholder:
+    """Stands in for `st.empty()`: counts and serializes markdown deltas."""
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+        self.render_s = 0.0
+
+    def markdown(self, body: str) -> None:
+        start = time.perf_counter()
+        msg = ForwardMsg()
+        msg.delta.new_element.markdown.body = body
+        self.bytes += len(msg.SerializeToString())
+        self.messages += 1
+        self.render_s += time.perf_counter() - start
+
+
+def token_stream(n_tokens: int, token_s: float) -> Iterator[str]:
+    for i in range(n_tokens):
+        if token_s:
+            time.sleep(token_s)
+        yield (" " if i else "") + WORDS[i % len(WORDS)]
+
+
+def per_chunk(placeholder: WebsocketPlaceholder,
+              chunks: Iterator[str]) -> str:
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text + "▌")
+        time.sleep(0.01)
+    placeholder.markdown(text)
+    return text
+
+
+def throttled(placeholder: WebsocketPlaceholder,
+              chunks: Iterator[str]) -> str:
+    # defaults are the app settings of config_and_settings.py
+    renderer = StreamRenderer(placeholder.markdown)
+    for chunk in chunks:
+        renderer.append(chunk)
+    return renderer.close()
+
+
+def measure(render: Callable, n_tokens: int, token_s: float) -> tuple:
+    placeholder = WebsocketPlaceholder()
+    start = time.perf_counter()
+    render(placeholder, token_stream(n_tokens, token_s))
+    total_s = time.perf_counter() - start
+    return (placeholder.messages, placeholder.bytes / 1024,
+            placeholder.render_s * 1000, total_s * 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+",
+                        default=[100, 500, 1000])
+    parser.add_argument("--token-ms", type=float, nargs="+",
+                        default=[0.0, 20.0])
+    args = parser.parse_args()
+
+    print(f"{'tokens':>7}{'token ms':>10}  {'renderer':<11}{'messages':>9}"
+          f"{'KiB sent':>10}{'render ms':>11}{'total ms':>10}"
+          f"{'stream ms':>11}")
+    for token_ms in args.token_ms:
+        for n_tokens in args.tokens:
+            stream_ms = n_tokens * token_ms
+            for name, render in (("per chunk", per_chunk),
+                                 ("throttled", throttled)):
+                messages, kib, render_ms, total_ms = measure(
+                    render, n_tokens, token_ms / 1000)
+                print(f"{n_tokens:>7}{token_ms:>10.0f}  {name:<11}"
+                      f"{messages:>9}{kib:>10.0f}{render_ms:>11.1f}"
+                      f"{total_ms:>10.0f}{stream_ms:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+from typing import Optional
 import streamlit as st
 from src.config_and_settings import SessionKeys
-from src.config_and_settings import MODEL_ID_LOGREG, MODEL_ID_BERT
+from src.config_and_settings import (MODEL_ID_LOGREG, MODEL_ID_BERT, 
+                                     MODEL_ID_AUTO)
+from src.models.incremental_tfidf import IncrementalDraftScorer
 
 def initialize_session_state() -> None:
     """Initializes the session state with default values."""
@@ -12,10 +15,13 @@ def initialize_session_state() -> None:
         SessionKeys.SELECTED_SENTIMENT_MODEL: None,
         SessionKeys.SENTIMENT_MODELS_DICT: {
             MODEL_ID_LOGREG: None,
-            MODEL_ID_BERT: None
+            MODEL_ID_BERT: None,
+            MODEL_ID_AUTO: None
         },
         SessionKeys.LLM_CHATBOT: None,
         SessionKeys.BOT_IS_TYPING: False,
+        SessionKeys.DRAFT_EXPLANATION: None,
+        SessionKeys.DRAFT_SCORER: None,
     }
 
     for key, value in default_values.items():
@@ -23,6 +29,16 @@ def initialize_session_state() -> None:
             st.session_state[key] = value
 
 
+def get_draft_scorer(sentiment_model) -> Optional[IncrementalDraftScorer]:
+    """Returns the session's incremental scorer of the draft, rebuilt when
+    another sentiment model is selected; None if the model has none."""
+    draft_scorer = st.session_state.get(SessionKeys.DRAFT_SCORER)
+    if draft_scorer is None or draft_scorer.classifier is not sentiment_model:
+        draft_scorer = IncrementalDraftScorer.from_classifier(sentiment_model)
+        st.session_state[SessionKeys.DRAFT_SCORER] = draft_scorer
+    return draft_scorer
+
+
 def add_message_to_chat_history(role: str,
                                 content: str,
                                 sentiment_score: float,
@@ -0,0 +1,61 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Hashable, List, Optional, Tuple
+
+
+class ExplainPool:
+    """Background workers that compute word-importance explanations for all
+    sessions, so a rerun never waits for one."""
+
+    def __init__(self, max_workers: int = 2) -> None:
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="explain")
+
+    def submit(self, fn, *args) -> Future:
+        return self._executor.submit(fn, *args)
+
+
+class DraftExplanation:
+    """Per-session explanation of the current draft.
+
+    Only the latest requested text matters: a new request cancels the
+    previous job if it has not started yet, and a job that was overtaken
+    while waiting in the queue is dropped without running the model.
+    A job that is already running finishes (the model cannot be
+    interrupted), and its result still lands in the prediction cache.
+    """
+
+    def __init__(self, pool: ExplainPool) -> None:
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._key: Optional[Hashable] = None
+        self._future: Optional[Future] = None
+        self._generation = 0
+
+    def request(self, sentiment_model, text: str) -> Future:
+        key = (getattr(sentiment_model, 'model_id', id(sentiment_model)),
+               text)
+        with self._lock:
+            if key == self._key and self._future is not None:
+                return self._future
+
+            if self._future is not None:
+                self._future.cancel()
+            self._generation += 1
+            self._key = key
+            self._future = self.pool.submit(self._explain,
+                                            sentiment_model,
+                                            text,
+                                            self._generation)
+            return self._future
+
+    def _explain(self,
+                 sentiment_model,
+                 text: str,
+                 generation: int) -> Optional[List[Tuple[str, float]]]:
+        if generation != self._generation:
+            logging.debug("Explain устарел, пропущен")
+            return None
+        return sentiment_model.explain_shap_text(text)
@@ -0,0 +1,248 @@
+"""Bulk sentiment scoring of JSONL/CSV corpora from the command line.
+
+Streams the input in fixed-size chunks, scores each chunk with one
+batched predict (and optionally explain) call in a pool of worker
+processes, and appends the results to a JSONL file in input order.
+After every written chunk a checkpoint next to the output records how
+far the run got, so `--resume` continues from the last completed chunk.
+
+    python -m src.bulk_scoring --input comments.jsonl --output scores.jsonl
+    python -m src.bulk_scoring --input data.csv --text-field message \\
+        --model bert --workers 4 --explain --resume
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.model_factory import (read_config, 
+                               build_logreg_classifier, 
+                               build_bert_classifier,
+                               build_cascade_classifier)
+
+MODEL_BUILDERS = {
+    "logreg": build_logreg_classifier,
+    "bert": build_bert_classifier,
+    "auto": build_cascade_classifier,
+}
+
+# models that run on torch: only their workers set the torch threads
+TORCH_MODELS = {"bert", "auto"}
+
+Row = Dict[str, Any]
+
+# model of the current worker process, built once by _init_worker
+_worker_model = None
+
+
+def read_rows(path: str, input_format: str) -> Iterator[Row]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if input_format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_chunks(path: str, 
+                input_format: str, 
+                chunk_size: int,
+                skip_rows: int = 0) -> Iterator[List[Row]]:
+    rows = itertools.islice(read_rows(path, input_format), skip_rows, None)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _build_model(config_path: str, model_id: str):
+    app_config = read_config(config_path)
+    kwargs = {"micro_batching": False} if model_id == "bert" else {}
+    model = MODEL_BUILDERS[model_id](app_config, model_id=model_id, **kwargs)
+    if not model.is_ready:
+        raise RuntimeError(f"Модель {model_id} не загружена")
+    return model
+
+
+def _init_worker(config_path: str, model_id: str, threads: int) -> None:
+    global _worker_model
+    if threads and model_id in TORCH_MODELS:
+        import torch
+        torch.set_num_threads(threads)
+    _worker_model = _build_model(config_path, model_id)
+
+
+def score_texts(texts: List[str], explain: bool, model=None) -> List[Row]:
+    model = model or _worker_model
+    scores = model.predict_batch(texts)
+    results = []
+    for text, score in zip(texts, scores):
+        result: Row = {"score": round(float(score), 6)}
+        if explain:
+            result["attributions"] = [
+                [token, round(float(value), 6)] 
+                for token, value in model.explain_shap_text(text)
+            ]
+        results.append(result)
+    return results
+
+
+class Checkpoint:
+    """Last completed chunk and the output size right after it."""
+
+    def __init__(self, output_path: str) -> None:
+        self.path = output_path + ".progress"
+
+    def load(self) -> Tuple[int, int, int]:
+        """Returns (completed chunks, completed rows, output offset)."""
+        if not os.path.exists(self.path):
+            return 0, 0, 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state["chunks"], state["rows"], state["output_offset"]
+
+    def save(self, chunks: int, rows: int, output_offset: int) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"chunks": chunks, 
+                       "rows": rows, 
+                       "output_offset": output_offset}, f)
+        os.replace(tmp_path, self.path)
+
+
+def run(args: argparse.Namespace) -> None:
+    checkpoint = Checkpoint(args.output)
+    done_chunks, done_rows, output_offset = (checkpoint.load() 
+                                             if args.resume else (0, 0, 0))
+    if output_offset and (not os.path.exists(args.output)
+                          or os.path.getsize(args.output) < output_offset):
+        logging.warning(f"Файл {args.output} не найден или короче контрольной "
+                        f"точки, обработка начинается заново")
+        done_chunks, done_rows, output_offset = 0, 0, 0
+    if done_rows:
+        logging.info(f"Продолжение с чанка {done_chunks} "
+                     f"({done_rows} строк уже обработано)")
+
+    # drop whatever was written after the last checkpoint
+    output = open(args.output, 'r+' if output_offset else 'w', 
+                  encoding='utf-8')
+    output.seek(output_offset)
+    output.truncate()
+
+    # skipped by rows: the chunk size may differ from the previous run
+    chunks = read_chunks(args.input, args.format, args.chunk_size, done_rows)
+
+    executor = None
+    if args.workers > 0:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.config, args.model, args.threads_per_worker)
+        )
+    else:
+        local_model = _build_model(args.config, args.model)
+
+    # at most max_in_flight chunks are held in memory at any time
+    max_in_flight = max(args.workers, 1) * 2
+    in_flight: List[Tuple[List[Row], Future]] = []
+    chunk_index, rows_total = done_chunks, done_rows
+    started = time.perf_counter()
+    rows_this_run = 0
+
+    def write_oldest() -> None:
+        nonlocal chunk_index, rows_total, rows_this_run
+        rows, future = in_flight.pop(0)
+        for offset, (row, result) in enumerate(zip(rows, future.result())):
+            record: Row = {"row": rows_total + offset}
+            if args.id_field:
+                record["id"] = row.get(args.id_field)
+            record.update(result)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        os.fsync(output.fileno())
+
+        chunk_index += 1
+        rows_total += len(rows)
+        rows_this_run += len(rows)
+        checkpoint.save(chunk_index, rows_total, output.tell())
+
+        elapsed = time.perf_counter() - started
+        logging.info(f"Чанк {chunk_index}: {rows_total} строк, "
+                     f"{rows_this_run / elapsed:.1f} строк/с")
+
+    try:
+        for rows in chunks:
+            texts = [str(row.get(args.text_field) or "") for row in rows]
+            if executor is not None:
+                future = executor.submit(score_texts, texts, args.explain)
+            else:
+                future = Future()
+                future.set_result(score_texts(texts, args.explain, 
+                                              local_model))
+            in_flight.append((rows, future))
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+    finally:
+        output.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Готово: {rows_this_run} строк за {elapsed:.1f} с "
+                 f"({rows_this_run / max(elapsed, 1e-9):.1f} строк/с)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:])
+    )
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="by default taken from the input extension")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default=None,
+                        help="input field copied to the output as `id`")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), 
+                        default="logreg")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--workers", type=int, 
+                        default=max((os.cpu_count() or 2) // 2, 1),
+                        help="worker processes, 0 - score in this process")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="torch threads of each bert/auto worker, "
+                             "0 - default")
+    parser.add_argument("--explain", action="store_true",
+                        help="also write word attributions")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue after the last completed chunk")
+    args = parser.parse_args(argv)
+
+    if args.format is None:
+        args.format = "csv" if args.input.endswith(".csv") else "jsonl"
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    run(parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import logging
 import streamlit as st
-import time
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from src.models.logreg_classifier import LogRegClassifier 
 from src.sentiment_analysis import (analyze_text_sentiment, 
                                     get_sentiment_parameters)
 from src.app_state import add_message_to_chat_history
-from src.config_and_settings import SessionKeys
+from src.config_and_settings import (SessionKeys, 
+                                     STREAM_RENDER_MAX_FPS, 
+                                     STREAM_RENDER_FLUSH_CHARS)
+from src.stream_renderer import StreamRenderer
+from src.metrics import METRICS
 
 def process_user_send_action(user_draft_text: str, 
                              sentiment_model: LogRegClassifier) -> None:
@@ -14,9 +18,12 @@ def process_user_send_action(user_draft_text: str,
         st.toast("Пожалуйста, напишите что-нибудь перед отправкой", icon="✍️")
         return
 
-    final_score = analyze_text_sentiment(user_draft_text, sentiment_model)
-    final_label, _ = get_sentiment_parameters(final_score)
-    shap_values = sentiment_model.explain_shap_text(user_draft_text)
+    model_id = sentiment_model.model_id
+    with METRICS.timer("user_message_analysis", model_id):
+        final_score = analyze_text_sentiment(user_draft_text, sentiment_model)
+        final_label, _ = get_sentiment_parameters(final_score)
+        with METRICS.timer("explain", model_id):
+            shap_values = sentiment_model.explain_shap_text(user_draft_text)
 
     add_message_to_chat_history("user", user_draft_text, final_score, 
                                 final_label, shap_values)
@@ -42,39 +49,57 @@ def handle_bot_response_generation(sentiment_model: LogRegClassifier,
     user_data_for_bot = st.session_state[SessionKeys.USER_DATA_FOR_BOT]
 
     full_bot_response_text = ""
+    model_id = sentiment_model.model_id
+    llm_model_id = getattr(llm_chatbot, 'MODEL_ID', "")
  
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
-        with st.spinner("Бот печатает..."):
+        with st.spinner("Бот печатает..."), \
+             METRICS.timer("bot_response", llm_model_id):
             try:
                 chat_history_for_llm = (
                     st.session_state[SessionKeys.CHAT_HISTORY][:-1]
                 )
 
+                script_ctx = get_script_run_ctx()
                 response_generator = llm_chatbot.generate_response(
                     user_message=user_data_for_bot["content"],
                     user_sentiment_label=user_data_for_bot["label"],
                     user_sentiment_score=user_data_for_bot["score"],
-                    chat_history=chat_history_for_llm
+                    chat_history=chat_history_for_llm,
+                    session_id=script_ctx.session_id if script_ctx else None,
+                    on_queue_position=lambda position:
+                        message_placeholder.markdown(
+                            f"⏳ В очереди: {position}"
+                        )
                 )
 
+                renderer = StreamRenderer(
+                    message_placeholder.markdown,
+                    max_fps=STREAM_RENDER_MAX_FPS,
+                    flush_chars=STREAM_RENDER_FLUSH_CHARS
+                )
                 for chunk in response_generator:
-                    full_bot_response_text += chunk
-                    message_placeholder.markdown(full_bot_response_text + "▌")
-                    time.sleep(0.01) # for typing effect
+                    renderer.append(chunk)
+                # the last frame: pending chunks, without the cursor
+                full_bot_response_text = renderer.close()
             except Exception as e:
                 logging.error(f'Ошибка генерации ответа')
+                METRICS.increment("chat_stage_errors_total", 
+                                  stage="bot_response", 
+                                  model_id=llm_model_id)
                 full_bot_response_text = ("Извините, у меня возникла ошибка "
                                           "при генерации ответа.")
-            finally:
                 message_placeholder.markdown(full_bot_response_text)
 
-        bot_score = analyze_text_sentiment(full_bot_response_text, 
-                                           sentiment_model)
-        bot_label, _ = get_sentiment_parameters(bot_score)
-        bot_shap_values = sentiment_model.explain_shap_text(
-            full_bot_response_text
-        )
+        with METRICS.timer("bot_response_analysis", model_id):
+            bot_score = analyze_text_sentiment(full_bot_response_text, 
+                                               sentiment_model)
+            bot_label, _ = get_sentiment_parameters(bot_score)
+            with METRICS.timer("explain", model_id):
+                bot_shap_values = sentiment_model.explain_shap_text(
+                    full_bot_response_text
+                )
 
         add_message_to_chat_history(role="assistant",
                                     content=full_bot_response_text,
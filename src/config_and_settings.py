@@ -1,4 +1,3 @@
-import logging
 import os
 import yaml
 import streamlit as st
@@ -7,6 +6,8 @@ from streamlit.errors import StreamlitSecretNotFoundError
 from dotenv import load_dotenv
 
 def get_gemini_key():
+    """Gemini API key from st.secrets or the GEMINI_API_KEY environment
+    variable (.env included), None if neither has it."""
     api_key = None
     try:
         if "gemini" in st.secrets and "api_key" in st.secrets['gemini']:
@@ -20,12 +21,7 @@ def get_gemini_key():
     api_key = os.environ.get("GEMINI_API_KEY")
     if api_key:
         return api_key
-    
-    logging.error("Проблемы с доступом Gemini, приложение не может работать")
-    st.error("Проблемы с доступом Gemini, приложение не может работать")
-    st.stop()
-
-GEMINI_API_KEY = get_gemini_key()
+    return None
 
 class SessionKeys:
     CHAT_HISTORY = "chat_history"
@@ -36,13 +32,23 @@ class SessionKeys:
     SENTIMENT_MODELS_DICT = "sentiment_models_dict"
     LLM_CHATBOT = "llm_chatbot"
     BOT_IS_TYPING = "bot_is_typing"
+    DRAFT_EXPLANATION = "draft_explanation"
+    DRAFT_SCORER = "draft_scorer"
 
 MODEL_ID_LOGREG = "logreg"
 MODEL_ID_BERT = "bert"
+MODEL_ID_AUTO = "auto"
+MODEL_ID_LLM = "llm"
 
 CONFIG_PATH = 'config.yaml'
 SENTIMENT_THRESHOLD = 0.2
 EMPTY_TEXT_PLACEHOLDER = "Начните вводить текст здесь..."
+# draft word highlights: inline wait before falling back to polling
+EXPLAIN_INLINE_WAIT_S = 0.05
+EXPLAIN_POLL_INTERVAL_S = 0.3
+# streamed bot replies: re-render at most this often, or per this many chars
+STREAM_RENDER_MAX_FPS = 12
+STREAM_RENDER_FLUSH_CHARS = 200
 
 WELCOME_TITLE = "## 💬 Чат с Анализом Настроения"
 WELCOME_SUBHEADER = (
@@ -0,0 +1,203 @@
+"""Thread and batch calibration of the local LLM on this host.
+
+Sweeps the generation thread count, the prompt (batch) thread count and
+`n_batch`, measures prompt-eval and generation tokens/s on a fixed chat
+prompt and saves the fastest settings to the profiles file of
+`llm_cpu_chatbot` (`tuning_profiles_path` in config.yaml), keyed by the
+model file and the CPU signature. LLMCPUChatbot picks the profile up on
+its next start.
+
+    python -m src.llm_calibration --config config.yaml
+    python -m src.llm_calibration --model-path ./models/model.gguf \\
+        --profiles ./models/llm_profiles.json --repeats 3
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from llama_cpp import Llama
+
+from src.model_factory import read_config
+from src.models.llm_cpu_handler import LLMCPUChatbot
+from src.models.llm_profile import (available_cpus,
+                                    cpu_signature,
+                                    default_profile,
+                                    save_profile)
+
+CALIBRATION_TURNS = [
+    ("user", "Привет! Как проходит твой день?", "😊 Позитивная", 0.71),
+    ("assistant", "Отлично, спасибо! Рад тебя видеть. А как у тебя дела?",
+     None, None),
+    ("user", "Не очень, с утра всё валится из рук и ничего не успеваю.",
+     "😞 Негативная", -0.64),
+    ("assistant", "Сочувствую, такие дни бывают у всех. Может, сделать "
+                  "короткий перерыв и выпить чаю?", None, None),
+    ("user", "Хорошая идея. Посоветуй что-нибудь, чтобы отвлечься вечером.",
+     "😐 Нейтральная", 0.08),
+]
+
+
+def calibration_prompt(min_tokens: int, tokenize) -> List[int]:
+    """The chat turns repeated until the prompt has `min_tokens` tokens,
+    formatted as LLMCPUChatbot sends them."""
+    turns = "".join(LLMCPUChatbot._format_turn(role, content, label, score)
+                    for role, content, label, score in CALIBRATION_TURNS)
+    text = LLMCPUChatbot._format_system_prompt(
+        LLMCPUChatbot.DEFAULT_SYSTEM_PROMPT_EN)
+    while len(tokenize(text)) < min_tokens:
+        text += turns
+    return tokenize(text + "<|assistant|>\n")[:min_tokens]
+
+
+def thread_candidates(cpus: int) -> List[int]:
+    """Powers of two, half and all of the CPUs."""
+    candidates = {cpus, max(cpus // 2, 1)}
+    n = 1
+    while n < cpus:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def load_model(model_path: str, n_ctx: int, n_batch: int) -> Llama:
+    return Llama(model_path=model_path,
+                 n_ctx=n_ctx,
+                 n_gpu_layers=0,
+                 n_batch=n_batch,
+                 verbose=False)
+
+
+def prompt_tokens_per_s(model: Llama,
+                        prompt: List[int],
+                        repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        model.reset()
+        start = time.perf_counter()
+        model.eval(prompt)
+        timings.append(time.perf_counter() - start)
+    return len(prompt) / float(np.median(timings))
+
+
+def generation_tokens_per_s(model: Llama,
+                            prompt: List[int],
+                            n_tokens: int,
+                            repeats: int) -> float:
+    """Greedy decoding of `n_tokens` one at a time after the prompt."""
+    timings = []
+    for _ in range(repeats):
+        model.reset()
+        model.eval(prompt)
+        start = time.perf_counter()
+        for _ in range(n_tokens):
+            model.eval([model.sample(temp=0.0)])
+        timings.append(time.perf_counter() - start)
+    return n_tokens / float(np.median(timings))
+
+
+def calibrate(model_path: str,
+              n_ctx: int,
+              prompt_tokens: int,
+              generation_tokens: int,
+              batch_sizes: List[int],
+              repeats: int) -> Tuple[Dict[str, object], List[tuple]]:
+    """Generation threads are tuned first (decoding does not depend on
+    `n_batch`), then every `n_batch` with every batch thread count."""
+    cpus = available_cpus()
+    threads = thread_candidates(cpus)
+    rows = []
+
+    model = load_model(model_path, n_ctx, default_profile()["n_batch"])
+    prompt = calibration_prompt(
+        prompt_tokens,
+        lambda text: model.tokenize(text.encode("utf-8"), special=True))
+    generation = {}
+    for n_threads in threads:
+        model._ctx.set_n_threads(n_threads, cpus)
+        generation[n_threads] = generation_tokens_per_s(
+            model, prompt[:64], generation_tokens, repeats)
+        rows.append(("generation", n_threads, "-", "-",
+                     generation[n_threads]))
+    best_threads = max(generation, key=generation.get)
+    model.close()
+
+    prompt_eval = {}
+    for n_batch in batch_sizes:
+        model = load_model(model_path, n_ctx, n_batch)
+        for n_threads_batch in threads:
+            model._ctx.set_n_threads(best_threads, n_threads_batch)
+            speed = prompt_tokens_per_s(model, prompt, repeats)
+            prompt_eval[(n_batch, n_threads_batch)] = speed
+            rows.append(("prompt", best_threads, n_threads_batch, n_batch,
+                         speed))
+        model.close()
+    best_batch, best_threads_batch = max(prompt_eval, key=prompt_eval.get)
+
+    profile = {
+        "n_threads": best_threads,
+        "n_threads_batch": best_threads_batch,
+        "n_batch": best_batch,
+        "generation_tokens_per_s": round(generation[best_threads], 2),
+        "prompt_tokens_per_s": round(
+            prompt_eval[(best_batch, best_threads_batch)], 2),
+        "cpu": cpu_signature(),
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return profile, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--model-path", default=None,
+                        help="defaults to the llm_cpu_chatbot model")
+    parser.add_argument("--profiles", default=None,
+                        help="defaults to tuning_profiles_path")
+    parser.add_argument("--prompt-tokens", type=int, default=512)
+    parser.add_argument("--generation-tokens", type=int, default=32)
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[64, 128, 256, 512])
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the profile without saving it")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    llm_cpu_config = (read_config(args.config).get("llm_chatbot", {})
+                      .get("llm_cpu_chatbot", {}))
+    model_path = args.model_path or os.path.join(
+        llm_cpu_config.get("model_local_dir", "./models"),
+        llm_cpu_config.get("model_filename", ""))
+    profiles_path = args.profiles or llm_cpu_config.get(
+        "tuning_profiles_path", "./models/llm_profiles.json")
+    if not os.path.isfile(model_path):
+        raise SystemExit(f"Модель не найдена: {model_path}")
+
+    logging.info(f"Калибровка LLM {model_path} на {cpu_signature()}")
+    profile, rows = calibrate(model_path,
+                              n_ctx=llm_cpu_config.get("n_ctx", 4096),
+                              prompt_tokens=args.prompt_tokens,
+                              generation_tokens=args.generation_tokens,
+                              batch_sizes=args.batch_sizes,
+                              repeats=args.repeats)
+
+    print(f"{'stage':<12}{'threads':>9}{'batch threads':>15}"
+          f"{'n_batch':>9}{'tok/s':>9}")
+    for stage, n_threads, n_threads_batch, n_batch, speed in rows:
+        print(f"{stage:<12}{n_threads:>9}{n_threads_batch:>15}"
+              f"{n_batch:>9}{speed:>9.1f}")
+    print(f"\nbest: n_threads={profile['n_threads']}, "
+          f"n_threads_batch={profile['n_threads_batch']}, "
+          f"n_batch={profile['n_batch']}")
+
+    if not args.dry_run:
+        save_profile(profiles_path, model_path, profile)
+        logging.info(f"Профиль сохранён в {profiles_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Converts the joblib TF-IDF/LogReg pipeline to the compact artifact.
+
+Writes the vocabulary, IDF and coefficients as flat arrays that
+LogRegClassifier memory-maps instead of unpickling the pipeline, then
+checks that both give bit-identical probabilities on the preprocessed
+texts of `--check-input` (JSONL/CSV) or on built-in phrases, and prints
+the size and load time of both. Point `logreg_clf_path` in config.yaml
+at the output directory to use it.
+
+    python -m src.logreg_compact --config config.yaml
+    python -m src.logreg_compact --input ./models/tfidf_logreg_classifier.joblib \\
+        --output ./models/tfidf_logreg_classifier.tfidf \\
+        --check-input comments.jsonl --text-field text
+"""
+import argparse
+import logging
+import os
+import time
+from typing import List
+
+import joblib
+import numpy as np
+
+from src.bulk_scoring import read_rows
+from src.model_factory import read_config
+from src.models.compact_tfidf import CompactTfidfLogReg, save_compact
+from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+
+CHECK_PHRASES = [
+    "Привет! Как проходит твой день?",
+    "Не очень, с утра всё валится из рук и ничего не успеваю.",
+    "Отличный фильм, очень понравилось :)",
+    "ужасный сервис, больше никогда (((",
+    "ахахах ну ты даёшь, это лучший день",
+    "Хорошая идея. Посоветуй что-нибудь, чтобы отвлечься вечером.",
+    "",
+]
+
+
+def check_texts(args: argparse.Namespace) -> List[str]:
+    if not args.check_input:
+        return CHECK_PHRASES
+    input_format = args.format or ("csv" if args.check_input.endswith(".csv")
+                                   else "jsonl")
+    texts = []
+    for row in read_rows(args.check_input, input_format):
+        texts.append(str(row.get(args.text_field) or ""))
+        if args.limit and len(texts) >= args.limit:
+            break
+    return texts
+
+
+def disk_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path))
+
+
+def timed_load(load, path: str):
+    start = time.perf_counter()
+    model = load(path)
+    return model, (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--input", default=None,
+                        help="joblib pipeline, logreg_clf_path by default")
+    parser.add_argument("--output", default=None,
+                        help="artifact directory, the input path with "
+                             ".tfidf instead of .joblib by default")
+    parser.add_argument("--check-input", default=None)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--limit", type=int, default=10000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    app_config = read_config(args.config)
+    input_path = (args.input
+                  or app_config['sentiment_model']['logreg_clf_path'])
+    output_path = args.output or os.path.splitext(input_path)[0] + ".tfidf"
+    if not os.path.isfile(input_path):
+        raise SystemExit(f"Модель не найдена: {input_path}")
+
+    pipeline, joblib_ms = timed_load(joblib.load, input_path)
+    try:
+        save_compact(pipeline, output_path)
+    except ValueError as e:
+        raise SystemExit(f"Конвертация невозможна: {e}")
+    compact, compact_ms = timed_load(CompactTfidfLogReg.load, output_path)
+    logging.info(f"Компактная модель сохранена в {output_path}")
+
+    preprocessor = LogRegPreprocessor(
+        stopwords_path=app_config['preprocessor']['stopwords_path'])
+    prepr_texts = preprocessor.preprocess_batch(check_texts(args))
+    expected = pipeline.predict_proba(prepr_texts)
+    actual = compact.predict_proba(prepr_texts)
+    mismatches = int((expected != actual).any(axis=1).sum())
+
+    print(f"{'format':<10}{'size KiB':>10}{'load ms':>10}")
+    print(f"{'joblib':<10}{disk_size(input_path) / 1024:>10.0f}"
+          f"{joblib_ms:>10.1f}")
+    print(f"{'compact':<10}{disk_size(output_path) / 1024:>10.0f}"
+          f"{compact_ms:>10.1f}")
+    print(f"\n{len(prepr_texts)} texts checked, {mismatches} mismatches, "
+          f"max |diff| {np.abs(expected - actual).max():.3g}")
+    if mismatches:
+        raise SystemExit("Предсказания не совпадают с joblib-моделью")
+
+
+if __name__ == "__main__":
+    main()
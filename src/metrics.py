@@ -0,0 +1,345 @@
+"""Per-stage latency histograms and counters of the chat pipeline.
+
+Stages record into the process-wide METRICS registry:
+
+    with METRICS.timer("sentiment_predict", model_id):
+        ...
+
+While metrics are disabled in config.yaml the timers are no-ops.
+`configure_metrics` enables the registry and starts one exporter that
+publishes it in the Prometheus text format: an HTTP side port serving
+/metrics, or periodic snapshots appended to a size-rotated file.
+"""
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                     0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# items per batch of a MicroBatcher
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+STAGE_HISTOGRAM = "chat_stage_duration_seconds"
+STAGE_ERRORS = "chat_stage_errors_total"
+
+COUNTER_HELP = {
+    STAGE_ERRORS: "Stage calls that raised an exception.",
+    "llm_stream_chunks_total": "Streamed response chunks from the LLM.",
+    "llm_retries_total": "LLM requests retried after a retryable error.",
+    "llm_hedged_requests_total": "Hedged LLM requests after a late first "
+                                 "chunk.",
+    "llm_failovers_total": "Replies served by the fallback LLM.",
+    "llm_rejected_total": "Generations rejected by a full LLM queue.",
+    "llm_generated_tokens_total": "Tokens generated by the local LLM.",
+    "llm_draft_tokens_total": "Tokens drafted by speculative decoding.",
+    "llm_draft_accepted_total": "Drafted tokens accepted by the model.",
+    "sentiment_cascade_total": "Texts scored by the auto sentiment model.",
+    "sentiment_escalations_total": "Texts the auto sentiment model passed "
+                                   "to BERT.",
+}
+
+GAUGE_HELP = {
+    "micro_batch_queue_depth": "Requests waiting in a micro-batcher queue.",
+}
+
+HISTOGRAM_HELP = {
+    "micro_batch_size": "Requests per micro-batch.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # the last slot counts observations above the largest bucket
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class StageTimer:
+    """Context manager that observes the duration of a stage and counts
+    the stage as failed if it raised an exception."""
+
+    __slots__ = ("registry", "stage", "model_id", "start")
+
+    def __init__(self, registry: "MetricsRegistry",
+                 stage: str, model_id: str) -> None:
+        self.registry = registry
+        self.stage = stage
+        self.model_id = model_id
+
+    def __enter__(self) -> "StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.registry.observe(self.stage,
+                              time.perf_counter() - self.start,
+                              self.model_id)
+        # st.rerun() and st.stop() are BaseExceptions, not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.increment(STAGE_ERRORS,
+                                    stage=self.stage,
+                                    model_id=self.model_id)
+
+
+class _NullTimer:
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms (labelled by stage and model id),
+    counters, gauges and histograms of other values with their own
+    buckets, rendered in the Prometheus text exposition format."""
+
+    def __init__(self,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS_S,
+                 enabled: bool = False) -> None:
+        self.buckets = buckets
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._value_histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def timer(self, stage: str, model_id: str = ""):
+        if not self.enabled:
+            return _NULL_TIMER
+        return StageTimer(self, stage, model_id or "")
+
+    def observe(self, stage: str, seconds: float, model_id: str = "") -> None:
+        if not self.enabled:
+            return
+        key = (stage, model_id or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[key] = counter.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = float(value)
+
+    def observe_value(self, name: str, value: float,
+                      buckets: Tuple[float, ...], **labels: str) -> None:
+        """Observes a value that is not a stage duration, such as a batch
+        size, into the histogram `name` with the given buckets."""
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._value_histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._value_histograms.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines.append(f"# HELP {STAGE_HISTOGRAM} "
+                         f"Duration of chat pipeline stages.")
+            lines.append(f"# TYPE {STAGE_HISTOGRAM} histogram")
+            for (stage, model_id), histogram in sorted(
+                    self._histograms.items()):
+                _render_histogram(lines, STAGE_HISTOGRAM,
+                                  (("model_id", model_id), ("stage", stage)),
+                                  histogram)
+
+            for name, series in sorted(self._value_histograms.items()):
+                lines.append(f"# HELP {name} "
+                             f"{HISTOGRAM_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    _render_histogram(lines, name, labels, histogram)
+
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# HELP {name} {GAUGE_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value!r}")
+
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} "
+                             f"{COUNTER_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines: List[str], name: str, labels: Labels,
+                      histogram: Histogram) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float("inf"),),
+                            histogram.bucket_counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket"
+                     f"{_format_labels(labels + (('le', le),))} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum!r}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+
+def _format_labels(labels: Labels) -> str:
+    parts = []
+    for key, value in labels:
+        value = (value.replace("\\", "\\\\")
+                      .replace("\"", "\\\"")
+                      .replace("\n", "\\n"))
+        parts.append(f"{key}=\"{value}\"")
+    return "{" + ",".join(parts) + "}"
+
+
+METRICS = MetricsRegistry()
+
+
+def start_http_exporter(registry: MetricsRegistry,
+                        port: int,
+                        host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves the registry on http://host:port/metrics from a daemon
+    thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type",
+                             "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever,
+                     name="metrics-http",
+                     daemon=True).start()
+    logging.info(f"Метрики доступны на порту {port}: /metrics")
+    return server
+
+
+class MetricsFileExporter:
+    """Appends a snapshot of the registry to a file every `interval_s`
+    seconds; the file is rotated by size."""
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 path: str,
+                 interval_s: float = 15.0,
+                 max_mb: float = 5.0,
+                 backup_count: int = 3) -> None:
+        self.registry = registry
+        self.interval_s = interval_s
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=int(max_mb * 1024 * 1024),
+            backupCount=backup_count,
+            encoding="utf-8"
+        )
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name="metrics-file",
+                                        daemon=True)
+        self._thread.start()
+        logging.info(f"Метрики записываются в файл: {path}")
+
+    def write_snapshot(self) -> None:
+        snapshot = (f"# snapshot {datetime.now().isoformat(timespec='seconds')}"
+                    f"\n{self.registry.render()}")
+        self._handler.emit(logging.makeLogRecord({"msg": snapshot}))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_s):
+            try:
+                self.write_snapshot()
+            except Exception:
+                logging.error("Не удалось записать метрики в файл")
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.write_snapshot()
+        self._handler.close()
+
+
+def configure_metrics(app_config: dict):
+    """Enables METRICS and starts the configured exporter.
+
+    Returns the exporter, or None if metrics are disabled or the exporter
+    could not be started (then stages are still recorded).
+    """
+    metrics_config = app_config.get('metrics', {})
+    if not metrics_config.get('enabled', False):
+        return None
+
+    METRICS.enabled = True
+    exporter = metrics_config.get('exporter', 'http')
+    try:
+        if exporter == 'http':
+            return start_http_exporter(METRICS,
+                                       port=metrics_config.get('http_port',
+                                                               9464))
+        if exporter == 'file':
+            return MetricsFileExporter(
+                METRICS,
+                path=metrics_config.get('file_path', './logs/metrics.prom'),
+                interval_s=metrics_config.get('file_interval_s', 15),
+                max_mb=metrics_config.get('file_max_mb', 5),
+                backup_count=metrics_config.get('file_backup_count', 3)
+            )
+        logging.error(f"Неизвестный экспорт метрик: {exporter}")
+    except OSError:
+        logging.error(f"Не удалось запустить экспорт метрик ({exporter})")
+    return None
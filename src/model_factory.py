@@ -0,0 +1,112 @@
+"""Sentiment model construction from config.yaml without Streamlit.
+
+Used by the Streamlit loaders in model_loader.py and by command-line
+tools that run the models outside the app.
+"""
+import logging
+from typing import TYPE_CHECKING, Callable, Optional
+
+import yaml
+
+from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+from src.models.logreg_classifier import LogRegClassifier
+from src.models.prediction_cache import PredictionCache
+from src.models.cascade_classifier import CascadeClassifier
+
+if TYPE_CHECKING:
+    from src.models.bert_classifier import BertClassifier
+
+
+def read_config(config_path: str) -> dict:
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def build_prediction_cache(app_config: dict) -> PredictionCache:
+    cache_config = app_config.get('prediction_cache', {})
+    return PredictionCache(
+        max_entries=cache_config.get('max_entries', 4096),
+        max_mb=cache_config.get('max_mb', 64)
+    )
+
+
+def build_logreg_classifier(app_config: dict,
+                            cache: Optional[PredictionCache] = None,
+                            model_id: str = "logreg") -> LogRegClassifier:
+    """Raises KeyError if the config misses a required setting."""
+    logging.info("Sentiment Model: Log Reg Loading...")
+    stopwords_path = app_config['preprocessor']['stopwords_path']
+    sent_config = app_config['sentiment_model']
+    model_path = sent_config['logreg_clf_path']
+    explain_mode = sent_config.get('logreg_explain_mode',
+                                   LogRegClassifier.EXPLAIN_MODE_LINEAR)
+    preprocessor = LogRegPreprocessor(stopwords_path=stopwords_path)
+    return LogRegClassifier(preprocessor=preprocessor, 
+                            model_path=model_path,
+                            explain_mode=explain_mode,
+                            cache=cache,
+                            model_id=model_id)
+
+
+def build_bert_classifier(app_config: dict,
+                          cache: Optional[PredictionCache] = None,
+                          model_id: str = "bert",
+                          micro_batching: bool = True) -> "BertClassifier":
+    """Raises KeyError if the config misses a required setting.
+
+    micro_batching=False skips the cross-session batcher, for callers
+    that already pass whole batches to predict_batch. torch and
+    transformers are imported here, on the first BERT load.
+    """
+    from src.preprocessors.bert_preprocessor import BertPreprocessor
+    from src.models.bert_classifier import BertClassifier
+
+    logging.info("Sentiment Model: Bert Loading...")
+    sent_config = app_config['sentiment_model']
+    model_dir = sent_config['bert_clf_dir']
+    padding = sent_config.get('bert_padding', 'longest')
+    bucket_size = sent_config.get('bert_bucket_size', 32)
+    micro_batch_size = (sent_config.get('bert_micro_batch_size', 0)
+                        if micro_batching else 0)
+    micro_batch_wait_ms = sent_config.get('bert_micro_batch_wait_ms', 2)
+    backend = sent_config.get('bert_backend', 'torch')
+    onnx_quantize = sent_config.get('bert_onnx_quantize', True)
+    explain_mode = sent_config.get('bert_explain_mode', 
+                                   BertClassifier.EXPLAIN_MODE_SHAP)
+    ig_steps = sent_config.get('bert_ig_steps', 8)
+    preprocessor = BertPreprocessor()
+    return BertClassifier(preprocessor=preprocessor, 
+                          model_dir=model_dir,
+                          padding=padding,
+                          bucket_size=bucket_size,
+                          micro_batch_size=micro_batch_size,
+                          micro_batch_wait_ms=micro_batch_wait_ms,
+                          backend=backend,
+                          onnx_quantize=onnx_quantize,
+                          cache=cache,
+                          model_id=model_id,
+                          explain_mode=explain_mode,
+                          ig_steps=ig_steps)
+
+
+def build_cascade_classifier(
+        app_config: dict,
+        fast: Optional[LogRegClassifier] = None,
+        accurate_provider: Optional[Callable[[], object]] = None,
+        cache: Optional[PredictionCache] = None,
+        model_id: str = "auto") -> CascadeClassifier:
+    """LogReg first, BERT for the texts LogReg is unsure about. Without
+    `accurate_provider` BERT is loaded right away, for command-line use.
+    """
+    fast = fast or build_logreg_classifier(app_config, cache=cache)
+    if accurate_provider is None:
+        accurate = build_bert_classifier(app_config, 
+                                         cache=cache, 
+                                         micro_batching=False)
+        accurate_provider = lambda: accurate
+    escalate_below = app_config['sentiment_model'].get('auto_escalate_below',
+                                                       0.5)
+    return CascadeClassifier(fast=fast,
+                             accurate_provider=accurate_provider,
+                             escalate_below=escalate_below,
+                             model_id=model_id)
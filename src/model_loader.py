@@ -1,25 +1,54 @@
 import logging
+from typing import TYPE_CHECKING, Callable, Optional
 import streamlit as st
-from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
-from src.preprocessors.bert_preprocessor import BertPreprocessor
 from src.models.logreg_classifier import LogRegClassifier
-from src.models.bert_classifier import BertClassifier
-from src.models.llm_cpu_handler import LLMCPUChatbot
-from src.models.gemini_handler import GeminiChatbot
-from src.config_and_settings import GEMINI_API_KEY
+from src.models.prediction_cache import PredictionCache
+from src.models.cascade_classifier import CascadeClassifier
+from src.async_explain import ExplainPool
+from src.metrics import METRICS, configure_metrics
+from src.model_factory import (build_prediction_cache,
+                               build_logreg_classifier,
+                               build_bert_classifier,
+                               build_cascade_classifier)
+from src.model_registry import ModelRegistry
+from src.config_and_settings import (get_gemini_key,
+                                     MODEL_ID_LOGREG, MODEL_ID_BERT,
+                                     MODEL_ID_AUTO, MODEL_ID_LLM)
+
+# torch, transformers, llama_cpp and google-genai are imported by the
+# builders below on first use, not when the app starts
+if TYPE_CHECKING:
+    from src.models.bert_classifier import BertClassifier
+    from src.models.llm_cpu_handler import LLMCPUChatbot
+    from src.models.gemini_handler import GeminiChatbot
+
+@st.cache_resource
+def load_metrics_cached(app_config: dict):
+    """Enables metrics and starts their exporter once per process."""
+    return configure_metrics(app_config)
+
+@st.cache_resource
+def load_prediction_cache_cached(app_config: dict) -> PredictionCache:
+    """Creates the prediction cache shared by all sessions."""
+    return build_prediction_cache(app_config)
+
+@st.cache_resource
+def load_explain_pool_cached(app_config: dict) -> ExplainPool:
+    """Creates the explanation worker pool shared by all sessions."""
+    explain_config = app_config.get('async_explain', {})
+    return ExplainPool(max_workers=explain_config.get('max_workers', 2))
 
 @st.cache_resource(show_spinner="Загрузка модели настроения...")
 def load_sentiment_logreg_cached(app_config: dict) -> LogRegClassifier | None:
     """Caches and loads the sentiment analysis model LOGREG."""
 
     try:
-        logging.info("Sentiment Model: Log Reg Loading...")
-        stopwords_path = app_config['preprocessor']['stopwords_path']
-        sent_config = app_config['sentiment_model']
-        model_path = sent_config['logreg_clf_path']
-        preprocessor = LogRegPreprocessor(stopwords_path=stopwords_path)
-        model = LogRegClassifier(preprocessor=preprocessor, 
-                                    model_path=model_path)
+        with METRICS.timer("model_load", MODEL_ID_LOGREG):
+            model = build_logreg_classifier(
+                app_config,
+                cache=load_prediction_cache_cached(app_config),
+                model_id=MODEL_ID_LOGREG
+            )
             
         return model if model.is_ready else None
     
@@ -32,67 +61,182 @@ def load_sentiment_logreg_cached(app_config: dict) -> LogRegClassifier | None:
         st.error(f"Не удалось загрузить модель настроения")
         return None
     
-@st.cache_resource(show_spinner="Загрузка модели настроения...")
-def load_sentiment_bert_cached(app_config: dict) -> BertClassifier | None:
-    """Caches and loads the sentiment analysis model BERT."""
-
+def build_sentiment_bert(app_config: dict, 
+                         cache: PredictionCache) -> "BertClassifier | None":
+    """Loads BERT; runs in a ModelRegistry thread, so errors are
+    logged and shown by the UI from the model status."""
     try:
-        logging.info("Sentiment Model: Bert Loading...")
-        sent_config = app_config['sentiment_model']
-        model_dir = sent_config['bert_clf_dir']
-        preprocessor = BertPreprocessor()
-        model = BertClassifier(preprocessor=preprocessor, 
-                                model_dir=model_dir)
-            
+        with METRICS.timer("model_load", MODEL_ID_BERT):
+            model = build_bert_classifier(app_config,
+                                          cache=cache,
+                                          model_id=MODEL_ID_BERT)
         return model if model.is_ready else None
     
     except KeyError as e:
         logging.error(f"Ошибка конфигурации при загрузке Bert")
-        st.error(f"Ошибка конфигурации при загрузке модели настроения")
         return None
     except Exception as e:
         logging.error(f"Не удалось загрузить Bert")
-        st.error(f"Не удалось загрузить модель настроения")
         return None
 
-@st.cache_resource(show_spinner="Загрузка ИИ-модели...")
-def load_llm_chatbot_cached(app_config: dict
-                            ) -> LLMCPUChatbot | GeminiChatbot | None:
-    """Caches and loads the LLM chatbot model."""
+def build_llm_cpu_chatbot(llm_cpu_config: dict,
+                          on_status: Optional[Callable[[str], None]] = None
+                          ) -> "LLMCPUChatbot":
+    """Raises KeyError if the config misses a required setting;
+    `on_status` receives the load progress."""
+    from src.models.llm_cpu_handler import LLMCPUChatbot
+
+    model_local_dir = llm_cpu_config['model_local_dir']
+    model_url_repo = llm_cpu_config['model_url_repo']
+    model_filename = llm_cpu_config['model_filename']
+    prompt_cache_mb = llm_cpu_config.get('prompt_cache_mb', 1024)
+    n_ctx = llm_cpu_config.get('n_ctx', 4096)
+    history_budget_tokens = llm_cpu_config.get('history_budget_tokens', 2048)
+    max_message_tokens = llm_cpu_config.get('max_message_tokens', 384)
+    max_tokens = llm_cpu_config.get('max_tokens', 120)
+    queue_max_size = llm_cpu_config.get('queue_max_size', 16)
+    queue_max_per_session = llm_cpu_config.get('queue_max_per_session', 2)
+    queue_max_wait_s = llm_cpu_config.get('queue_max_wait_s', 120)
+    speculative_decoding = llm_cpu_config.get('speculative_decoding', False)
+    speculative_ngram_size = llm_cpu_config.get('speculative_ngram_size', 2)
+    speculative_draft_tokens = llm_cpu_config.get('speculative_draft_tokens', 
+                                                  10)
+    tuning_profiles_path = llm_cpu_config.get('tuning_profiles_path')
+    with METRICS.timer("model_load", LLMCPUChatbot.MODEL_ID):
+        return LLMCPUChatbot(model_local_dir=model_local_dir,
+                             model_url_repo=model_url_repo,
+                             model_filename=model_filename,
+                             prompt_cache_mb=prompt_cache_mb,
+                             n_ctx=n_ctx,
+                             history_budget_tokens=history_budget_tokens,
+                             max_message_tokens=max_message_tokens,
+                             max_tokens=max_tokens,
+                             queue_max_size=queue_max_size,
+                             queue_max_per_session=queue_max_per_session,
+                             queue_max_wait_s=queue_max_wait_s,
+                             speculative_decoding=speculative_decoding,
+                             speculative_ngram_size=speculative_ngram_size,
+                             speculative_draft_tokens=speculative_draft_tokens,
+                             tuning_profiles_path=tuning_profiles_path,
+                             on_status=on_status)
+
+def build_llm_chatbot(app_config: dict,
+                      on_status: Optional[Callable[[str], None]] = None
+                      ) -> "LLMCPUChatbot | GeminiChatbot | None":
+    """Loads the LLM chatbot; runs in a ModelRegistry thread, so errors
+    are logged and shown by the UI from the model status, and progress
+    and failure reasons are passed to `on_status`."""
     try:
         llm_config = app_config['llm_chatbot']
         llm_provider = llm_config['use_model']
 
         if llm_provider == "llm_cpu":
-            llm_cpu_config = llm_config['llm_cpu_chatbot']
-            model_local_dir = llm_cpu_config['model_local_dir']
-            model_url_repo = llm_cpu_config['model_url_repo']
-            model_filename = llm_cpu_config['model_filename']
-            model = LLMCPUChatbot(model_local_dir=model_local_dir,
-                                  model_url_repo=model_url_repo,
-                                  model_filename=model_filename)
+            model = build_llm_cpu_chatbot(llm_config['llm_cpu_chatbot'],
+                                          on_status=on_status)
             
         elif llm_provider == "gemini_api":
-            if not GEMINI_API_KEY:
-                st.error("Gemini не найден")
-                return None
+            from src.models.gemini_handler import GeminiChatbot
+            from src.models.fake_gemini_client import FakeGeminiClient
+
             gemini_settings = llm_config['gemini_api_settings']
+            use_fake_client = gemini_settings.get('use_fake_client', False)
+            gemini_api_key = get_gemini_key()
+            if not gemini_api_key and not use_fake_client:
+                logging.error("Ключ Gemini API не найден, чат-бот "
+                              "Gemini недоступен")
+                if on_status is not None:
+                    on_status("ключ Gemini API не найден")
+                return None
             model_name = gemini_settings["model_name"]
             temperature = gemini_settings["temperature"]
             max_output_tokens = gemini_settings["max_output_tokens"]
+            history_compaction = gemini_settings.get('history_compaction', 
+                                                     True)
+            history_keep_turns = gemini_settings.get('history_keep_turns', 6)
+            history_summary_step = gemini_settings.get(
+                'history_summary_step', 4)
+            summary_max_output_tokens = gemini_settings.get(
+                'summary_max_output_tokens', 200)
+            request_timeout_s = gemini_settings.get('request_timeout_s', 30)
+            first_chunk_timeout_s = gemini_settings.get(
+                'first_chunk_timeout_s', 10)
+            max_attempts = gemini_settings.get('max_attempts', 3)
+            hedge_after_s = gemini_settings.get('hedge_after_s', 0)
+            breaker_failure_threshold = gemini_settings.get(
+                'breaker_failure_threshold', 5)
+            breaker_reset_timeout_s = gemini_settings.get(
+                'breaker_reset_timeout_s', 30)
+            base_url = gemini_settings.get('base_url')
 
-            model = GeminiChatbot(
-                api_key=GEMINI_API_KEY,
-                model_name=model_name,
-                temperature=temperature,
-                max_output_tokens=max_output_tokens
-            )
+            fallback_factory = None
+            if gemini_settings.get('failover_to_local', False):
+                llm_cpu_config = llm_config['llm_cpu_chatbot']
+                fallback_factory = lambda: build_llm_cpu_chatbot(
+                    llm_cpu_config)
+
+            with METRICS.timer("model_load", llm_provider):
+                model = GeminiChatbot(
+                    api_key=gemini_api_key,
+                    model_name=model_name,
+                    temperature=temperature,
+                    max_output_tokens=max_output_tokens,
+                    history_compaction=history_compaction,
+                    history_keep_turns=history_keep_turns,
+                    history_summary_step=history_summary_step,
+                    summary_max_output_tokens=summary_max_output_tokens,
+                    request_timeout_s=request_timeout_s,
+                    first_chunk_timeout_s=first_chunk_timeout_s,
+                    max_attempts=max_attempts,
+                    hedge_after_s=hedge_after_s,
+                    breaker_failure_threshold=breaker_failure_threshold,
+                    breaker_reset_timeout_s=breaker_reset_timeout_s,
+                    fallback_factory=fallback_factory,
+                    base_url=base_url,
+                    client=FakeGeminiClient() if use_fake_client else None
+                )
         else:
-            st.error(f"Неизвестный провайдер LLM: {llm_provider}")
+            logging.error(f"Неизвестный провайдер LLM: {llm_provider}")
             return None
         
         return model if model.is_ready else None
         
     except Exception as e:
-        st.error(f"Не удалось загрузить LLM чат-бота")
+        logging.error(f"Не удалось загрузить LLM чат-бота")
+        return None
+
+@st.cache_resource
+def load_model_registry_cached(app_config: dict) -> ModelRegistry:
+    """Creates the background loader of BERT and the LLM shared by all
+    sessions; the LLM starts loading right away, BERT too unless
+    `model_loading.preload_bert` is off."""
+    loading_config = app_config.get('model_loading', {})
+    registry = ModelRegistry(
+        max_workers=loading_config.get('max_workers', 2)
+    )
+    prediction_cache = load_prediction_cache_cached(app_config)
+    registry.register(MODEL_ID_BERT, 
+                      lambda: build_sentiment_bert(app_config, 
+                                                   prediction_cache))
+    registry.register(MODEL_ID_LLM, lambda: build_llm_chatbot(
+        app_config,
+        on_status=lambda detail: registry.set_detail(MODEL_ID_LLM, detail)))
+
+    registry.request(MODEL_ID_LLM)
+    if loading_config.get('preload_bert', True):
+        registry.request(MODEL_ID_BERT)
+    return registry
+
+@st.cache_resource
+def load_sentiment_auto_cached(app_config: dict) -> CascadeClassifier | None:
+    """The "auto" model: LogReg, with uncertain texts rescored by BERT
+    once the registry has loaded it (LogReg alone until then)."""
+    logreg_model = load_sentiment_logreg_cached(app_config)
+    if logreg_model is None:
         return None
+    model_registry = load_model_registry_cached(app_config)
+    return build_cascade_classifier(
+        app_config,
+        fast=logreg_model,
+        accurate_provider=lambda: model_registry.get(MODEL_ID_BERT),
+        model_id=MODEL_ID_AUTO
+    )
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ModelRegistry:
+    """Loads models in background threads, shared by all sessions, and
+    tracks the readiness of each one.
+
+    A model is registered with its loader and loaded on the first
+    `request` (or `get`); a loader returning None or raising marks the
+    model as failed. A loader can describe its progress or the reason it
+    failed with `set_detail`, for the UI to show. Startup phases measured by the app (`record`) and
+    the model loads are collected into a timing report that is logged
+    once, when nothing is loading any more.
+    """
+
+    NOT_REQUESTED = "not_requested"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, max_workers: int = 2) -> None:
+        self.created_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="model-load")
+        self._lock = threading.Lock()
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._details: Dict[str, str] = {}
+        # phase -> (start offset from created_at, duration), seconds
+        self._timings: Dict[str, Tuple[float, float]] = {}
+        self._report_logged = False
+
+    def register(self, model_id: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            self._loaders[model_id] = loader
+
+    def request(self, model_id: str) -> Future:
+        """Starts loading the model unless it is loading or loaded."""
+        with self._lock:
+            future = self._futures.get(model_id)
+            if future is None:
+                future = self._executor.submit(self._load, model_id,
+                                               self._loaders[model_id])
+                self._futures[model_id] = future
+            return future
+
+    def status(self, model_id: str) -> str:
+        with self._lock:
+            future = self._futures.get(model_id)
+        if future is None:
+            return ModelRegistry.NOT_REQUESTED
+        if not future.done():
+            return ModelRegistry.LOADING
+        return (ModelRegistry.READY if future.result() is not None
+                else ModelRegistry.FAILED)
+
+    def set_detail(self, model_id: str, detail: str) -> None:
+        with self._lock:
+            self._details[model_id] = detail
+
+    def detail(self, model_id: str) -> str:
+        """Last progress or failure note of the model's loader, or ""."""
+        with self._lock:
+            return self._details.get(model_id, "")
+
+    def get(self, model_id: str, timeout: Optional[float] = 0) -> Any:
+        """The loaded model, or None if it failed or is not loaded within
+        `timeout` seconds (None - wait until it is)."""
+        future = self.request(model_id)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+
+    def record(self, phase: str, start: float, end: float) -> None:
+        """Records a startup phase by its perf_counter bounds; only the
+        first measurement of a phase counts."""
+        with self._lock:
+            self._timings.setdefault(phase, (start - self.created_at,
+                                             end - start))
+        self._maybe_log_report()
+
+    def startup_report(self) -> List[Tuple[str, float, float]]:
+        """(phase, start offset, duration) in start order; offsets are
+        negative for phases before the registry was created."""
+        with self._lock:
+            return sorted(((phase, start, duration) for phase, (start, duration)
+                           in self._timings.items()), key=lambda row: row[1])
+
+    def _load(self, model_id: str, loader: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            model = loader()
+        except Exception as e:
+            logging.error(f"Модель {model_id} не загружена: {e}")
+            model = None
+        end = time.perf_counter()
+        logging.info(f"Модель {model_id}: "
+                     f"{'загружена' if model is not None else 'ошибка'} "
+                     f"за {end - start:.2f} секунд.")
+        self.record(f"load {model_id}", start, end)
+        return model
+
+    def _maybe_log_report(self) -> None:
+        with self._lock:
+            pending = [model_id for model_id, future in self._futures.items()
+                       if not future.done() and f"load {model_id}"
+                       not in self._timings]
+            if (self._report_logged or pending
+                    or "first_render" not in self._timings):
+                return
+            self._report_logged = True
+        lines = [f"{'phase':<24}{'start, s':>10}{'duration, s':>13}"]
+        for phase, start, duration in self.startup_report():
+            lines.append(f"{phase:<24}{start:>10.2f}{duration:>13.2f}")
+        logging.info("Холодный старт:\n" + "\n".join(lines))
@@ -8,20 +8,62 @@ from typing import List, Optional, Tuple
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
 from src.preprocessors.bert_preprocessor import BertPreprocessor 
+from src.models.micro_batcher import MicroBatcher
+from src.models import onnx_backend
+from src.models.prediction_cache import PredictionCache, normalize_text
+from src.models.gradient_attribution import (gradient_x_input, 
+                                             integrated_gradients)
+from src.models.word_segments import split_words, word_spans
 
 class BertClassifier:
+    EXPLAIN_MODE_SHAP = "shap"
+    EXPLAIN_MODE_GRADIENT = "gradient"
+    EXPLAIN_MODE_INTEGRATED_GRADIENTS = "integrated_gradients"
+
     def __init__(self,
                  preprocessor: BertPreprocessor,
                  model_dir: str,
                  class_names: Optional[List[str]] = None,
-                 device: Optional[str] = None
+                 device: Optional[str] = None,
+                 max_length: int = 64,
+                 padding: str = 'longest',
+                 bucket_size: int = 32,
+                 micro_batch_size: int = 0,
+                 micro_batch_wait_ms: float = 2.0,
+                 backend: str = 'torch',
+                 onnx_quantize: bool = True,
+                 cache: Optional[PredictionCache] = None,
+                 model_id: str = "bert",
+                 explain_mode: str = EXPLAIN_MODE_SHAP,
+                 ig_steps: int = 8
                 ) -> None:
         
         self.preprocessor = preprocessor
+        self.cache = cache
+        self.model_id = model_id
+
+        # explain_mode: 'shap' - partition explainer, 'gradient' and
+        # 'integrated_gradients' (ig_steps interpolation steps in one
+        # batch) - embedding gradients, need the torch backend
+        self.explain_mode = explain_mode
+        self.ig_steps = ig_steps
 
         self.model_dir = model_dir
         self.class_names = class_names or ['negative', 'positive']
 
+        # padding: 'longest' - to the longest text of the (sub-)batch,
+        # 'max_length' - every text to max_length.
+        # bucket_size: batches larger than this are sorted by length and
+        # run in sub-batches of this size, 0 - no bucketing.
+        self.max_length = max_length
+        self.padding = padding
+        self.bucket_size = bucket_size
+
+        # backend: 'torch' - PyTorch model, 'onnx' - onnxruntime session of
+        # the exported (int8 quantized if onnx_quantize) model
+        self.backend = backend
+        self.onnx_quantize = onnx_quantize
+
         if device:
             self.device = torch.device(device)
         else:
@@ -29,9 +71,20 @@ class BertClassifier:
         
         self.tokenizer: Optional[AutoTokenizer] = None
         self.model: Optional[AutoModelForSequenceClassification] = None
+        self.onnx_session = None
 
         self._load_model_and_tokenizer()
 
+        # predict() calls from all sessions share one batched forward pass
+        self.micro_batcher: Optional[MicroBatcher] = None
+        if micro_batch_size > 0 and self.is_ready:
+            self.micro_batcher = MicroBatcher(
+                batch_fn=self.predict_batch,
+                max_batch_size=micro_batch_size,
+                max_wait_ms=micro_batch_wait_ms,
+                name="bert-micro-batcher"
+            )
+
 
     def _load_model_and_tokenizer(self) -> None:
         if not os.path.isdir(self.model_dir):
@@ -39,60 +92,147 @@ class BertClassifier:
             return
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
-            self.model = \
-            AutoModelForSequenceClassification.from_pretrained(self.model_dir)
-            self.model.to(self.device)
-            self.model.eval()
+            if self.backend == 'onnx':
+                self.onnx_session = self._load_onnx_session()
+            else:
+                self.model = self._load_torch_model()
             logging.info(f"""Модель и токенизатор успешно загружены 
-                         из: {self.model_dir}""")
+                         из: {self.model_dir} (backend: {self.backend})""")
         except Exception as e:
             logging.error(f"""Ошибка при загрузке модели/токенизатора 
                           из '{self.model_dir}'""")
             self.model = None
+            self.onnx_session = None
             self.tokenizer = None
 
+    def _load_torch_model(self) -> AutoModelForSequenceClassification:
+        model = \
+        AutoModelForSequenceClassification.from_pretrained(self.model_dir)
+        model.to(self.device)
+        model.eval()
+        return model
+
+    def _load_onnx_session(self):
+        """Loads the ONNX artifact cached next to the model, exporting it
+        from the PyTorch weights first if it is missing or outdated."""
+        path = onnx_backend.onnx_model_path(self.model_dir, 
+                                            self.onnx_quantize)
+        if onnx_backend.is_stale(path, self.model_dir):
+            torch_model = self._load_torch_model().cpu()
+            path = onnx_backend.export_artifacts(torch_model, 
+                                                 self.model_dir, 
+                                                 self.onnx_quantize)
+            del torch_model
+        return onnx_backend.create_session(path)
+
     @property
     def is_ready(self) -> bool:
-        return self.model is not None and self.tokenizer is not None
+        has_backend = self.model is not None or self.onnx_session is not None
+        return has_backend and self.tokenizer is not None
+
+    def _collate(self, input_ids: List[List[int]]
+                 ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Pads token ids into input_ids and attention_mask tensors."""
+        if self.padding == 'max_length':
+            seq_length = self.max_length
+        else:
+            seq_length = max(len(ids) for ids in input_ids)
+
+        input_ids_batch = torch.full((len(input_ids), seq_length), 
+                                     self.tokenizer.pad_token_id, 
+                                     dtype=torch.long)
+        attention_mask_batch = torch.zeros_like(input_ids_batch)
+        for row, ids in enumerate(input_ids):
+            input_ids_batch[row, :len(ids)] = torch.tensor(ids, 
+                                                           dtype=torch.long)
+            attention_mask_batch[row, :len(ids)] = 1
+
+        return input_ids_batch, attention_mask_batch
+
+    def _forward(self, input_ids: List[List[int]]) -> np.ndarray:
+        input_ids_batch, attention_mask_batch = self._collate(input_ids)
+
+        if self.onnx_session is not None:
+            logits = onnx_backend.run_session(self.onnx_session, 
+                                              input_ids_batch, 
+                                              attention_mask_batch)
+        else:
+            with torch.no_grad():
+                outputs = self.model(input_ids_batch.to(self.device), 
+                                     token_type_ids=None, 
+                                     attention_mask=attention_mask_batch.to(
+                                         self.device))
+            logits = outputs.logits
+        
+        probabilities = torch.softmax(logits, dim=1)
+        return probabilities.cpu().numpy()
 
     def _predict_proba_batch(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, len(self.class_names)), dtype=np.float32)
 
-        inputs = self.tokenizer(
+        input_ids = self.tokenizer(
             texts,
-            padding='max_length',
             truncation=True,
-            max_length=64,
-            return_tensors="pt",
+            max_length=self.max_length,
             add_special_tokens=True
-        )
-        
-        input_ids_batch = inputs['input_ids'].to(self.device)
-        attention_mask_batch = inputs['attention_mask'].to(self.device)
+        )['input_ids']
+
+        if not self.bucket_size or len(input_ids) <= self.bucket_size:
+            return self._forward(input_ids)
+
+        # length buckets: similar lengths together, original order restored
+        order = sorted(range(len(input_ids)), 
+                       key=lambda i: len(input_ids[i]))
+        probabilities = np.empty((len(input_ids), len(self.class_names)), 
+                                 dtype=np.float32)
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            probabilities[bucket] = self._forward(
+                [input_ids[i] for i in bucket]
+            )
+        return probabilities
+
+    def predict_batch(self, texts: List[str]) -> List[float]:
+        scores = [0.0] * len(texts)
+
+        # preproccess
+        to_predict = [
+            i for i, text in enumerate(texts) 
+            if text and text.strip() 
+            and self.preprocessor.preprocess(text).strip()
+        ]
+        if not to_predict:
+            return scores
 
-        with torch.no_grad():
-            outputs = self.model(input_ids_batch, 
-                                 token_type_ids=None, 
-                                 attention_mask=attention_mask_batch)
+        probas = self._predict_proba_batch([texts[i] for i in to_predict])
+        for i, proba in zip(to_predict, probas):
+            # [0, 1] -> [-1, 1]
+            scores[i] = 2 * proba[1] - 1
         
-        probabilities = torch.softmax(outputs.logits, dim=1)
-        return probabilities.cpu().numpy()
+        return scores
+
+    def _cached(self, key: tuple, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute((self.model_id,) + key, compute)
 
     def predict(self, text: str) -> float:
         if not text or not text.strip():
             return 0.0
-        
-        # preproccess
-        prepr_text = self.preprocessor.preprocess(text)
-        if not prepr_text or not prepr_text.strip():
-            return 0.0
 
-        proba = self._predict_proba_batch([text])[0]
-        pos_proba = proba[1]
-        
-        # [0, 1] -> [-1, 1]
-        pos_proba = 2 * pos_proba - 1
-        
-        return pos_proba
+        return self._cached(('predict', normalize_text(text)), 
+                            lambda: self._predict(text))
+
+    def _predict(self, text: str) -> float:
+        if self.micro_batcher is not None:
+            return self.micro_batcher(text)
+        return self.predict_batch([text])[0]
+
+    def micro_batching_stats(self) -> dict:
+        if self.micro_batcher is None:
+            return {}
+        return self.micro_batcher.stats()
 
     def _predict_function_shap(self, texts: List[str]) -> np.ndarray:
         prepr_texts = self.preprocessor.preprocess_batch(texts)
@@ -101,9 +241,69 @@ class BertClassifier:
     
     def explain_shap_text(self, text: str) -> List[Tuple[str, float]]:
         if len(text.split()) < 2:
-            logging.info('Explain невозможен: нужно больше слов')
+            logging.debug('Explain невозможен: нужно больше слов')
             return []
 
+        if (self.explain_mode == BertClassifier.EXPLAIN_MODE_SHAP 
+            or self.model is None):
+            explain = self._explain_shap
+        else:
+            explain = self._explain_gradient
+
+        # tokens keep the original spacing, so the key is the exact text
+        return self._cached(('explain', text), lambda: explain(text))
+
+    def _explain_gradient(self, text: str) -> List[Tuple[str, float]]:
+        encoding = self.tokenizer(
+            text,
+            truncation=True,
+            max_length=self.max_length,
+            return_offsets_mapping=True,
+            return_special_tokens_mask=True,
+            return_tensors="pt"
+        )
+        input_ids = encoding['input_ids'].to(self.device)
+        attention_mask = encoding['attention_mask'].to(self.device)
+        special_tokens = encoding['special_tokens_mask'][0].bool()
+
+        # baseline: the same sequence with every word piece padded out
+        baseline_ids = input_ids.clone()
+        baseline_ids[0, ~special_tokens] = self.tokenizer.pad_token_id
+
+        class_explain = 1
+        if self.explain_mode == BertClassifier.EXPLAIN_MODE_INTEGRATED_GRADIENTS:
+            token_scores = integrated_gradients(self.model, 
+                                                input_ids, 
+                                                attention_mask, 
+                                                baseline_ids, 
+                                                target_class=class_explain, 
+                                                steps=self.ig_steps)
+        else:
+            token_scores = gradient_x_input(self.model, 
+                                            input_ids, 
+                                            attention_mask, 
+                                            baseline_ids, 
+                                            target_class=class_explain)
+
+        # word pieces -> words of the original text
+        words = split_words(text)
+        spans = word_spans(text)
+        word_scores = [0.0] * len(words)
+        word_index = 0
+        for (start, end), is_special, score in zip(
+                encoding['offset_mapping'][0].tolist(), 
+                special_tokens.tolist(), 
+                token_scores.tolist()):
+            if is_special or start == end:
+                continue
+            while (word_index < len(spans) - 1 
+                   and start >= spans[word_index][1]):
+                word_index += 1
+            word_scores[word_index] += score
+
+        return list(zip(words, word_scores))
+
+    def _explain_shap(self, text: str) -> List[Tuple[str, float]]:
         mask_token = self.tokenizer.mask_token
         shap_masker = shap.maskers.Text(self.tokenizer, mask_token=mask_token)
         
@@ -0,0 +1,88 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from src.metrics import METRICS
+from src.models.logreg_classifier import LogRegClassifier
+
+
+class CascadeClassifier:
+    """Scores with the fast model and escalates to the accurate one only
+    when the fast score is uncertain, |score| < `escalate_below`.
+
+    The accurate model comes from `accurate_provider`, which returns None
+    while it is not loaded yet; until then the fast score is used. Words
+    are explained by the model whose score is shown.
+    """
+
+    def __init__(self,
+                 fast: LogRegClassifier,
+                 accurate_provider: Callable[[], Optional[object]],
+                 escalate_below: float = 0.5,
+                 model_id: str = "auto") -> None:
+        self.fast = fast
+        self.accurate_provider = accurate_provider
+        self.escalate_below = escalate_below
+        self.model_id = model_id
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.escalations = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.fast.is_ready
+
+    @property
+    def escalation_rate(self) -> float:
+        with self._lock:
+            return self.escalations / self.calls if self.calls else 0.0
+
+    def is_uncertain(self, score: float) -> bool:
+        return abs(score) < self.escalate_below
+
+    def _count(self, calls: int, escalations: int) -> None:
+        with self._lock:
+            self.calls += calls
+            self.escalations += escalations
+        METRICS.increment("sentiment_cascade_total", calls,
+                          model_id=self.model_id)
+        if escalations:
+            METRICS.increment("sentiment_escalations_total", escalations,
+                              model_id=self.model_id)
+
+    def _decide(self, text: str) -> Tuple[object, Optional[float]]:
+        """The model whose score counts for `text`, and the fast score if
+        that is the one."""
+        score = self.fast.predict(text)
+        if not self.is_uncertain(score):
+            return self.fast, score
+        accurate = self.accurate_provider()
+        if accurate is None:
+            return self.fast, score
+        return accurate, None
+
+    def predict(self, text: str) -> float:
+        if not text.strip():
+            return 0.0
+        model, score = self._decide(text)
+        escalated = model is not self.fast
+        self._count(1, int(escalated))
+        return model.predict(text) if escalated else score
+
+    def predict_batch(self, texts: List[str]) -> List[float]:
+        scores = self.fast.predict_batch(texts)
+        uncertain = [i for i, (text, score) in enumerate(zip(texts, scores))
+                     if text.strip() and self.is_uncertain(score)]
+        accurate = self.accurate_provider() if uncertain else None
+        if accurate is not None:
+            accurate_scores = accurate.predict_batch([texts[i]
+                                                      for i in uncertain])
+            for i, score in zip(uncertain, accurate_scores):
+                scores[i] = score
+        self._count(len(texts), 
+                    len(uncertain) if accurate is not None else 0)
+        return scores
+
+    def explain_shap_text(self, text: str) -> List[Tuple[str, float]]:
+        model, _ = self._decide(text)
+        return model.explain_shap_text(text)
@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.models.linear_explainer import (TfidfLinearExplainer,
+                                         is_binary_logistic)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+# flat arrays, every one memory-mapped read-only on load
+ARRAY_FILES = ("idf", "coef", "terms", "term_offsets", "term_table")
+
+
+class CompactVocabulary:
+    """Read-only term -> feature index lookup over flat arrays.
+
+    The terms are stored as one UTF-8 buffer in feature order, `offsets`
+    delimits every term, and `table` is an open-addressing hash table
+    (crc32, linear probing, at most half full) of feature indexes, -1 for
+    an empty slot. A lookup compares the bytes of the term it lands on, so
+    it answers exactly like the vectorizer's `vocabulary_` dict.
+    """
+
+    def __init__(self,
+                 terms: np.ndarray,
+                 offsets: np.ndarray,
+                 table: np.ndarray) -> None:
+        self.terms = terms
+        self.offsets = offsets
+        self.table = table
+        self._mask = len(table) - 1
+
+    @staticmethod
+    def build_arrays(vocabulary: Dict[str, int]) -> Dict[str, np.ndarray]:
+        n_features = len(vocabulary)
+        encoded = [b""] * n_features
+        for term, feature in vocabulary.items():
+            encoded[feature] = term.encode("utf-8")
+
+        offsets = np.zeros(n_features + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(term) for term in encoded])
+        terms = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        size = 1
+        while size < 2 * max(n_features, 1):
+            size *= 2
+        table = np.full(size, -1, dtype=np.int32)
+        for feature, term in enumerate(encoded):
+            slot = zlib.crc32(term) & (size - 1)
+            while table[slot] >= 0:
+                slot = (slot + 1) & (size - 1)
+            table[slot] = feature
+        return {"terms": terms, "term_offsets": offsets, "term_table": table}
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        key = term.encode("utf-8")
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            feature = int(self.table[slot])
+            if feature < 0:
+                return default
+            start, end = self.offsets[feature], self.offsets[feature + 1]
+            if self.terms[start:end].tobytes() == key:
+                return feature
+            slot = (slot + 1) & self._mask
+
+    def __getitem__(self, term: str) -> int:
+        feature = self.get(term)
+        if feature is None:
+            raise KeyError(term)
+        return feature
+
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        for feature in range(len(self)):
+            start, end = self.offsets[feature], self.offsets[feature + 1]
+            yield self.terms[start:end].tobytes().decode("utf-8")
+
+
+class CompactTfidfLogReg:
+    """A fitted `TfidfVectorizer -> LogisticRegression` pipeline read from
+    the compact artifact written by `save_compact`.
+
+    The arrays are memory-mapped, so loading reads only the metadata and
+    processes that load the same artifact share its pages. `predict_proba`
+    returns exactly what the pipeline's does.
+    """
+
+    def __init__(self, explainer: TfidfLinearExplainer,
+                 classes: List) -> None:
+        self.explainer = explainer
+        self.classes_ = np.array(classes)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompactTfidfLogReg':
+        """Raises ValueError for an artifact of another format version."""
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата "
+                             f"{meta.get('format_version')} в {path}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"),
+                                mmap_mode="r")
+                  for name in ARRAY_FILES}
+
+        vocabulary = CompactVocabulary(arrays["terms"],
+                                       arrays["term_offsets"],
+                                       arrays["term_table"])
+        stop_words = meta.get("stop_words")
+        explainer = TfidfLinearExplainer(
+            vocabulary=vocabulary,
+            idf=arrays["idf"],
+            coef=arrays["coef"],
+            intercept=meta["intercept"],
+            analyzer_preprocess=_build_preprocessor(meta["lowercase"],
+                                                    meta["strip_accents"]),
+            analyzer_tokenize=re.compile(meta["token_pattern"]).findall,
+            stop_words=frozenset(stop_words) if stop_words else None,
+            ngram_range=tuple(meta["ngram_range"]),
+            sublinear_tf=meta["sublinear_tf"],
+            binary=meta["binary"],
+            norm=meta["norm"]
+        )
+        return cls(explainer, meta["classes"])
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        pos_proba = np.array([self.explainer.predict_proba(text)
+                              for text in texts], dtype=np.float64)
+        return np.vstack([1 - pos_proba, pos_proba]).T
+
+
+def is_compact_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def save_compact(pipeline, path: str) -> None:
+    """Writes a fitted `TfidfVectorizer -> LogisticRegression` pipeline as
+    a compact artifact directory. Raises ValueError for a pipeline whose
+    predictions the format cannot reproduce exactly."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    steps = getattr(pipeline, "steps", None)
+    if not steps or len(steps) != 2:
+        raise ValueError("Ожидается Pipeline из двух шагов")
+    vectorizer, classifier = steps[0][1], steps[1][1]
+    if (type(vectorizer) is not TfidfVectorizer
+            or vectorizer.analyzer != "word"
+            or vectorizer.preprocessor is not None
+            or vectorizer.tokenizer is not None
+            or vectorizer.input != "content"
+            or np.dtype(vectorizer.dtype) != np.float64
+            or vectorizer.strip_accents not in (None, "ascii", "unicode")):
+        raise ValueError("Поддерживается только TfidfVectorizer со "
+                         "стандартным анализатором слов и dtype float64")
+    if not is_binary_logistic(classifier):
+        raise ValueError("Поддерживается только бинарная LogisticRegression")
+
+    n_features = len(vectorizer.vocabulary_)
+    if vectorizer.use_idf:
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+    else:
+        idf = np.ones(n_features, dtype=np.float64)
+    arrays = {"idf": idf,
+              "coef": np.asarray(classifier.coef_[0], dtype=np.float64)}
+    arrays.update(CompactVocabulary.build_arrays(vectorizer.vocabulary_))
+
+    stop_words = vectorizer.get_stop_words()
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "n_features": n_features,
+        "lowercase": vectorizer.lowercase,
+        "strip_accents": vectorizer.strip_accents,
+        "token_pattern": vectorizer.token_pattern,
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "ngram_range": list(vectorizer.ngram_range),
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "binary": vectorizer.binary,
+        "norm": vectorizer.norm,
+        "intercept": float(classifier.intercept_[0]),
+        "classes": classifier.classes_.tolist(),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"),
+                np.ascontiguousarray(array))
+    # meta.json last: a directory without it is not an artifact yet
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _build_preprocessor(lowercase: bool, strip_accents: Optional[str]):
+    """The vectorizer's `build_preprocessor`: lowercase, then accents."""
+    accent_function = None
+    if strip_accents is not None:
+        from sklearn.feature_extraction.text import (strip_accents_ascii,
+                                                     strip_accents_unicode)
+        accent_function = {"ascii": strip_accents_ascii,
+                           "unicode": strip_accents_unicode}[strip_accents]
+
+    def preprocess(doc: str) -> str:
+        if lowercase:
+            doc = doc.lower()
+        if accent_function is not None:
+            doc = accent_function(doc)
+        return doc
+    return preprocess
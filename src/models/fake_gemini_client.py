@@ -0,0 +1,64 @@
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+
+def _content_text(content) -> str:
+    return "".join(part.text or "" for part in content.parts)
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGeminiClient") -> None:
+        self.client = client
+
+    def _record(self, method: str, contents: list, config) -> None:
+        self.client.requests.append({
+            "method": method,
+            "n_contents": len(contents),
+            "chars": sum(len(_content_text(c)) for c in contents),
+            "system_instruction": getattr(config, "system_instruction", ""),
+        })
+
+    def generate_content_stream(self,
+                                model: str,
+                                contents: list,
+                                config=None) -> Iterator[Any]:
+        self._record("generate_content_stream", contents, config)
+        time.sleep(self.client.latency_s)
+        last_message = _content_text(contents[-1]) if contents else ""
+        reply = f"Понимаю! Вы пишете: «{last_message[:60]}»"
+        words = reply.split(" ")
+        for i in range(0, len(words), self.client.chunk_words):
+            chunk = " ".join(words[i:i + self.client.chunk_words])
+            yield SimpleNamespace(text=chunk if i == 0 else " " + chunk)
+
+    def generate_content(self,
+                         model: str,
+                         contents: list,
+                         config=None) -> Any:
+        self._record("generate_content", contents, config)
+        time.sleep(self.client.latency_s)
+        # drop the prompt headings ("New messages:") and empty summaries
+        lines = [line for c in contents
+                 for line in _content_text(c).splitlines()
+                 if line.strip() not in ("", "-") and not line.endswith(":")]
+        summary = " / ".join(line[:40] for line in lines)
+        return SimpleNamespace(text=summary[-self.client.summary_chars:])
+
+
+class FakeGeminiClient:
+    """Offline stand-in for `genai.Client` with the two calls the chatbot
+    makes. Replies echo the last message, summaries shorten the prompt,
+    and every request is recorded in `requests` (number of contents,
+    characters, system instruction) to check what would have been sent.
+    """
+
+    def __init__(self,
+                 latency_s: float = 0.0,
+                 chunk_words: int = 3,
+                 summary_chars: int = 600) -> None:
+        self.latency_s = latency_s
+        self.chunk_words = max(chunk_words, 1)
+        self.summary_chars = summary_chars
+        self.requests: List[Dict[str, Any]] = []
+        self.models = _FakeModels(self)
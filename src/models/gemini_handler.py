@@ -2,12 +2,22 @@ import logging
 from google import genai
 from google.genai import types
 import os
-from typing import Generator, List, Dict, Any
+import threading
+import time
+from typing import Callable, Generator, List, Dict, Any, Optional
+
+from src.metrics import METRICS
+from src.models.history_compaction import HistoryCompactor, Turn
+from src.models.resilient_transport import (CircuitBreaker, 
+                                            CircuitOpenError, 
+                                            ResilientStreamer)
 
 ChatMessage = Dict[str, Any]
 
 class GeminiChatbot: 
 
+    MODEL_ID = "gemini_api"
+
     DEFAULT_SYSTEM_PROMPT_EN = (
         "You are a witty and supportive AI companion. Your primary goal "
         "is to engage in a natural, lighthearted conversation. "
@@ -27,47 +37,141 @@ class GeminiChatbot:
         "Do NOT mechanically repeat the score in every single message. "
         "Prioritize a engaging chat."
     )
+
+    SUMMARY_PROMPT_EN = (
+        "You maintain a running summary of a chat between a user and an AI "
+        "companion. Update the previous summary with the new messages. "
+        "Keep facts about the user, their mood and open topics. "
+        "Write in Russian, at most 5 sentences, no preamble."
+    )
     
     def __init__(self, 
                  api_key: str, 
                  model_name: str,
                  temperature: float = 0.7,
-                 max_output_tokens: int = 150
+                 max_output_tokens: int = 150,
+                 history_compaction: bool = True,
+                 history_keep_turns: int = 6,
+                 history_summary_step: int = 4,
+                 summary_max_output_tokens: int = 200,
+                 request_timeout_s: float = 30.0,
+                 first_chunk_timeout_s: float = 10.0,
+                 max_attempts: int = 3,
+                 hedge_after_s: float = 0.0,
+                 breaker_failure_threshold: int = 5,
+                 breaker_reset_timeout_s: float = 30.0,
+                 fallback_factory: Optional[Callable[[], Any]] = None,
+                 base_url: Optional[str] = None,
+                 client=None
                 ) -> None:
 
-        if not api_key:
+        if client is not None:
+            # e.g. FakeGeminiClient for offline runs
+            self.client = client
+        elif not api_key:
             logging.error("API для Gemini не предоставлен")
             self.client = None
             return
-
-        try:
-            self.client = genai.Client(api_key=api_key)
-        except Exception as e:
-            logging.error(f"Не удалось создать GeminiChatbot")
-            self.client = None
-            return
+        else:
+            # one client per chatbot: its HTTP connection pool is reused by
+            # all requests; the timeout also ends abandoned hedged reads
+            http_options = types.HttpOptions(
+                timeout=int(request_timeout_s * 1000),
+                base_url=base_url
+            )
+            try:
+                self.client = genai.Client(api_key=api_key, 
+                                           http_options=http_options)
+            except Exception as e:
+                logging.error(f"Не удалось создать GeminiChatbot")
+                self.client = None
+                return
 
         self.model_name = model_name
         self.temperature=temperature
         self.max_output_tokens=max_output_tokens
         self.system_prompt=GeminiChatbot.DEFAULT_SYSTEM_PROMPT_EN
+        self.summary_max_output_tokens = summary_max_output_tokens
+        self.compactor: Optional[HistoryCompactor] = None
+        if history_compaction:
+            self.compactor = HistoryCompactor(
+                summarize=self._summarize,
+                keep_last_turns=history_keep_turns,
+                summary_step=history_summary_step,
+                model_id=self.MODEL_ID
+            )
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=breaker_failure_threshold,
+            reset_timeout_s=breaker_reset_timeout_s,
+            name=self.MODEL_ID
+        )
+        self.streamer = ResilientStreamer(
+            request_timeout_s=request_timeout_s,
+            first_chunk_timeout_s=first_chunk_timeout_s,
+            max_attempts=max_attempts,
+            hedge_after_s=hedge_after_s,
+            breaker=self.breaker,
+            name=self.MODEL_ID
+        )
+        self.fallback_factory = fallback_factory
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+
+    def _fallback_chatbot(self):
+        """The local chatbot to fail over to, built on first use."""
+        if self.fallback_factory is None:
+            return None
+        with self._fallback_lock:
+            if self._fallback is None:
+                logging.warning("Gemini недоступен, загрузка локальной LLM")
+                self._fallback = self.fallback_factory()
+                if self._fallback is None or not self._fallback.is_ready:
+                    # do not retry a failed load on every message
+                    self.fallback_factory = None
+                    self._fallback = None
+        return self._fallback
 
 
     def _prepare_contents_with_system_prompt(
             self, 
-            chat_history: List[ChatMessage],
+            chat_history: List[Turn],
             current_user_message_with_sentiment: str
         ) -> List[types.Content]:
 
         contents = []
         
-        for entry in chat_history:
-            role = "user" if entry["role"] == "user" else "model"
-            contents.append(types.Content(parts=[types.Part(text=entry["content"])], role=role))
+        for role, content in chat_history:
+            role = "user" if role == "user" else "model"
+            contents.append(types.Content(parts=[types.Part(text=content)], role=role))
         
         contents.append(types.Content(parts=[types.Part(text=current_user_message_with_sentiment)], role="user"))
         
         return contents
+
+    def _system_instruction(self, summary: str) -> str:
+        if not summary:
+            return self.system_prompt
+        return (f"{self.system_prompt}\n\n"
+                f"Summary of the earlier conversation: {summary}")
+
+    def _summarize(self, previous_summary: str, turns: List[Turn]) -> str:
+        """Folds new turns into the running summary; called in the
+        background by the compactor."""
+        messages = "\n".join(f"{role}: {content}" for role, content in turns)
+        prompt = (f"Previous summary:\n{previous_summary or '-'}\n\n"
+                  f"New messages:\n{messages}")
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=[types.Content(parts=[types.Part(text=prompt)], 
+                                    role="user")],
+            config=types.GenerateContentConfig(
+                temperature=0.2,
+                max_output_tokens=self.summary_max_output_tokens,
+                system_instruction=GeminiChatbot.SUMMARY_PROMPT_EN
+            )
+        )
+        return (response.text or previous_summary).strip()
     
     @property
     def is_ready(self) -> bool:
@@ -77,7 +181,10 @@ class GeminiChatbot:
                           user_message: str, 
                           user_sentiment_label: str, 
                           user_sentiment_score: float, 
-                          chat_history: List[ChatMessage]
+                          chat_history: List[ChatMessage],
+                          session_id: Optional[str] = None,
+                          on_queue_position: Optional[
+                              Callable[[int], None]] = None
                           ) -> Generator[str, None, None]:
         
         if not self.client:
@@ -89,26 +196,70 @@ class GeminiChatbot:
         full_user_message_with_sentiment = \
             f"{current_user_sentiment_info_str}{user_message}"
 
+        history_turns = [(entry["role"], entry["content"]) 
+                         for entry in chat_history]
+        summary, verbatim_turns = "", history_turns
+        if self.compactor is not None:
+            summary, verbatim_turns = self.compactor.compact(history_turns)
+
         contents_for_gemini = self._prepare_contents_with_system_prompt(
-            chat_history, 
+            verbatim_turns, 
             full_user_message_with_sentiment
         )
         
-        try:
-
+        def open_stream():
             response = self.client.models.generate_content_stream(
                 model=self.model_name,
                 contents=contents_for_gemini,
                 config=types.GenerateContentConfig(
                     temperature=self.temperature,
                     max_output_tokens=self.max_output_tokens,
-                    system_instruction=self.system_prompt
+                    system_instruction=self._system_instruction(summary)
                     )
             )
+            return (chunk.text or "" for chunk in response)
 
-            for chunk in response:
-                yield chunk.text
+        start_time = time.perf_counter()
+        reply = ""
+        try:
+            for i, text in enumerate(self.streamer.stream(open_stream)):
+                if i == 0:
+                    METRICS.observe("llm_first_token", 
+                                    time.perf_counter() - start_time, 
+                                    self.MODEL_ID)
+                METRICS.increment("llm_stream_chunks_total", 
+                                  model_id=self.MODEL_ID)
+                reply += text
+                yield text
+            METRICS.observe("llm_generation", 
+                            time.perf_counter() - start_time, 
+                            self.MODEL_ID)
+
+            if self.compactor is not None:
+                self.compactor.schedule_update(
+                    history_turns + [("user", user_message), 
+                                     ("assistant", reply)]
+                )
                 
         except Exception as e:
-            logging.error(f"Ошибка генерации ответа Gemini")
+            if not isinstance(e, CircuitOpenError):
+                METRICS.increment("chat_stage_errors_total", 
+                                  stage="llm_generation", 
+                                  model_id=self.MODEL_ID)
+                logging.error(f"Ошибка генерации ответа Gemini")
+
+            # a reply cut mid-stream is not restarted by another model
+            fallback = None if reply else self._fallback_chatbot()
+            if fallback is not None:
+                METRICS.increment("llm_failovers_total", 
+                                  model_id=self.MODEL_ID)
+                yield from fallback.generate_response(
+                    user_message,
+                    user_sentiment_label,
+                    user_sentiment_score,
+                    chat_history,
+                    session_id=session_id,
+                    on_queue_position=on_queue_position
+                )
+                return
             yield f" [Произошла ошибка в Gemini. Попробуй еще раз] "
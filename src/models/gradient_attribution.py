@@ -0,0 +1,58 @@
+import torch
+
+
+def integrated_gradients(model: torch.nn.Module,
+                         input_ids: torch.Tensor,
+                         attention_mask: torch.Tensor,
+                         baseline_ids: torch.Tensor,
+                         target_class: int = 1,
+                         steps: int = 8) -> torch.Tensor:
+    """Per-token attributions to the probability of `target_class`.
+
+    Integrated gradients from the embeddings of `baseline_ids` to the
+    embeddings of `input_ids` (a single sequence, shape (1, seq_len)),
+    approximated with the midpoint rule. All `steps` interpolated inputs
+    go through the model as one batch: one forward and one backward pass.
+    With steps=1 this is gradient x (input - baseline) at the midpoint.
+
+    The attributions add up approximately to
+    p(target | input) - p(target | baseline).
+    """
+    embeddings = model.get_input_embeddings()
+    with torch.no_grad():
+        input_embeds = embeddings(input_ids)
+        baseline_embeds = embeddings(baseline_ids)
+    delta = input_embeds - baseline_embeds
+
+    alphas = (torch.arange(steps, dtype=input_embeds.dtype,
+                           device=input_embeds.device) + 0.5) / steps
+    path_embeds = baseline_embeds + alphas.view(-1, 1, 1) * delta
+    path_embeds.requires_grad_(True)
+
+    logits = model(inputs_embeds=path_embeds,
+                   attention_mask=attention_mask.expand(steps, -1)).logits
+    target_proba = torch.softmax(logits, dim=1)[:, target_class]
+    grads, = torch.autograd.grad(target_proba.sum(), path_embeds)
+
+    return (grads.mean(dim=0) * delta[0]).sum(dim=-1).detach()
+
+
+def gradient_x_input(model: torch.nn.Module,
+                     input_ids: torch.Tensor,
+                     attention_mask: torch.Tensor,
+                     baseline_ids: torch.Tensor,
+                     target_class: int = 1) -> torch.Tensor:
+    """Gradient at the input x (input - baseline) embeddings: one forward and
+    one backward pass."""
+    embeddings = model.get_input_embeddings()
+    with torch.no_grad():
+        input_embeds = embeddings(input_ids)
+        delta = input_embeds - embeddings(baseline_ids)
+    input_embeds.requires_grad_(True)
+
+    logits = model(inputs_embeds=input_embeds,
+                   attention_mask=attention_mask).logits
+    target_proba = torch.softmax(logits, dim=1)[0, target_class]
+    grads, = torch.autograd.grad(target_proba, input_embeds)
+
+    return (grads[0] * delta[0]).sum(dim=-1).detach()
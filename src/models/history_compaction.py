@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from src.metrics import METRICS
+
+Turn = Tuple[str, str]
+
+
+def turn_fingerprints(turns: List[Turn]) -> List[str]:
+    """Hash chain over the turns: element i identifies turns[:i + 1]."""
+    fingerprints = []
+    digest = b""
+    for role, content in turns:
+        digest = hashlib.blake2b(digest + role.encode("utf-8") + b"\0"
+                                 + content.encode("utf-8"),
+                                 digest_size=16).digest()
+        fingerprints.append(digest.hex())
+    return fingerprints
+
+
+class HistoryCompactor:
+    """Running summary of the older part of a conversation.
+
+    The last `keep_last_turns` turns are sent verbatim; older turns are
+    replaced by a summary. After each reply `schedule_update` folds the
+    next `summary_step` turns that left the verbatim window into the
+    previous summary in a background thread, so summarizing is never on
+    the critical path. Until it finishes, requests send those turns
+    verbatim.
+
+    Summaries are keyed by the fingerprint of the turns they cover, so
+    conversations of all sessions share one compactor without ids and an
+    edited history simply misses the cache.
+    """
+
+    def __init__(self,
+                 summarize: Callable[[str, List[Turn]], str],
+                 keep_last_turns: int = 6,
+                 summary_step: int = 4,
+                 max_summaries: int = 1024,
+                 model_id: str = "") -> None:
+        self.summarize = summarize
+        self.keep_last_turns = keep_last_turns
+        self.summary_step = max(summary_step, 1)
+        self.max_summaries = max_summaries
+        self.model_id = model_id
+
+        self._lock = threading.Lock()
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: set = set()
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="history-summary")
+
+    def _boundaries(self, n_turns: int) -> range:
+        """Summary boundaries of a history, from the latest one down."""
+        limit = n_turns - self.keep_last_turns
+        latest = limit - limit % self.summary_step if limit > 0 else 0
+        return range(latest, 0, -self.summary_step)
+
+    def _latest_summary(self,
+                        fingerprints: List[str],
+                        below: Optional[int] = None) -> Tuple[int, str]:
+        for n in self._boundaries(len(fingerprints)):
+            if below is not None and n >= below:
+                continue
+            summary = self._summaries.get(fingerprints[n - 1])
+            if summary is not None:
+                self._summaries.move_to_end(fingerprints[n - 1])
+                return n, summary
+        return 0, ""
+
+    def compact(self, turns: List[Turn]) -> Tuple[str, List[Turn]]:
+        """Returns the summary of the older turns (or "") and the turns to
+        send verbatim."""
+        fingerprints = turn_fingerprints(turns)
+        with self._lock:
+            n_summarized, summary = self._latest_summary(fingerprints)
+        return summary, turns[n_summarized:]
+
+    def schedule_update(self, turns: List[Turn]) -> Optional[Future]:
+        """Folds the turns that left the verbatim window into the summary
+        in the background. Returns None if there is nothing to do."""
+        boundaries = self._boundaries(len(turns))
+        if not boundaries:
+            return None
+        target = boundaries[0]
+        fingerprints = turn_fingerprints(turns)
+        key = fingerprints[target - 1]
+
+        with self._lock:
+            if key in self._summaries or key in self._pending:
+                return None
+            base, summary = self._latest_summary(fingerprints, below=target)
+            self._pending.add(key)
+
+        return self._executor.submit(self._update, key, summary,
+                                     turns[base:target])
+
+    def _update(self, key: str, summary: str, new_turns: List[Turn]) -> None:
+        try:
+            with METRICS.timer("history_summary", self.model_id):
+                new_summary = self.summarize(summary, new_turns)
+        except Exception as e:
+            logging.error("Не удалось обновить сводку истории")
+            return
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+        with self._lock:
+            self._summaries[key] = new_summary
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional
+
+from src.models.compact_tfidf import CompactTfidfLogReg
+from src.models.linear_explainer import TfidfLinearExplainer
+from src.models.logreg_classifier import LogRegClassifier
+
+
+class IncrementalDraftScorer:
+    """Scores a draft that is edited at the end, re-preprocessing only the
+    words that changed.
+
+    Every preprocessing rule works inside a run of non-space characters,
+    so the draft is kept as its whitespace-separated words with their
+    vectorizer tokens and the term counts of the whole draft. On an edit
+    the words after the common prefix are preprocessed again, and only the
+    n-grams that touch them are removed from and added to the counts; an
+    edit at the start of the draft is simply a full recompute.
+
+    The l2 norm couples all the terms, so the log-odds is not updated term
+    by term: `positive_proba` recomputes it from the counts over the
+    draft's distinct terms, and the score is identical to
+    `LogRegClassifier.predict` of the same text.
+    """
+
+    def __init__(self,
+                 classifier: LogRegClassifier,
+                 explainer: TfidfLinearExplainer) -> None:
+        self.classifier = classifier
+        self.explainer = explainer
+
+        self.preprocessed_words = 0
+        self.full_recomputes = 0
+        self.reset()
+
+    @classmethod
+    def from_classifier(cls, classifier
+                        ) -> Optional['IncrementalDraftScorer']:
+        """Builds the scorer for a TF-IDF + binary logistic regression
+        `LogRegClassifier`, or returns None for any other model."""
+        if not isinstance(classifier, LogRegClassifier) \
+                or not classifier.is_ready:
+            return None
+        if isinstance(classifier.model, CompactTfidfLogReg):
+            return cls(classifier, classifier.model.explainer)
+        explainer = (classifier.linear_explainer
+                     or TfidfLinearExplainer.from_pipeline(classifier.model))
+        if explainer is None:
+            return None
+        return cls(classifier, explainer)
+
+    def reset(self) -> None:
+        self._words: List[str] = []
+        self._word_starts: List[int] = []  # first token of every word
+        self._word_has_text: List[bool] = []
+        self._tokens: List[str] = []
+        self._counts: Dict[int, int] = {}
+
+    def score(self, text: str) -> float:
+        """Sentiment score of `text` in [-1, 1], as `predict` returns it."""
+        words = text.split()
+        common = 0
+        for old, new in zip(self._words, words):
+            if old != new:
+                break
+            common += 1
+        if common == 0 and self._words:
+            self.full_recomputes += 1
+
+        first_token = (self._word_starts[common] if common < len(self._words)
+                       else len(self._tokens))
+        self._update_counts(first_token, -1)
+        del self._words[common:]
+        del self._word_starts[common:]
+        del self._word_has_text[common:]
+        del self._tokens[first_token:]
+
+        for word in words[common:]:
+            prepr_word = self.classifier.preprocessor.preprocess(word)
+            tokens, _ = self.explainer._tokenize([prepr_word])
+            self._words.append(word)
+            self._word_starts.append(len(self._tokens))
+            self._word_has_text.append(bool(prepr_word))
+            self._tokens.extend(tokens)
+        self.preprocessed_words += len(words) - common
+        self._update_counts(first_token, 1)
+
+        if not any(self._word_has_text):
+            return 0.0
+        return self._score()
+
+    def _update_counts(self, first_token: int, sign: int) -> None:
+        """Adds (or removes) the vocabulary n-grams that end at or after
+        `first_token`."""
+        vocabulary, tokens, counts = (self.explainer.vocabulary,
+                                      self._tokens, self._counts)
+        min_n, max_n = self.explainer.ngram_range
+        for n in range(min_n, max_n + 1):
+            for start in range(max(0, first_token - n + 1),
+                               len(tokens) - n + 1):
+                term = (tokens[start] if n == 1
+                        else " ".join(tokens[start:start + n]))
+                feature = vocabulary.get(term)
+                if feature is None:
+                    continue
+                count = counts.get(feature, 0) + sign
+                if count:
+                    counts[feature] = count
+                else:
+                    del counts[feature]
+
+    def _score(self) -> float:
+        pos_proba = self.explainer.positive_proba(self._counts)
+
+        # [0, 1] -> [-1, 1]
+        return 2 * pos_proba - 1
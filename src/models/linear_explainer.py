@@ -0,0 +1,225 @@
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.special import expit
+
+
+class TfidfLinearExplainer:
+    """Exact word contributions for a TF-IDF + linear classifier pipeline.
+
+    The log-odds of such a model is `intercept + sum(coef_j * x_j)`, where
+    `x` is the normalized TF-IDF vector, so every term's share of the
+    decision can be read directly from the vocabulary, the IDF weights and
+    `coef_`. Term shares are split between the words that produced them and
+    rescaled to the probability scale, so that, like SHAP values, they add
+    up to the difference between the predicted and the base probability.
+    """
+
+    def __init__(self,
+                 vocabulary: Dict[str, int],
+                 idf: np.ndarray,
+                 coef: np.ndarray,
+                 intercept: float,
+                 analyzer_preprocess: Callable[[str], str],
+                 analyzer_tokenize: Callable[[str], List[str]],
+                 stop_words: Optional[frozenset] = None,
+                 ngram_range: Tuple[int, int] = (1, 1),
+                 sublinear_tf: bool = False,
+                 binary: bool = False,
+                 norm: Optional[str] = 'l2') -> None:
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.analyzer_preprocess = analyzer_preprocess
+        self.analyzer_tokenize = analyzer_tokenize
+        self.stop_words = stop_words
+        self.ngram_range = ngram_range
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+        self.norm = norm
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> Optional['TfidfLinearExplainer']:
+        """Builds the explainer from a fitted `TfidfVectorizer -> binary
+        logistic regression` pipeline, or returns None for any other model:
+        the word shares are rescaled with the sigmoid of the log-odds."""
+        steps = getattr(pipeline, 'steps', None)
+        if not steps or len(steps) != 2:
+            return None
+        vectorizer, classifier = steps[0][1], steps[1][1]
+
+        if (getattr(vectorizer, 'analyzer', None) != 'word'
+                or not hasattr(vectorizer, 'vocabulary_')
+                or not is_binary_logistic(classifier)):
+            return None
+
+        n_features = len(vectorizer.vocabulary_)
+        if getattr(vectorizer, 'use_idf', False):
+            idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+        else:
+            idf = np.ones(n_features, dtype=np.float64)
+
+        stop_words = vectorizer.get_stop_words()
+
+        return cls(
+            vocabulary=vectorizer.vocabulary_,
+            idf=idf,
+            coef=np.asarray(classifier.coef_[0], dtype=np.float64),
+            intercept=classifier.intercept_[0],
+            analyzer_preprocess=vectorizer.build_preprocessor(),
+            analyzer_tokenize=vectorizer.build_tokenizer(),
+            stop_words=frozenset(stop_words) if stop_words else None,
+            ngram_range=vectorizer.ngram_range,
+            sublinear_tf=getattr(vectorizer, 'sublinear_tf', False),
+            binary=vectorizer.binary,
+            norm=vectorizer.norm
+        )
+
+    def _tokenize(self, prepr_texts: Sequence[str]
+                  ) -> Tuple[List[str], List[int]]:
+        """Returns vectorizer tokens and the index of the text each came
+        from."""
+        tokens, owners = [], []
+        for i, prepr_text in enumerate(prepr_texts):
+            for token in self.analyzer_tokenize(
+                    self.analyzer_preprocess(prepr_text)):
+                if self.stop_words and token in self.stop_words:
+                    continue
+                tokens.append(token)
+                owners.append(i)
+        return tokens, owners
+
+    def _term_occurrences(self, tokens: List[str]
+                          ) -> List[Tuple[int, int, int]]:
+        """Returns (feature index, first token, n) for every n-gram of the
+        token sequence that is in the vocabulary."""
+        vocabulary = self.vocabulary
+        min_n, max_n = self.ngram_range
+        occurrences = []
+        for n in range(min_n, max_n + 1):
+            for start in range(len(tokens) - n + 1):
+                term = (tokens[start] if n == 1
+                        else " ".join(tokens[start:start + n]))
+                feature = vocabulary.get(term)
+                if feature is not None:
+                    occurrences.append((feature, start, n))
+        return occurrences
+
+    def _term_contributions(self, counts: Dict[int, int]
+                            ) -> Dict[int, float]:
+        """Returns coef_j * x_j for every feature j present in the text."""
+        values = {}
+        for feature, count in counts.items():
+            if self.binary:
+                tf = 1.0
+            elif self.sublinear_tf:
+                tf = 1.0 + math.log(count)
+            else:
+                tf = float(count)
+            values[feature] = tf * float(self.idf[feature])
+
+        if self.norm == 'l2':
+            norm = math.sqrt(sum(v * v for v in values.values()))
+        elif self.norm == 'l1':
+            norm = sum(abs(v) for v in values.values())
+        else:
+            norm = 1.0
+        if norm == 0.0:
+            norm = 1.0
+
+        return {feature: float(self.coef[feature]) * value / norm
+                for feature, value in values.items()}
+
+    def _term_counts(self, occurrences: List[Tuple[int, int, int]]
+                     ) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for feature, _, _ in occurrences:
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def predict_proba(self, prepr_text: str) -> float:
+        """Positive class probability of a binary logistic regression,
+        identical to the scikit-learn pipeline's."""
+        tokens, _ = self._tokenize([prepr_text])
+        return self.positive_proba(
+            self._term_counts(self._term_occurrences(tokens)))
+
+    def positive_proba(self, counts: Dict[int, int]) -> float:
+        """Positive class probability for the term counts of one text.
+
+        This repeats the operations of TfidfTransformer.transform,
+        normalize and predict_proba for a row with sorted indices in the
+        same order, so the result is the pipeline's to the last bit.
+        """
+        features = np.array(sorted(counts), dtype=np.intp)
+        values = np.array([counts[f] for f in features.tolist()],
+                          dtype=np.float64)
+        if self.binary:
+            values.fill(1.0)
+        if self.sublinear_tf:
+            np.log(values, values)
+            values += 1.0
+        values *= self.idf[features]
+
+        total = 0.0
+        if self.norm == 'l2':
+            for value in values.tolist():
+                total += value * value
+            total = math.sqrt(total)
+        elif self.norm == 'l1':
+            for value in values.tolist():
+                total += abs(value)
+        if total != 0.0:
+            values /= total
+
+        decision = 0.0
+        for value, coef in zip(values.tolist(),
+                               self.coef[features].tolist()):
+            decision += value * coef
+        return float(expit(np.float64(decision) + self.intercept))
+
+    def explain(self, prepr_texts: Sequence[str]) -> List[float]:
+        """Returns the contribution of each preprocessed text (one per word)
+        to the positive class probability of all of them joined."""
+        tokens, owners = self._tokenize(prepr_texts)
+        occurrences = self._term_occurrences(tokens)
+
+        counts = self._term_counts(occurrences)
+        contributions = self._term_contributions(counts)
+
+        scores = [0.0] * len(prepr_texts)
+        for feature, start, n in occurrences:
+            share = contributions[feature] / (counts[feature] * n)
+            for position in range(start, start + n):
+                scores[owners[position]] += share
+
+        # log-odds -> probability scale, keeping the proportions
+        logit_delta = sum(contributions.values())
+        base_proba = _sigmoid(self.intercept)
+        if logit_delta != 0.0:
+            proba_delta = _sigmoid(self.intercept + logit_delta) - base_proba
+            scale = proba_delta / logit_delta
+        else:
+            scale = base_proba * (1.0 - base_proba)
+
+        return [score * scale for score in scores]
+
+
+def is_binary_logistic(classifier) -> bool:
+    """True when predict_proba is the sigmoid of the decision function:
+    a binary one-vs-rest logistic regression."""
+    from sklearn.linear_model import LogisticRegression
+
+    if not isinstance(classifier, LogisticRegression) \
+            or len(classifier.classes_) != 2:
+        return False
+    return classifier.multi_class in ("ovr", "warn", "auto", "deprecated")
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Callable, List, Tuple
+
+Turn = Tuple[str, str]
+
+
+class ContextWindow:
+    """Token budget of the chat history in the local LLM prompt.
+
+    Token counts come from the model's tokenizer and are cached per
+    formatted turn, so every prompt costs one dict lookup per turn plus
+    the tokenization of the new ones. A single message longer than
+    `max_message_tokens` is clipped; the history is trimmed from the
+    oldest turns to `history_budget_tokens`, always keeping the last
+    `keep_last_turns` (the latest exchange).
+
+    Turns are dropped in steps of about half the budget, at user turns
+    chosen from the start of the conversation. The boundaries do not
+    move as the chat grows, so the prompt prefix stays the same between
+    two drops and the prompt cache keeps hitting.
+    """
+
+    def __init__(self,
+                 tokenize: Callable[[str], List[int]],
+                 detokenize: Callable[[List[int]], str],
+                 history_budget_tokens: int = 2048,
+                 max_message_tokens: int = 384,
+                 keep_last_turns: int = 2,
+                 cache_size: int = 4096) -> None:
+        self.tokenize = tokenize
+        self.detokenize = detokenize
+        self.history_budget_tokens = history_budget_tokens
+        self.max_message_tokens = max_message_tokens
+        self.keep_last_turns = keep_last_turns
+
+        self.count_tokens = lru_cache(maxsize=cache_size)(self._count_tokens)
+        self.clip = lru_cache(maxsize=cache_size)(self._clip)
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self.tokenize(text))
+
+    def _clip(self, content: str) -> str:
+        if self.count_tokens(content) <= self.max_message_tokens:
+            return content
+        tokens = self.tokenize(content)[:self.max_message_tokens]
+        return self.detokenize(tokens).rstrip() + "…"
+
+    def fit(self, turns: List[Turn]) -> List[str]:
+        """Formatted history turns, given as (role, text), that fit the
+        budget."""
+        counts = [self.count_tokens(text) for _, text in turns]
+        budget = self.history_budget_tokens
+        total = sum(counts)
+        if total <= budget:
+            return [text for _, text in turns]
+
+        last_droppable = max(len(turns) - self.keep_last_turns, 0)
+        # the oldest start at which the rest fits
+        start = 0
+        while start < last_droppable and total > budget:
+            total -= counts[start]
+            start += 1
+
+        # move it forward to the next stable drop boundary
+        step = max(budget // 2, 1)
+        tokens_since_boundary = 0
+        for i in range(min(last_droppable + 1, len(turns))):
+            if turns[i][0] == "user" and tokens_since_boundary >= step:
+                if i >= start:
+                    start = i
+                    break
+                tokens_since_boundary = 0
+            tokens_since_boundary += counts[i]
+
+        return [text for _, text in turns[start:]]
@@ -1,15 +1,27 @@
 import logging
 import os
 import time
+import uuid
 from llama_cpp import Llama
 import streamlit as st
 from huggingface_hub import hf_hub_download
-from typing import Generator, List, Dict, Any, Optional
+from typing import Callable, Generator, List, Dict, Any, Optional
+
+from src.metrics import METRICS
+from src.models.llm_prompt_cache import ConversationPromptCache
+from src.models.llm_context import ContextWindow
+from src.models.llm_speculative import TrackedPromptLookup
+from src.models.llm_profile import default_profile, load_profile
+from src.models.llm_scheduler import (GenerationScheduler, 
+                                      QueueFullError, 
+                                      QueueTimeout)
 
 ChatMessage = Dict[str, Any]
 
 class LLMCPUChatbot:
 
+    MODEL_ID = "llm_cpu"
+
     DEFAULT_SYSTEM_PROMPT_EN = (
         "You are friendly and witty AI companion. "
         "Your primary goal is to engage in lighthearted "
@@ -25,14 +37,27 @@ class LLMCPUChatbot:
     def __init__(self, 
                  model_local_dir: str, 
                  model_url_repo: str,
-                 model_filename: str) -> None:
+                 model_filename: str,
+                 prompt_cache_mb: float = 1024,
+                 n_ctx: int = 4096,
+                 history_budget_tokens: int = 2048,
+                 max_message_tokens: int = 384,
+                 max_tokens: int = 120,
+                 queue_max_size: int = 16,
+                 queue_max_per_session: int = 2,
+                 queue_max_wait_s: float = 120.0,
+                 speculative_decoding: bool = False,
+                 speculative_ngram_size: int = 2,
+                 speculative_draft_tokens: int = 10,
+                 tuning_profiles_path: Optional[str] = None,
+                 on_status: Optional[Callable[[str], None]] = None) -> None:
 
         self.model_local_dir = model_local_dir
         self.model_url_repo = model_url_repo
         self.model_filename = model_filename
         self.model_local_path = os.path.join(self.model_local_dir, 
                                              self.model_filename)
-        self.max_tokens = 120
+        self.max_tokens = max_tokens
         self.temperature = 0.7
         self.top_p = 0.9
         self.stop_seq = ["<|end|>", 
@@ -41,8 +66,33 @@ class LLMCPUChatbot:
                          "<|endoftext|>",
                          "\n"]
         self.system_prompt = LLMCPUChatbot.DEFAULT_SYSTEM_PROMPT_EN
+        self.prompt_cache_mb = prompt_cache_mb
+        self.n_ctx = n_ctx
+        self.history_budget_tokens = history_budget_tokens
+        self.max_message_tokens = max_message_tokens
+        self.tuning_profiles_path = tuning_profiles_path
+        self.draft_model = (
+            TrackedPromptLookup(max_ngram_size=speculative_ngram_size,
+                                num_pred_tokens=speculative_draft_tokens)
+            if speculative_decoding else None
+        )
+        self.last_turn_stats: Dict[str, float] = {}
+        # load progress and failure reason: the model loads in a
+        # ModelRegistry thread, where Streamlit messages are not shown
+        self.on_status = on_status
 
         self.model = self._load_model()
+        self.context_window = self._create_context_window()
+        self.prompt_cache = self._create_prompt_cache()
+        # generation runs only on the scheduler's worker; sessions still
+        # tokenize for the context window, which does not touch the state
+        self.scheduler = GenerationScheduler(
+            max_queue=queue_max_size,
+            max_per_session=queue_max_per_session,
+            max_wait_s=queue_max_wait_s,
+            max_chunks=self.max_tokens,
+            name=self.MODEL_ID
+        )
     
     def _download_model(self):
         hf_hub_download(repo_id=self.model_url_repo,
@@ -50,39 +100,49 @@ class LLMCPUChatbot:
                         local_dir=self.model_local_dir,
                         local_dir_use_symlinks=False)
     
+    def _report_status(self, status: str) -> None:
+        if self.on_status is not None:
+            self.on_status(status)
+
     def _load_model(self) -> Optional[Llama]:
 
         if not os.path.exists(self.model_local_path):
             if self.model_url_repo and self.model_filename:
-                st.info(f"Модель '{self.model_local_path}' не найдена. "
-                        f"Загрузка с Hugging Face Hub "
-                        f"(репозиторий: {self.model_url_repo})")
                 logging.info(f"Модель не найдена: {self.model_local_path}. "
                             f" Загрузка с Hugging Face Hub..")
+                self._report_status(f"загрузка с Hugging Face Hub "
+                                    f"({self.model_url_repo})")
                 try:
                     self._download_model()
-                    st.success(f"Модель c URL загружена в "
-                               f"'{self.model_local_path}'.")
+                    logging.info(f"Модель c URL загружена в "
+                                 f"'{self.model_local_path}'.")
                 except Exception as e:
                     logging.error(f"Загрузка модели не удалась")
+                    self._report_status("загрузка модели с Hugging Face "
+                                        "Hub не удалась")
                     return None
             else:
                 error_msg = (f"Модель не найдена "
                              f"и URL не предоставлен.")
-                st.error(error_msg)
                 logging.error(error_msg)
+                self._report_status("модель не найдена и URL не "
+                                    "предоставлен")
                 return None
         else:
             logging.info(f"Модель найдена: {self.model_local_path}.")
 
+        self._report_status("загрузка в память")
+        profile = self._thread_profile()
         start_time = time.time()
         try:
             model = Llama(
                 model_path=self.model_local_path,
-                n_ctx=4096,
+                n_ctx=self.n_ctx,
                 n_gpu_layers=0, # cpu
-                n_threads=max(os.cpu_count() // 2, 1),
-                n_batch=128,
+                n_threads=profile["n_threads"],
+                n_threads_batch=profile["n_threads_batch"],
+                n_batch=profile["n_batch"],
+                draft_model=self.draft_model,
                 verbose=False
             )
             end_time = time.time()
@@ -92,37 +152,147 @@ class LLMCPUChatbot:
             return model
         except Exception as e:
             error_message = f"Ошибка при загрузке локальной LLM"
-            st.error(error_message)
             logging.error(error_message)
+            self._report_status("ошибка при загрузке локальной LLM")
             return None
         
+    def _thread_profile(self) -> Dict[str, int]:
+        """Settings found by `python -m src.llm_calibration` for this
+        model and host, defaults if it was not calibrated."""
+        profile = default_profile()
+        calibrated = load_profile(self.tuning_profiles_path, 
+                                  self.model_local_path)
+        if calibrated is None:
+            logging.info("Профиль потоков LLM не найден, используются "
+                         "настройки по умолчанию.")
+            return profile
+        profile.update({key: calibrated[key] for key in profile 
+                        if key in calibrated})
+        logging.info(f"Профиль потоков LLM: {profile}")
+        return profile
+
+    def _create_context_window(self) -> Optional[ContextWindow]:
+        if self.model is None:
+            return None
+
+        # history + the clipped current message + the reply must fit n_ctx
+        worst_case = (self.history_budget_tokens 
+                      + self.max_message_tokens 
+                      + self.max_tokens)
+        if worst_case >= self.n_ctx:
+            logging.warning(f"Бюджет истории LLM ({worst_case} токенов с "
+                            f"ответом) не меньше контекста {self.n_ctx}")
+
+        model = self.model
+        return ContextWindow(
+            tokenize=lambda text: model.tokenize(text.encode("utf-8"), 
+                                                 add_bos=False, 
+                                                 special=True),
+            detokenize=lambda tokens: model.detokenize(tokens).decode(
+                "utf-8", errors="ignore"),
+            history_budget_tokens=self.history_budget_tokens,
+            max_message_tokens=self.max_message_tokens
+        )
+
+    def _create_prompt_cache(self) -> Optional[ConversationPromptCache]:
+        """Keeps the evaluated prompt of every conversation, so a turn
+        only evaluates its new tokens, and evaluates the system prompt
+        once for all sessions."""
+        if self.model is None or not self.prompt_cache_mb:
+            return None
+
+        prompt_cache = ConversationPromptCache(
+            capacity_bytes=int(self.prompt_cache_mb * 1024 * 1024)
+        )
+        start_time = time.time()
+        try:
+            system_tokens = self.model.tokenize(
+                self._format_system_prompt(self.system_prompt).encode("utf-8"),
+                special=True
+            )
+            self.model.reset()
+            self.model.eval(system_tokens)
+            prompt_cache.pin(system_tokens, self.model.save_state())
+            logging.info(f"Системный промпт LLM вычислен за "
+                         f"{time.time() - start_time:.2f} секунд.")
+        except Exception as e:
+            logging.error("Не удалось вычислить системный промпт заранее")
+        self.model.set_cache(prompt_cache)
+        return prompt_cache
+
+    @staticmethod
+    def _format_system_prompt(system_prompt: str) -> str:
+        return f"<|system|>\n{system_prompt}<|end|>\n"
+
+    @staticmethod
+    def _format_turn(role: str, 
+                     content: str, 
+                     sentiment_label: Optional[str] = None,
+                     sentiment_score: Optional[float] = None) -> str:
+        sentiment_info_str = ""
+        if role == "user" and sentiment_label is not None:
+            sentiment_info_str = (f"[Sentiment: {sentiment_label} "
+                                  f"({sentiment_score:.2f})] ")
+        return f"<|{role}|>\n{sentiment_info_str}{content}<|end|>\n"
+
     def _format_prompt(self, 
                        user_message: str, 
                        user_sentiment_label: str, 
                        user_sentiment_score: float, 
                        chat_history: List[ChatMessage], 
                        system_prompt: str) -> str:
+        """The current message is formatted exactly as it will appear in
+        the history of the next turn, so consecutive prompts of a
+        conversation share their prefix in the prompt cache. The history
+        is trimmed to the token budget of the context window."""
+        clip = (self.context_window.clip 
+                if self.context_window is not None else lambda text: text)
+
+        history_turns = [
+            (entry["role"], self._format_turn(entry["role"],
+                                              clip(entry["content"]),
+                                              entry.get("sentiment_label"),
+                                              entry.get("sentiment_score")))
+            for entry in chat_history
+        ]
+        if self.context_window is not None:
+            history = self.context_window.fit(history_turns)
+        else:
+            history = [text for _, text in history_turns]
         
-        prompt = f"<|system|>\n{system_prompt}<|end|>\n"
-        for entry in chat_history:
-            role = entry["role"]
-            content = entry["content"]
-            sentiment_info_str = ""
-            if role == "user" and "sentiment_label" in entry:
-                s_label = entry.get("sentiment_label")
-                s_score = entry.get("sentiment_score")
-                sentiment_info_str = f"[Sentiment: {s_label} ({s_score:.2f})] "
-            prompt += f"<|{role}|>\n{sentiment_info_str}{content}<|end|>\n"
-        
-        current_user_sentiment_info_str = ""
-        current_user_sentiment_info_str = f"""
-            [Sentiment: {user_sentiment_label} ({user_sentiment_score:.2f})] 
-            """
-            
-        prompt += f"""<|user|>\n{current_user_sentiment_info_str}
-                      {user_message}<|end|>\n<|assistant|>\n"""
-        return prompt
+        return "".join([self._format_system_prompt(system_prompt),
+                        *history,
+                        self._format_turn("user", 
+                                          clip(user_message),
+                                          user_sentiment_label, 
+                                          user_sentiment_score),
+                        "<|assistant|>\n"])
     
+    def _report_turn(self, n_tokens: int, decode_seconds: float) -> None:
+        """Decoding speed of the turn (after the first token) and, with
+        speculative decoding, the share of drafted tokens accepted."""
+        stats = {"tokens": n_tokens,
+                 "tokens_per_s": (n_tokens - 1) / decode_seconds
+                                 if decode_seconds > 0 else 0.0}
+        METRICS.increment("llm_generated_tokens_total", n_tokens, 
+                          model_id=self.MODEL_ID)
+        if self.draft_model is not None:
+            stats["draft_tokens"] = self.draft_model.drafted
+            stats["draft_acceptance"] = self.draft_model.acceptance_rate
+            METRICS.increment("llm_draft_tokens_total", 
+                              self.draft_model.drafted, 
+                              model_id=self.MODEL_ID)
+            METRICS.increment("llm_draft_accepted_total", 
+                              self.draft_model.accepted, 
+                              model_id=self.MODEL_ID)
+            logging.info(f"LLM: {n_tokens} токенов, "
+                         f"{stats['tokens_per_s']:.1f} ток/с, принято "
+                         f"{stats['draft_acceptance']:.0%} черновика")
+        else:
+            logging.info(f"LLM: {n_tokens} токенов, "
+                         f"{stats['tokens_per_s']:.1f} ток/с")
+        self.last_turn_stats = stats
+
     @property
     def is_ready(self) -> bool:
         return self.model is not None
@@ -131,21 +301,35 @@ class LLMCPUChatbot:
                           user_message: str, 
                           user_sentiment_label: str, 
                           user_sentiment_score: float, 
-                          chat_history: List[ChatMessage]
+                          chat_history: List[ChatMessage],
+                          session_id: Optional[str] = None,
+                          on_queue_position: Optional[
+                              Callable[[int], None]] = None
                           ) -> Generator[str, None, None]:
+        """Queues the reply on the shared model and streams it.
+        `on_queue_position` is called with the place in the queue while
+        the session waits."""
         
         if self.model is None:
             st.warning("LLM не загружена, ответ не может быть сгенерирован.")
             yield "Извините, возникли технические сложности. Попробуйте позже."
             return
 
-        formatted_prompt = self._format_prompt(user_message, 
-                                               user_sentiment_label, 
-                                               user_sentiment_score, 
-                                               chat_history, 
-                                               self.system_prompt)
+        with METRICS.timer("llm_prompt_format", self.MODEL_ID):
+            formatted_prompt = self._format_prompt(user_message, 
+                                                   user_sentiment_label, 
+                                                   user_sentiment_score, 
+                                                   chat_history, 
+                                                   self.system_prompt)
         
-        try:
+        session_key = session_id or uuid.uuid4().hex
+
+        def run_model():
+            # runs on the scheduler's worker thread
+            if self.prompt_cache is not None:
+                self.prompt_cache.set_session(session_key)
+            if self.draft_model is not None:
+                self.draft_model.reset()
             output_stream = self.model(
                 formatted_prompt,
                 max_tokens=self.max_tokens,
@@ -155,11 +339,40 @@ class LLMCPUChatbot:
                 stream=True,
                 echo=False
             )
+            n_tokens, first_token_time = 0, None
             for chunk in output_stream:
-                token_text = chunk["choices"][0]["text"]
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                n_tokens += 1
+                yield chunk["choices"][0]["text"]
+            if first_token_time is not None:
+                self._report_turn(n_tokens, 
+                                  time.perf_counter() - first_token_time)
+
+        start_time = time.perf_counter()
+        try:
+            ticket = self.scheduler.submit(session_key, run_model)
+            for i, token_text in enumerate(
+                    ticket.stream(on_position=on_queue_position)):
+                if i == 0:
+                    METRICS.observe("llm_first_token", 
+                                    time.perf_counter() - start_time, 
+                                    self.MODEL_ID)
+                METRICS.increment("llm_stream_chunks_total", 
+                                  model_id=self.MODEL_ID)
                 yield token_text
+            METRICS.observe("llm_generation", 
+                            time.perf_counter() - start_time, 
+                            self.MODEL_ID)
+
+        except (QueueFullError, QueueTimeout) as e:
+            logging.warning(f"LLM занята: {e}")
+            yield "Сейчас слишком много запросов. Попробуйте через минуту."
 
         except Exception as e:
+            METRICS.increment("chat_stage_errors_total", 
+                              stage="llm_generation", 
+                              model_id=self.MODEL_ID)
             st.error(f"Ошибка при генерации ответа LLM")
             logging.error(f"Ошибка при генерации ответа LLM")
             return "Произошла ошибка при обработке запроса LLM."
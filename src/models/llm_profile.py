@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+import platform
+from typing import Any, Dict, Optional
+
+Profile = Dict[str, Any]
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (container limits included)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+def cpu_signature() -> str:
+    """Identifies the host for thread tuning: CPU model, architecture and
+    the number of usable CPUs."""
+    model_name = platform.processor()
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    model_name = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{model_name or 'unknown'}|{platform.machine()}|{available_cpus()}"
+
+
+def default_profile() -> Profile:
+    return {"n_threads": max(available_cpus() // 2, 1),
+            "n_threads_batch": available_cpus(),
+            "n_batch": 128}
+
+
+def profile_key(model_path: str) -> str:
+    """Model file (name and size, so a re-quantized file is tuned again)
+    and CPU signature."""
+    size = os.path.getsize(model_path) if os.path.exists(model_path) else 0
+    return f"{os.path.basename(model_path)}|{size}|{cpu_signature()}"
+
+
+def _read_profiles(profiles_path: str) -> Dict[str, Profile]:
+    if not os.path.exists(profiles_path):
+        return {}
+    try:
+        with open(profiles_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning(f"Не удалось прочитать профили LLM: {profiles_path}")
+        return {}
+
+
+def load_profile(profiles_path: Optional[str],
+                 model_path: str) -> Optional[Profile]:
+    """Calibrated settings for this model on this host, None if the host
+    was not calibrated."""
+    if not profiles_path:
+        return None
+    return _read_profiles(profiles_path).get(profile_key(model_path))
+
+
+def save_profile(profiles_path: str,
+                 model_path: str,
+                 profile: Profile) -> None:
+    """Adds or replaces the profile of this model and host; profiles of
+    other hosts in the same file are kept."""
+    profiles = _read_profiles(profiles_path)
+    profiles[profile_key(model_path)] = profile
+    os.makedirs(os.path.dirname(os.path.abspath(profiles_path)),
+                exist_ok=True)
+    tmp_path = f"{profiles_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, profiles_path)
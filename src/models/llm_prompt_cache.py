@@ -0,0 +1,116 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence, Tuple
+
+from llama_cpp import Llama, LlamaState
+from llama_cpp.llama_cache import BaseLlamaCache
+
+Tokens = Tuple[int, ...]
+
+
+class ConversationPromptCache(BaseLlamaCache):
+    """llama.cpp prompt cache with one evaluated state per conversation.
+
+    Llama looks up the cached state with the longest common token prefix
+    before evaluating a prompt and stores the state of prompt + reply
+    after generating. Since every prompt of a conversation extends the
+    previous one, the lookup finds the session's own last turn and only
+    the new user turn is evaluated, even when sessions take turns on the
+    shared model.
+
+    States are stored per session: the caller names the session whose
+    turn is generated with `set_session` (per thread), and its new state
+    replaces the previous one. The token prefix cannot tell sessions
+    apart, since every first turn starts with the same user turn header
+    after the system prompt. Without a session, a state replaces only
+    states whose key is a prefix of its own. The pinned state (the system
+    prompt, evaluated once at load) serves new conversations and is never
+    evicted; the others are evicted least recently used first, beyond
+    `max_states` states or `capacity_bytes`.
+    """
+
+    def __init__(self,
+                 capacity_bytes: int = 1 << 30,
+                 max_states: int = 32) -> None:
+        super().__init__(capacity_bytes)
+        self.max_states = max(max_states, 1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # session (or key, without one) -> (key, state)
+        self._states: "OrderedDict[Hashable, Tuple[Tokens, LlamaState]]" = \
+            OrderedDict()
+        self._pinned_key: Tokens = ()
+        self._pinned_state: Optional[LlamaState] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_size(self) -> int:
+        return sum(state.llama_state_size
+                   for _, state in self._states.values())
+
+    def pin(self, key: Sequence[int], state: LlamaState) -> None:
+        with self._lock:
+            self._pinned_key = tuple(key)
+            self._pinned_state = state
+
+    def set_session(self, session_id: Optional[str]) -> None:
+        """Session of the turns this thread generates from now on."""
+        self._local.session_id = session_id
+
+    def _find_longest_prefix(self, key: Tokens
+                             ) -> Tuple[Optional[Hashable], int]:
+        best_owner, best_len = None, 0
+        for owner, (cached_key, _) in self._states.items():
+            prefix_len = Llama.longest_token_prefix(cached_key, key)
+            if prefix_len > best_len:
+                best_owner, best_len = owner, prefix_len
+        return best_owner, best_len
+
+    def _lookup(self, key: Tokens) -> Optional[LlamaState]:
+        owner, prefix_len = self._find_longest_prefix(key)
+        pinned_len = (Llama.longest_token_prefix(self._pinned_key, key)
+                      if self._pinned_state is not None else 0)
+        if owner is not None and prefix_len > pinned_len:
+            self._states.move_to_end(owner)
+            return self._states[owner][1]
+        return self._pinned_state if pinned_len else None
+
+    def __getitem__(self, key: Sequence[int]) -> LlamaState:
+        with self._lock:
+            state = self._lookup(tuple(key))
+            if state is None:
+                self.misses += 1
+                raise KeyError("Key not found")
+            self.hits += 1
+            return state
+
+    def __contains__(self, key: Sequence[int]) -> bool:
+        with self._lock:
+            return self._lookup(tuple(key)) is not None
+
+    def __setitem__(self, key: Sequence[int], value: LlamaState) -> None:
+        key = tuple(key)
+        session_id = getattr(self._local, "session_id", None)
+        with self._lock:
+            if session_id is not None:
+                owner = ("session", session_id)
+                self._states.pop(owner, None)
+            else:
+                owner = key
+                superseded = [
+                    cached_owner
+                    for cached_owner, (cached_key, _) in self._states.items()
+                    if len(cached_key) < len(key)
+                    and key[:len(cached_key)] == cached_key]
+                for cached_owner in superseded:
+                    del self._states[cached_owner]
+                self._states.pop(owner, None)
+            self._states[owner] = (key, value)
+
+            while self._states and (
+                    len(self._states) > self.max_states
+                    or self.cache_size > self.capacity_bytes):
+                self._states.popitem(last=False)
+                logging.debug("Состояние LLM вытеснено из кэша промптов")
@@ -0,0 +1,229 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional
+
+from src.metrics import METRICS
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class QueueTimeout(TimeoutError):
+    pass
+
+
+class GenerationTicket:
+    """A queued generation. Its chunks arrive through a thread-safe
+    channel and are read by the waiting session with `stream`."""
+
+    def __init__(self,
+                 scheduler: "GenerationScheduler",
+                 session_id: str,
+                 job: Callable[[], Iterable[str]]) -> None:
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.job = job
+        self.submitted_at = time.monotonic()
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+        self._channel: queue.Queue = queue.Queue()
+
+    def position(self) -> int:
+        """Place in the queue, 1 - next; 0 once generation started."""
+        return self.scheduler.position(self)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        self.scheduler.discard(self)
+
+    def stream(self,
+               on_position: Optional[Callable[[int], None]] = None,
+               poll_s: float = 0.25) -> Iterator[str]:
+        """Yields the generated chunks. While waiting, reports queue
+        position changes to `on_position` and gives up after the
+        scheduler's max wait."""
+        last_position = None
+        try:
+            while True:
+                try:
+                    kind, payload = self._channel.get(timeout=poll_s)
+                except queue.Empty:
+                    if self.started.is_set():
+                        continue
+                    waited = time.monotonic() - self.submitted_at
+                    if (waited > self.scheduler.max_wait_s
+                            and self.scheduler.discard(self)):
+                        raise QueueTimeout(f"Нет свободной LLM за "
+                                           f"{waited:.0f} с")
+                    position = self.position()
+                    if on_position is not None and position != last_position:
+                        on_position(position)
+                        last_position = position
+                    continue
+
+                if kind == "chunk":
+                    yield payload
+                elif kind == "end":
+                    return
+                else:
+                    raise payload
+        finally:
+            # the session stopped reading: free the model for the others
+            self.cancelled.set()
+            self.scheduler.discard(self)
+
+    def _put(self, kind: str, payload=None) -> None:
+        self._channel.put((kind, payload))
+
+
+class GenerationScheduler:
+    """Runs generations on a model that must not be used concurrently.
+
+    A dedicated worker thread owns the model and runs one job at a time.
+    Waiting jobs are kept in a FIFO queue per session, and sessions are
+    served round-robin, so one session with several queued messages does
+    not hold back the others. Admission is bounded by `max_queue` jobs
+    in total and `max_per_session` per session, a job that waited longer
+    than `max_wait_s` is dropped, and a job's stream is cut after
+    `max_chunks` chunks.
+    """
+
+    def __init__(self,
+                 max_queue: int = 16,
+                 max_per_session: int = 2,
+                 max_wait_s: float = 120.0,
+                 max_chunks: int = 512,
+                 name: str = "llm") -> None:
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_wait_s = max_wait_s
+        self.max_chunks = max_chunks
+        self.name = name
+
+        self._lock = threading.Condition()
+        # sessions in serving order, each with its own FIFO
+        self._sessions: "OrderedDict[str, Deque[GenerationTicket]]" = \
+            OrderedDict()
+        self._queued = 0
+        self._running: Optional[GenerationTicket] = None
+
+        self._worker = threading.Thread(target=self._run,
+                                        name=f"{name}-scheduler",
+                                        daemon=True)
+        self._worker.start()
+
+    def submit(self,
+               session_id: str,
+               job: Callable[[], Iterable[str]]) -> GenerationTicket:
+        """Queues `job` (returning an iterable of chunks) for the session.
+        Raises QueueFullError if the queue or the session is full."""
+        ticket = GenerationTicket(self, session_id, job)
+        with self._lock:
+            session_queue = self._sessions.get(session_id)
+            if self._queued >= self.max_queue or (
+                    session_queue is not None
+                    and len(session_queue) >= self.max_per_session):
+                METRICS.increment("llm_rejected_total", model_id=self.name)
+                raise QueueFullError(f"{self.name}: очередь заполнена")
+            if session_queue is None:
+                session_queue = self._sessions[session_id] = deque()
+            session_queue.append(ticket)
+            self._queued += 1
+            self._lock.notify()
+        return ticket
+
+    def discard(self, ticket: GenerationTicket) -> bool:
+        """Removes a ticket that has not started; False if it already
+        started or finished."""
+        with self._lock:
+            session_queue = self._sessions.get(ticket.session_id)
+            if session_queue is None or ticket not in session_queue:
+                return False
+            session_queue.remove(ticket)
+            self._queued -= 1
+            if not session_queue:
+                del self._sessions[ticket.session_id]
+            return True
+
+    def position(self, ticket: GenerationTicket) -> int:
+        with self._lock:
+            session_queue = self._sessions.get(ticket.session_id)
+            if session_queue is None or ticket not in session_queue:
+                return 0
+            sessions = list(self._sessions.items())
+            own_rotation = next(i for i, (session_id, _) in enumerate(sessions)
+                                if session_id == ticket.session_id)
+            own_index = session_queue.index(ticket)
+            ahead = own_index
+            # sessions before this one in the rotation get one more turn
+            for rotation_index, (_, other_queue) in enumerate(sessions):
+                if rotation_index == own_rotation:
+                    continue
+                turns = own_index + (1 if rotation_index < own_rotation
+                                     else 0)
+                ahead += min(len(other_queue), turns)
+            return ahead + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"queued": self._queued,
+                    "sessions": len(self._sessions),
+                    "running": int(self._running is not None)}
+
+    def _next_ticket(self) -> GenerationTicket:
+        with self._lock:
+            while not self._sessions:
+                self._lock.wait()
+            session_id, session_queue = next(iter(self._sessions.items()))
+            ticket = session_queue.popleft()
+            self._queued -= 1
+            # the session goes to the back of the rotation
+            del self._sessions[session_id]
+            if session_queue:
+                self._sessions[session_id] = session_queue
+            self._running = ticket
+            return ticket
+
+    def _run(self) -> None:
+        while True:
+            ticket = self._next_ticket()
+            try:
+                self._execute(ticket)
+            finally:
+                with self._lock:
+                    self._running = None
+
+    def _execute(self, ticket: GenerationTicket) -> None:
+        waited = time.monotonic() - ticket.submitted_at
+        if ticket.cancelled.is_set():
+            return
+        if waited > self.max_wait_s:
+            ticket._put("error", QueueTimeout(f"Нет свободной LLM за "
+                                              f"{waited:.0f} с"))
+            return
+        METRICS.observe("llm_queue_wait", waited, self.name)
+
+        ticket.started.set()
+        stream = None
+        try:
+            stream = iter(ticket.job())
+            for i, chunk in enumerate(stream):
+                if ticket.cancelled.is_set():
+                    break
+                if i >= self.max_chunks:
+                    logging.warning(f"{self.name}: ответ обрезан после "
+                                    f"{self.max_chunks} фрагментов")
+                    break
+                ticket._put("chunk", chunk)
+            ticket._put("end")
+        except Exception as e:
+            logging.error(f"{self.name}: ошибка генерации")
+            ticket._put("error", e)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,53 @@
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+
+
+class TrackedPromptLookup(LlamaPromptLookupDecoding):
+    """Prompt lookup drafting (n-grams of the context proposed as the
+    continuation) that counts how many drafted tokens the model accepted.
+
+    llama.cpp asks for a new draft after every verification step with the
+    tokens accepted so far, so the previous draft is scored against them
+    on the next call. The draft still pending when generation stops is
+    not counted.
+    """
+
+    def __init__(self,
+                 max_ngram_size: int = 2,
+                 num_pred_tokens: int = 10) -> None:
+        super().__init__(max_ngram_size=max_ngram_size,
+                         num_pred_tokens=num_pred_tokens)
+        self.reset()
+
+    def reset(self) -> None:
+        self.drafted = 0
+        self.accepted = 0
+        self._pending: Optional[Tuple[int, npt.NDArray[np.intc]]] = None
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    def __call__(self,
+                 input_ids: npt.NDArray[np.intc],
+                 /,
+                 **kwargs: Any) -> npt.NDArray[np.intc]:
+        self._score_pending(input_ids)
+        draft = super().__call__(input_ids, **kwargs)
+        if len(draft):
+            # the draft is a view of the model's token buffer
+            self._pending = (len(input_ids), np.array(draft, copy=True))
+        return draft
+
+    def _score_pending(self, input_ids: npt.NDArray[np.intc]) -> None:
+        if self._pending is None:
+            return
+        start, draft = self._pending
+        self._pending = None
+        actual = input_ids[start:start + len(draft)]
+        mismatches = np.flatnonzero(actual != draft[:len(actual)])
+        self.drafted += len(draft)
+        self.accepted += int(mismatches[0]) if len(mismatches) else len(actual)
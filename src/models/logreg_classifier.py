@@ -1,43 +1,81 @@
 import logging
 import os
-import shap
 import joblib
 import numpy as np
 from typing import List, Optional, Tuple
 
 from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+from src.models.linear_explainer import TfidfLinearExplainer
+from src.models.compact_tfidf import CompactTfidfLogReg, is_compact_artifact
+from src.models.prediction_cache import PredictionCache, normalize_text
+from src.models.word_segments import split_words
 
 
 class LogRegClassifier:
+    EXPLAIN_MODE_LINEAR = "linear"
+    EXPLAIN_MODE_SHAP = "shap"
     
     def __init__(self, 
                  preprocessor: LogRegPreprocessor, 
                  model_path: str, 
-                 class_names: Optional[List[str]] = None) -> None:
+                 class_names: Optional[List[str]] = None,
+                 explain_mode: str = EXPLAIN_MODE_LINEAR,
+                 cache: Optional[PredictionCache] = None,
+                 model_id: str = "logreg") -> None:
         self.preprocessor = preprocessor
         self.model_path = model_path
         self.class_names = class_names or ['negative', 'positive']
+        self.explain_mode = explain_mode
+        self.cache = cache
+        self.model_id = model_id
         
         self.model = self._load_model()
+        self.linear_explainer = self._load_linear_explainer()
 
     def _load_model(self):
         if not os.path.exists(self.model_path):
             logging.info('Sentiment Model Не загружена')
             return None
+        elif is_compact_artifact(self.model_path):
+            # memory-mapped, shared between the processes that load it
+            model = CompactTfidfLogReg.load(self.model_path)
+            logging.info('Sentiment Model загружена (компактный формат)')
+            return model
         else:
             model = joblib.load(self.model_path)
             logging.info('Sentiment Model загружена')
             return model
         
+    def _load_linear_explainer(self) -> Optional[TfidfLinearExplainer]:
+        if (self.model is None 
+            or self.explain_mode != LogRegClassifier.EXPLAIN_MODE_LINEAR):
+            return None
+        if isinstance(self.model, CompactTfidfLogReg):
+            return self.model.explainer
+        explainer = TfidfLinearExplainer.from_pipeline(self.model)
+        if explainer is None:
+            logging.warning('Линейный explain недоступен для этой модели, '
+                            'используется SHAP')
+        return explainer
+
     @property
     def is_ready(self) -> bool:
         return self.model is not None
 
+    def _cached(self, key: tuple, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute((self.model_id,) + key, compute)
+
     def predict(self, text: str) -> float:
         
         if not text.strip():
             return 0.0
-            
+
+        return self._cached(('predict', normalize_text(text)), 
+                            lambda: self._predict(text))
+
+    def _predict(self, text: str) -> float:
         prepr_text = self.preprocessor.preprocess(text)
         
         if not prepr_text.strip():
@@ -51,6 +89,23 @@ class LogRegClassifier:
         
         return pos_proba
 
+    def predict_batch(self, texts: List[str]) -> List[float]:
+        scores = [0.0] * len(texts)
+
+        prepr_texts = self.preprocessor.preprocess_batch(texts)
+        to_predict = [i for i, prepr_text in enumerate(prepr_texts) 
+                      if prepr_text.strip()]
+        if not to_predict:
+            return scores
+
+        proba = self.model.predict_proba([prepr_texts[i] 
+                                          for i in to_predict])
+        for i, pos_proba in zip(to_predict, proba[:, 1]):
+            # [0, 1] -> [-1, 1]
+            scores[i] = 2 * pos_proba - 1
+
+        return scores
+
     def _predict_function_shap(self, texts: List[str]) -> np.ndarray:
         prepr_texts = self.preprocessor.preprocess_batch(texts)
         proba = self.model.predict_proba(prepr_texts)
@@ -58,9 +113,25 @@ class LogRegClassifier:
 
     def explain_shap_text(self, text: str) -> List[Tuple[str, float]]:
         if len(text.split()) < 2:
-            logging.info('Explain невозможен: нужно больше слов')
+            logging.debug('Explain невозможен: нужно больше слов')
             return []
-        
+
+        if self.linear_explainer is not None:
+            explain = self._explain_linear
+        else:
+            explain = self._explain_shap
+        # tokens keep the original spacing, so the key is the exact text
+        return self._cached(('explain', text), lambda: explain(text))
+
+    def _explain_linear(self, text: str) -> List[Tuple[str, float]]:
+        words = split_words(text)
+        prepr_words = self.preprocessor.preprocess_batch(words)
+        scores = self.linear_explainer.explain(prepr_words)
+        return list(zip(words, scores))
+
+    def _explain_shap(self, text: str) -> List[Tuple[str, float]]:
+        import shap  # slow to import, only needed in the shap mode
+
         masker = shap.maskers.Text(tokenizer=r"\W+")
         
         explainer = shap.Explainer(
@@ -0,0 +1,139 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from src.metrics import BATCH_SIZE_BUCKETS, METRICS
+
+
+class MicroBatcher:
+    """Collects single requests from many threads into batches.
+
+    Every `submit` puts an item into a shared queue and returns a Future.
+    A worker thread takes the first waiting item and, if others are already
+    queued, keeps collecting for up to `max_wait_ms` or `max_batch_size`
+    items. It runs `batch_fn` once on the whole batch and resolves every
+    caller's Future with its own result. A lone request runs at once, and
+    requests that arrive while a batch is running form the next batch.
+
+    The queue depth and the size of every batch are published to METRICS
+    (`micro_batch_queue_depth`, `micro_batch_size`, labelled by `name`)
+    and summarized by `stats`.
+    """
+
+    def __init__(self,
+                 batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16,
+                 max_wait_ms: float = 2.0,
+                 name: str = "micro-batcher") -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait_s = max(max_wait_ms, 0.0) / 1000
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items_total = 0
+        self._last_batch_size = 0
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run,
+                                        name=name,
+                                        daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        if self._closed:
+            raise RuntimeError(f"{self.name} остановлен")
+        future: Future = Future()
+        self._queue.put((item, future))
+        METRICS.set_gauge("micro_batch_queue_depth", self._queue.qsize(),
+                          batcher=self.name)
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect_batch(self) -> Optional[list]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+
+        # a lone request is not held back waiting for company
+        if self._queue.empty():
+            return batch
+
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    request = self._queue.get(timeout=timeout)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # finish this batch, stop on the next collect
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            # callers that gave up on their Future are skipped
+            batch = [(item, future) for item, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._items_total += len(batch)
+                self._last_batch_size = len(batch)
+            METRICS.observe_value("micro_batch_size", len(batch),
+                                  BATCH_SIZE_BUCKETS, batcher=self.name)
+            METRICS.set_gauge("micro_batch_queue_depth", self._queue.qsize(),
+                              batcher=self.name)
+
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+            except Exception as e:
+                logging.error(f"{self.name}: ошибка обработки батча")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch size statistics."""
+        with self._stats_lock:
+            batches_total = sum(self._batch_sizes.values())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches_total": batches_total,
+                "items_total": self._items_total,
+                "mean_batch_size": (self._items_total / batches_total
+                                    if batches_total else 0.0),
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "last_batch_size": self._last_batch_size,
+                "batch_size_histogram": dict(sorted(
+                    self._batch_sizes.items())),
+            }
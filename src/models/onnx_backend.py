@@ -0,0 +1,98 @@
+import inspect
+import logging
+import os
+import torch
+
+ONNX_SUBDIR = "onnx"
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+ONNX_OPSET = 14
+
+
+def onnx_model_path(model_dir: str, quantize: bool) -> str:
+    filename = ONNX_INT8_FILENAME if quantize else ONNX_FILENAME
+    return os.path.join(model_dir, ONNX_SUBDIR, filename)
+
+
+def is_stale(artifact_path: str, model_dir: str) -> bool:
+    """An exported artifact is stale if it is older than the weights."""
+    if not os.path.exists(artifact_path):
+        return True
+    weights = [os.path.join(model_dir, name) for name in os.listdir(model_dir)
+               if name.endswith((".safetensors", ".bin"))]
+    artifact_mtime = os.path.getmtime(artifact_path)
+    return any(os.path.getmtime(path) > artifact_mtime for path in weights)
+
+
+def export_onnx(model: torch.nn.Module, path: str) -> None:
+    """Exports a sequence classification model with dynamic batch and
+    sequence axes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dummy_ids = torch.ones((1, 8), dtype=torch.long)
+    dummy_mask = torch.ones((1, 8), dtype=torch.long)
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"}}
+    # newer torch defaults to the dynamo exporter, keep the TorchScript one
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(model,
+                          (dummy_ids, dummy_mask),
+                          path,
+                          input_names=["input_ids", "attention_mask"],
+                          output_names=["logits"],
+                          dynamic_axes=dynamic_axes,
+                          opset_version=ONNX_OPSET,
+                          **export_kwargs)
+    logging.info(f"Модель экспортирована в ONNX: {path}")
+
+
+def quantize_onnx(src_path: str, dst_path: str) -> None:
+    """int8 dynamic quantization of the exported model weights."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+    logging.info(f"ONNX модель квантизована (int8): {dst_path}")
+
+
+def create_session(path: str, n_threads: int = 0):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = \
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if n_threads:
+        options.intra_op_num_threads = n_threads
+    return ort.InferenceSession(path,
+                                sess_options=options,
+                                providers=["CPUExecutionProvider"])
+
+
+def run_session(session,
+                input_ids: torch.Tensor,
+                attention_mask: torch.Tensor) -> torch.Tensor:
+    logits = session.run(["logits"],
+                         {"input_ids": input_ids.numpy(),
+                          "attention_mask": attention_mask.numpy()})[0]
+    return torch.from_numpy(logits)
+
+
+def export_artifacts(model: torch.nn.Module,
+                     model_dir: str,
+                     quantize: bool) -> str:
+    """Exports (and quantizes) the model into `model_dir/onnx/`, reusing an
+    up-to-date fp32 export, and returns the path to load."""
+    fp32_path = onnx_model_path(model_dir, quantize=False)
+    if is_stale(fp32_path, model_dir):
+        export_onnx(model, fp32_path)
+    if not quantize:
+        return fp32_path
+
+    path = onnx_model_path(model_dir, quantize=True)
+    quantize_onnx(fp32_path, path)
+    return path
+
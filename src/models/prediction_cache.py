@@ -0,0 +1,95 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+# rough per-entry overhead of the key tuple, the OrderedDict node and a float
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a text.
+
+    Both sentiment models ignore how words are separated, so texts that
+    differ only in whitespace share one prediction.
+    """
+    return " ".join(text.split())
+
+
+def _estimate_size(key: Hashable, value: Any) -> int:
+    size = ENTRY_OVERHEAD_BYTES
+    for part in (key if isinstance(key, tuple) else (key,)):
+        size += sys.getsizeof(part)
+    if isinstance(value, list):
+        size += sys.getsizeof(value)
+        for item in value:
+            if isinstance(item, tuple):
+                size += sum(sys.getsizeof(x) for x in item)
+            size += sys.getsizeof(item)
+    return size
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of model outputs shared by all sessions.
+
+    Bounded both by the number of entries and by an estimate of their
+    memory; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_mb: float = 64) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        # computed outside the lock: other keys are not blocked meanwhile
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = _estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
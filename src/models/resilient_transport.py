@@ -0,0 +1,288 @@
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from src.metrics import METRICS
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class TransportTimeout(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors and the HTTP codes that mean "try
+    again later"; client errors such as a bad request are not retried."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    # httpx network errors (the transport of google-genai)
+    return any(cls.__module__.startswith("httpx")
+               and cls.__name__ in ("TransportError", "TimeoutException")
+               for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Stops calling a backend after `failure_threshold` failed requests
+    in a row. After `reset_timeout_s` one trial request is let through:
+    its success closes the circuit, its failure opens it again, and a
+    trial that ends without a verdict (abandoned or rejected as a bad
+    request) frees the slot for the next one."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout_s: float = 30.0,
+                 name: str = "circuit") -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout_s = reset_timeout_s
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        return self.admit() is not None
+
+    def admit(self) -> Optional[str]:
+        """The state a request is let through in: CLOSED, or HALF_OPEN for
+        the trial request, which must end with `record_success`,
+        `record_failure` or `release_trial`; None if it is rejected."""
+        with self._lock:
+            if self._state == CircuitBreaker.CLOSED:
+                return CircuitBreaker.CLOSED
+            if (self._state == CircuitBreaker.OPEN
+                    and time.monotonic() - self._opened_at
+                    >= self.reset_timeout_s):
+                self._state = CircuitBreaker.HALF_OPEN
+                self._trial_running = False
+            if (self._state == CircuitBreaker.HALF_OPEN
+                    and not self._trial_running):
+                self._trial_running = True
+                return CircuitBreaker.HALF_OPEN
+            return None
+
+    def release_trial(self) -> None:
+        """Lets the next request be the trial; the circuit stays half-open."""
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CircuitBreaker.CLOSED:
+                logging.info(f"{self.name}: соединение восстановлено")
+            self._state = CircuitBreaker.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (self._state == CircuitBreaker.HALF_OPEN
+                    or self._failures >= self.failure_threshold):
+                if self._state != CircuitBreaker.OPEN:
+                    logging.warning(f"{self.name}: цепь разомкнута после "
+                                    f"{self._failures} ошибок подряд")
+                self._state = CircuitBreaker.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+class _Attempt:
+    """One streaming call, pumped into a queue by a daemon thread so the
+    caller can wait on it with a timeout."""
+
+    def __init__(self,
+                 open_stream: Callable[[], Iterable[str]],
+                 results: queue.Queue,
+                 tag: int) -> None:
+        self.tag = tag
+        self.stopped = threading.Event()
+        threading.Thread(target=self._pump,
+                         args=(open_stream, results),
+                         name=f"llm-stream-{tag}",
+                         daemon=True).start()
+
+    def _pump(self, open_stream, results: queue.Queue) -> None:
+        try:
+            for chunk in open_stream():
+                if self.stopped.is_set():
+                    return
+                results.put((self.tag, "chunk", chunk))
+            results.put((self.tag, "end", None))
+        except Exception as e:
+            results.put((self.tag, "error", e))
+
+    def stop(self) -> None:
+        # a blocked read ends with the HTTP client's own timeout
+        self.stopped.set()
+
+
+class ResilientStreamer:
+    """Deadlines, retries with backoff, hedging and a circuit breaker
+    around a streaming call.
+
+    Every request has an overall deadline and a shorter deadline for its
+    first chunk. If the first chunk is later than `hedge_after_s`, a
+    second identical request is started and whichever answers first is
+    used. Retryable errors and first-chunk timeouts are retried with
+    exponential backoff and full jitter, but only before anything was
+    yielded: a reply cut mid-stream is not restarted.
+    """
+
+    def __init__(self,
+                 request_timeout_s: float = 30.0,
+                 first_chunk_timeout_s: float = 10.0,
+                 max_attempts: int = 3,
+                 backoff_base_s: float = 0.5,
+                 backoff_max_s: float = 4.0,
+                 hedge_after_s: float = 0.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 name: str = "llm") -> None:
+        self.request_timeout_s = request_timeout_s
+        self.first_chunk_timeout_s = first_chunk_timeout_s
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge_after_s = hedge_after_s
+        self.breaker = breaker
+        self.name = name
+
+    def backoff_s(self, retry: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^retry)]."""
+        return random.uniform(0, min(self.backoff_max_s,
+                                     self.backoff_base_s * 2 ** retry))
+
+    def stream(self, open_stream: Callable[[], Iterable[str]]) -> Iterator[str]:
+        admitted_in = (self.breaker.admit() if self.breaker is not None
+                       else CircuitBreaker.CLOSED)
+        if admitted_in is None:
+            raise CircuitOpenError(f"{self.name}: цепь разомкнута")
+
+        verdict_recorded = False
+        deadline = time.monotonic() + self.request_timeout_s
+        try:
+            for attempt in range(self.max_attempts):
+                yielded = False
+                try:
+                    for chunk in self._stream_once(open_stream, deadline):
+                        yielded = True
+                        yield chunk
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                        verdict_recorded = True
+                    return
+                except Exception as e:
+                    retryable = is_retryable(e)
+                    delay = self.backoff_s(attempt)
+                    if (yielded or not retryable
+                            or attempt == self.max_attempts - 1
+                            or time.monotonic() + delay >= deadline):
+                        if retryable and self.breaker is not None:
+                            self.breaker.record_failure()
+                            verdict_recorded = True
+                        raise
+                    logging.warning(f"{self.name}: попытка {attempt + 1} не "
+                                    f"удалась ({type(e).__name__}), повтор "
+                                    f"через {delay:.2f} с")
+                    METRICS.increment("llm_retries_total",
+                                      model_id=self.name)
+                    time.sleep(delay)
+        finally:
+            # a trial that failed with a client error or whose stream was
+            # closed by the caller must not keep the circuit half-open
+            # with the slot taken forever
+            if (admitted_in == CircuitBreaker.HALF_OPEN
+                    and not verdict_recorded):
+                self.breaker.release_trial()
+
+    def _stream_once(self,
+                     open_stream: Callable[[], Iterable[str]],
+                     deadline: float) -> Iterator[str]:
+        results: queue.Queue = queue.Queue()
+        attempts: List[_Attempt] = [_Attempt(open_stream, results, 0)]
+        start = time.monotonic()
+        first_chunk_deadline = min(start + self.first_chunk_timeout_s,
+                                   deadline)
+        hedge_at = (start + self.hedge_after_s if self.hedge_after_s > 0
+                    else float("inf"))
+        failed = set()
+
+        try:
+            winner = None
+            while winner is None:
+                now = time.monotonic()
+                if len(attempts) == 1 and now >= hedge_at:
+                    logging.info(f"{self.name}: первый фрагмент задерживается, "
+                                 f"отправлен дублирующий запрос")
+                    METRICS.increment("llm_hedged_requests_total",
+                                      model_id=self.name)
+                    attempts.append(_Attempt(open_stream, results, 1))
+                    continue
+                wait_until = (min(first_chunk_deadline, hedge_at)
+                              if len(attempts) == 1 else first_chunk_deadline)
+                if now >= first_chunk_deadline:
+                    raise TransportTimeout(f"{self.name}: нет первого "
+                                           f"фрагмента за "
+                                           f"{now - start:.1f} с")
+                try:
+                    tag, kind, payload = results.get(
+                        timeout=max(wait_until - now, 0.001))
+                except queue.Empty:
+                    continue
+
+                if kind == "error":
+                    failed.add(tag)
+                    # with a hedge running the other request may answer
+                    if len(failed) == len(attempts):
+                        raise payload
+                    continue
+                winner = tag
+                if kind == "end":
+                    return
+                yield payload
+
+            for attempt in attempts:
+                if attempt.tag != winner:
+                    attempt.stop()
+
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    raise TransportTimeout(f"{self.name}: ответ не получен "
+                                           f"за {self.request_timeout_s} с")
+                try:
+                    tag, kind, payload = results.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if tag != winner:
+                    continue
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise payload
+                yield payload
+        finally:
+            for attempt in attempts:
+                attempt.stop()
@@ -0,0 +1,15 @@
+import re
+from typing import List, Tuple
+
+# a word with the whitespace after it; leading whitespace goes to the first
+WORD_SEGMENT_PATTERN = re.compile(r'\s*\S+\s*')
+
+
+def split_words(text: str) -> List[str]:
+    """Splits a text into words that join back into the exact text."""
+    return WORD_SEGMENT_PATTERN.findall(text)
+
+
+def word_spans(text: str) -> List[Tuple[int, int]]:
+    """Character spans of the words returned by split_words."""
+    return [match.span() for match in WORD_SEGMENT_PATTERN.finditer(text)]
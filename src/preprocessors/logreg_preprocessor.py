@@ -1,93 +1,79 @@
 import logging
-import re
 import json
-import pandas as pd
 from typing import List
 
+from src.preprocessors.regex_engine import RegexEngine, RegexStage
+
 class LogRegPreprocessor:
-    TEXT_PATTERNS = [
-        (r'(?:http|https)?://\S+\b|www\.\S+', ' '), # URL
+    # Normalization rules, one compiled pass per stage, applied in order.
+    # A stage merges several rules into one alternation only where the
+    # rules do not interact: the result must stay identical to applying
+    # every rule separately in the order they are listed here.
+    TEXT_STAGES = [
+        RegexStage(r'(?:http|https)?://\S+\b|www\.\S+', ' ',
+                   guards=('://', 'www.')), # URL
+
+        RegexStage(r'@\w+', ' ', guards=('@',)), # username
+        RegexStage(r'\S*@\S*\s?', ' ', guards=('@',)), # email
+        RegexStage(r'(?i)\brt\b', ' ', guards=('rt',)), # retweets
+        RegexStage(r'#(\w+)', r'\1 ', guards=('#',)), # hastags - only #
+        RegexStage(r'\d+', ' '), # numbers
 
-        (r'@\w+', ' '), # username
-        (r'\S*@\S*\s?', ' '), # email
-        (r'(?i)\brt\b', ' '), # retweets
-        (r'#(\w+)', r'\1 '),  # hastags - only #
-        (r'\d+', ' '), # numbers
-        
         # smiles and emoji
-        (r"\(\(+", " "), # (((
-        (r"\)+", " "), # )))
-        
-        (r'(?i)([>:;=-]+[\(cсCС/\\[L{<@]+)', ' '),  # :(, >:(
-        (r'(?i)([>:;=-]+[\)dD*pPрРbB]+)', ' '),    # :), :-D
-        (r'(?i)\b(99+|0_0|o_o|о_о)\b', ' '), # text bad smiles
-        (r'(?i)\b(:d+|xd+|:dd|dd)\b', ' '), # text good smiles
-        (r'(?i)\b[ах]{2,}[ах]*\b', ' <LAUGH> '), 
-        (r'[\U0001F600-\U0001F64F]', ' '), # emoji
-        
-        (r'[\r\n\t]', ' '), # newline/tabs
-        (r'-\s+', ' '),
-        (r'[^\w\s<>]', ' '),  # delete punct exept < >
-        (r'(\w)\1{2,}', r'\1\1 '),  # duplicates
+        RegexStage(r'\(\(+|\)+', ' ', guards=('(', ')')), # (((, )))
+        RegexStage(
+            r'(?i)[>:;=-]+[\(cсCС/\\[L{<@]+'  # :(, >:(
+            r'|[>:;=-]+[\)dD*pPрРbB]+',      # :), :-D
+            ' '
+        ),
+        # digits and ':d' are already gone here, so these only ever match
+        # whole words and removing them cannot create new word boundaries
+        RegexStage(
+            r'(?i)\b(?:99+|0_0|o_o|о_о)\b'    # text bad smiles
+            r'|\b(?::d+|xd+|:dd|dd)\b',  # text good smiles
+            ' '
+        ),
+
+        # laughter and duplicates in one pass: a laughter word is replaced
+        # as a whole before any of its letters can count as a duplicate
+        RegexStage(
+            r'(?P<laugh>(?i:\b[ах]{2,}[ах]*\b))'
+            r'|(?P<dup>(?P<dup_char>\w)(?P=dup_char){2,})',
+            {
+                'laugh': ' <LAUGH> ',
+                'dup': lambda m: m.group('dup_char') * 2 + ' ',
+            }
+        ),
+        # emoji, newline/tabs, dashes and punctuation except < >: all of them
+        # are non-word characters, so word boundaries above are unaffected
+        RegexStage(r'[^\w\s<>]+', ' '),
     ]
-    
+
     def __init__(self, stopwords_path: str) -> None: 
         self.stopwords_path = stopwords_path
 
-        self.text_patterns = None
+        self.text_engine = None
         self.stopwords = None
         
         self._load_resources()
 
     def _load_resources(self) -> None:
         # patterns
-        self.text_patterns = LogRegPreprocessor.TEXT_PATTERNS
+        self.text_engine = RegexEngine(LogRegPreprocessor.TEXT_STAGES)
         # stopwords
         with open(self.stopwords_path, 'r', encoding='utf-8') as f:
-            self.stopwords = set(json.load(f)) 
+            self.stopwords = frozenset(json.load(f))
         logging.info(f"Стоп-слова успешно загружены")
 
+    def _filter_tokens(self, text: str) -> str:
+        stopwords = self.stopwords
+        return " ".join(token for token in text.split()
+                        if len(token) > 1 and token not in stopwords)
+
     def preprocess(self, text: str) -> str:
         prepr_text = text.lower().replace('ё', 'е')
-        
-        for pattern, replacement in self.text_patterns:
-            prepr_text = re.sub(pattern, replacement, prepr_text)
-    
-        prepr_text = re.sub(r'\s+', ' ', prepr_text).strip()
-
-        if not prepr_text:
-            return ""
-        
-        prepr_tokens = prepr_text.split()
-        prepr_tokens = [token for token in prepr_tokens 
-                        if len(token) > 1 and token not in self.stopwords]
-
-        prepr_text = " ".join(prepr_tokens) 
-        
-        return prepr_text
+        prepr_text = self.text_engine.apply(prepr_text)
+        return self._filter_tokens(prepr_text)
         
     def preprocess_batch(self, texts: List[str]) -> List[str]:
-
-        text_series = pd.Series(texts)
-        
-        prepr_texts = text_series.str.lower().str.replace('ё', 'е', 
-                                                          regex=False)
-        
-        for pattern, replacement in self.text_patterns:
-            prepr_texts = prepr_texts.str.replace(pattern, 
-                                                  replacement, 
-                                                  regex=True)
-        
-        prepr_texts = prepr_texts.str.replace(r'\s+', ' ', 
-                                              regex=True).str.strip()
-        
-        prepr_tokens = prepr_texts.str.split()
-    
-        def process_tokens(tokens):
-            prepr_tokens = [token for token in tokens 
-                            if len(token) > 1 and token not in self.stopwords]
-            return ' '.join(prepr_tokens)
-            
-        prepr_texts = prepr_tokens.apply(process_tokens)
-        
-        return list(prepr_texts.values)
+        return [self.preprocess(text) for text in texts]
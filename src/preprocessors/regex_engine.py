@@ -0,0 +1,67 @@
+import re
+from typing import Callable, Dict, List, Sequence, Union
+
+Replacement = Union[str, Callable[[re.Match], str]]
+
+
+class RegexStage:
+    """One compiled substitution pass over the text.
+
+    `replacement` is either a regular `re.sub` replacement or a dict
+    {group name: replacement}. The dict form is used for merged
+    alternations: each alternative is a named group and the match is
+    dispatched to its own replacement in the same pass.
+
+    `guards` are literal substrings of which at least one must be in the
+    text for the pattern to match at all; the pass is skipped otherwise.
+    """
+
+    __slots__ = ('pattern', 'replacement', 'guards')
+
+    def __init__(self,
+                 pattern: str,
+                 replacement: Union[Replacement, Dict[str, Replacement]],
+                 guards: Sequence[str] = ()) -> None:
+        self.pattern = re.compile(pattern)
+        self.guards = tuple(guards)
+
+        if isinstance(replacement, dict):
+            self.replacement = RegexStage._make_dispatch(replacement)
+        else:
+            self.replacement = replacement
+
+    @staticmethod
+    def _make_dispatch(table: Dict[str, Replacement]
+                       ) -> Callable[[re.Match], str]:
+        def dispatch(match: re.Match) -> str:
+            replacement = table[match.lastgroup]
+            if isinstance(replacement, str):
+                return replacement
+            return replacement(match)
+        return dispatch
+
+    def apply(self, text: str) -> str:
+        if self.guards and not any(g in text for g in self.guards):
+            return text
+        return self.pattern.sub(self.replacement, text)
+
+
+class RegexEngine:
+    """Ordered list of compiled stages applied to a text one after another."""
+
+    def __init__(self, stages: List[RegexStage]) -> None:
+        self.stages = stages
+        # bound `sub` methods, looked up once instead of per call
+        self._passes = tuple((stage.guards, stage.pattern.sub,
+                              stage.replacement) for stage in stages)
+
+    def apply(self, text: str) -> str:
+        for guards, sub, replacement in self._passes:
+            if guards and not any(g in text for g in guards):
+                continue
+            text = sub(replacement, text)
+        return text
+
+    def apply_batch(self, texts: List[str]) -> List[str]:
+        apply = self.apply
+        return [apply(text) for text in texts]
@@ -0,0 +1,402 @@
+"""Standalone HTTP scoring service for the sentiment models, no Streamlit.
+
+Pre-forks a pool of worker processes (one per CPU core by default) that
+accept connections on one shared listening socket. Every worker builds
+the models with model_factory in the background and batches the texts of
+concurrent /score requests per model with a MicroBatcher.
+
+    POST /score    {"model": "logreg", "texts": ["...", ...]}
+                   -> {"model": "logreg", "scores": [0.42, ...]}
+    POST /explain  {"model": "bert", "texts": ["...", ...]}
+                   -> {"model": "bert", "attributions": [[["слово", 0.1],
+                       ...], ...]}
+    GET  /healthz  200 while the worker is up
+    GET  /readyz   200 once every served model is loaded, 503 before
+    GET  /metrics  micro-batcher queue depth and batch sizes of the worker
+                   that answered, if `metrics.enabled` is set in the config
+
+    python -m src.scoring_service --config config.yaml
+    python -m src.scoring_service --port 8080 --models logreg \\
+        --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+from src.metrics import METRICS
+from src.model_factory import (read_config,
+                               build_prediction_cache,
+                               build_logreg_classifier,
+                               build_bert_classifier,
+                               build_cascade_classifier)
+from src.model_registry import ModelRegistry
+from src.models.llm_profile import available_cpus
+from src.models.micro_batcher import MicroBatcher
+
+MODEL_IDS = ("logreg", "bert", "auto")
+
+
+class ModelUnavailable(Exception):
+    """The requested model is still loading or failed to load."""
+
+
+class BadRequest(Exception):
+    pass
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class ScoringWorker:
+    """The models of one worker process and their request batchers.
+
+    Models are loaded by a ModelRegistry as soon as the worker starts;
+    until a model is ready its requests are answered with 503. Texts of
+    /score requests go through the model's MicroBatcher, so concurrent
+    requests share one `predict_batch` call; /explain is per text.
+    """
+
+    def __init__(self,
+                 app_config: dict,
+                 model_ids: List[str],
+                 batch_max_size: int = 32,
+                 batch_max_wait_ms: float = 5.0,
+                 max_texts_per_request: int = 256,
+                 max_body_bytes: int = 1 << 20,
+                 request_timeout_s: float = 30.0) -> None:
+        self.model_ids = list(model_ids)
+        self.max_texts_per_request = max_texts_per_request
+        self.max_body_bytes = max_body_bytes
+        self.request_timeout_s = request_timeout_s
+
+        cache = build_prediction_cache(app_config)
+        self.registry = ModelRegistry(max_workers=len(MODEL_IDS))
+        loaders: Dict[str, Callable[[], Any]] = {
+            "logreg": lambda: build_logreg_classifier(
+                app_config, cache=cache, model_id="logreg"),
+            # requests are already batched here
+            "bert": lambda: build_bert_classifier(
+                app_config, cache=cache, model_id="bert",
+                micro_batching=False),
+            "auto": lambda: build_cascade_classifier(
+                app_config,
+                fast=self.registry.get("logreg", timeout=None),
+                accurate_provider=lambda: self.registry.get("bert"),
+                cache=cache,
+                model_id="auto"),
+        }
+        for model_id, loader in loaders.items():
+            self.registry.register(model_id, _ready_or_none(loader))
+
+        self.batchers = {
+            model_id: MicroBatcher(self._batch_fn(model_id),
+                                   max_batch_size=batch_max_size,
+                                   max_wait_ms=batch_max_wait_ms,
+                                   name=f"score-{model_id}")
+            for model_id in self.model_ids
+        }
+        for model_id in self.model_ids:
+            self.registry.request(model_id)
+
+    def _batch_fn(self, model_id: str) -> Callable[[List[str]], List[float]]:
+        return lambda texts: self.model(model_id).predict_batch(texts)
+
+    def model(self, model_id: str):
+        model = self.registry.get(model_id, timeout=0)
+        if model is None:
+            raise ModelUnavailable(f"Модель {model_id}: "
+                                   f"{self.registry.status(model_id)}")
+        return model
+
+    def readiness(self) -> Dict[str, str]:
+        return {model_id: self.registry.status(model_id)
+                for model_id in self.model_ids}
+
+    @property
+    def is_ready(self) -> bool:
+        return all(status == ModelRegistry.READY
+                   for status in self.readiness().values())
+
+    def parse_request(self, request: Any) -> tuple:
+        """Returns (model id, texts) of a /score or /explain request."""
+        if not isinstance(request, dict):
+            raise BadRequest("Ожидается JSON-объект")
+        model_id = request.get("model", self.model_ids[0])
+        if model_id not in self.model_ids:
+            raise BadRequest(f"Неизвестная модель {model_id}, "
+                             f"доступны: {', '.join(self.model_ids)}")
+        texts = request.get("texts")
+        if (not isinstance(texts, list)
+                or not all(isinstance(text, str) for text in texts)):
+            raise BadRequest("Поле texts должно быть списком строк")
+        if len(texts) > self.max_texts_per_request:
+            raise BadRequest(f"Не больше {self.max_texts_per_request} "
+                             f"текстов в запросе")
+        return model_id, texts
+
+    def score(self, model_id: str, texts: List[str]) -> List[float]:
+        self.model(model_id)  # 503 right away while loading
+        futures = [self.batchers[model_id].submit(text) for text in texts]
+        deadline = time.monotonic() + self.request_timeout_s
+        try:
+            return [float(future.result(
+                        timeout=max(deadline - time.monotonic(), 0)))
+                    for future in futures]
+        except FutureTimeout:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def explain(self, model_id: str, texts: List[str]) -> List[list]:
+        model = self.model(model_id)
+        return [[[str(token), float(value)]
+                 for token, value in model.explain_shap_text(text)]
+                for text in texts]
+
+
+def _ready_or_none(loader: Callable[[], Any]) -> Callable[[], Any]:
+    def load():
+        model = loader()
+        return model if model.is_ready else None
+    return load
+
+
+def make_handler(worker: ScoringWorker) -> type:
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        # keep-alive, every response has a Content-Length
+        protocol_version = "HTTP/1.1"
+        # headers and body are two writes: without TCP_NODELAY the body
+        # waits for the client's delayed ACK, ~40 ms per request
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            path = self.path.split("?")[0]
+            if path == "/healthz":
+                self._send_json(200, {"status": "ok", "pid": os.getpid()})
+            elif path == "/readyz":
+                self._send_json(200 if worker.is_ready else 503,
+                                {"ready": worker.is_ready,
+                                 "models": worker.readiness()})
+            elif path == "/metrics" and METRICS.enabled:
+                body = METRICS.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self) -> None:
+            path = self.path.split("?")[0]
+            try:
+                # read the body in any case, the connection is kept alive
+                body = self.rfile.read(self._content_length())
+                if path not in ("/score", "/explain"):
+                    status, response = 404, {"error": "Not found"}
+                else:
+                    status, response = 200, self._handle(path, body)
+            except PayloadTooLarge as e:
+                status, response = 413, {"error": str(e)}
+            except (ValueError, BadRequest) as e:
+                status, response = 400, {"error": str(e)}
+            except ModelUnavailable as e:
+                status, response = 503, {"error": str(e)}
+            except FutureTimeout:
+                status, response = 504, {"error": "Превышено время ожидания"}
+            except Exception as e:
+                logging.error(f"Ошибка обработки {path}: {e}")
+                status, response = 500, {"error": "Internal error"}
+            self._send_json(status, response)
+
+        def _content_length(self) -> int:
+            """Raises BadRequest or PayloadTooLarge for a body that is not
+            read; the connection is then closed, since the next request
+            cannot be found in it."""
+            value = self.headers.get("Content-Length") or "0"
+            if not (value.isascii() and value.isdigit()):
+                self.close_connection = True
+                raise BadRequest(f"Некорректный Content-Length: {value}")
+            length = int(value)
+            if length > worker.max_body_bytes:
+                self.close_connection = True
+                raise PayloadTooLarge(f"Тело запроса больше "
+                                      f"{worker.max_body_bytes} байт")
+            return length
+
+        def _handle(self, path: str, body: bytes) -> dict:
+            request = json.loads(body or b"null")
+            model_id, texts = worker.parse_request(request)
+            if path == "/score":
+                return {"model": model_id,
+                        "scores": worker.score(model_id, texts)}
+            return {"model": model_id,
+                    "attributions": worker.explain(model_id, texts)}
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type",
+                             "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return ScoringHandler
+
+
+def run_worker(listen_socket: socket.socket,
+               app_config: dict,
+               model_ids: List[str],
+               threads_per_worker: int = 1) -> None:
+    """Serves requests on the shared socket until the process ends."""
+    if threads_per_worker and {"bert", "auto"} & set(model_ids):
+        import torch
+        torch.set_num_threads(threads_per_worker)
+
+    # no exporter: forked workers would compete for its port, every worker
+    # answers GET /metrics itself
+    if app_config.get('metrics', {}).get('enabled', False):
+        METRICS.enabled = True
+
+    service_config = app_config.get('scoring_service', {})
+    worker = ScoringWorker(
+        app_config, model_ids,
+        batch_max_size=service_config.get('batch_max_size', 32),
+        batch_max_wait_ms=service_config.get('batch_max_wait_ms', 5),
+        max_texts_per_request=service_config.get('max_texts_per_request',
+                                                 256),
+        max_body_bytes=service_config.get('max_body_bytes', 1 << 20),
+        request_timeout_s=service_config.get('request_timeout_s', 30))
+
+    server = ThreadingHTTPServer(listen_socket.getsockname(),
+                                 make_handler(worker),
+                                 bind_and_activate=False)
+    server.socket.close()
+    server.socket = listen_socket
+    server.daemon_threads = True
+    logging.info(f"Воркер {os.getpid()} принимает запросы")
+    server.serve_forever()
+
+
+def serve(app_config: dict,
+          host: str,
+          port: int,
+          workers: int,
+          model_ids: List[str],
+          threads_per_worker: int = 1) -> None:
+    """Binds the socket, then forks the workers and restarts any that
+    exit until SIGTERM or SIGINT. Models are only loaded in the workers:
+    the parent stays single-threaded so that forking it is safe."""
+    listen_socket = socket.create_server((host, port), backlog=128)
+    logging.info(f"Сервис оценки на {host}:{port}, воркеров: "
+                 f"{workers or 'без fork'}, модели: {', '.join(model_ids)}")
+    if workers == 0:
+        run_worker(listen_socket, app_config, model_ids, threads_per_worker)
+        return
+
+    children: Dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                run_worker(listen_socket, app_config, model_ids,
+                           threads_per_worker)
+            except BaseException as e:
+                logging.error(f"Воркер {os.getpid()} остановлен: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logging.warning(f"Воркер {pid} завершился (статус {status}), "
+                        f"перезапуск")
+        # a worker that crashes on start is not restarted in a busy loop
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)
+        spawn()
+    listen_socket.close()
+    logging.info("Сервис оценки остановлен")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes, 0 - serve in this process "
+                             "(default: workers in config.yaml, there "
+                             "0 means one per CPU core)")
+    parser.add_argument("--models", nargs="+", choices=MODEL_IDS,
+                        default=None)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(process)d - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    app_config = read_config(args.config)
+    service_config = app_config.get('scoring_service', {})
+    workers = args.workers
+    if workers is None:
+        workers = service_config.get('workers', 0) or available_cpus()
+    if workers and not hasattr(os, "fork"):
+        logging.warning("fork недоступен, сервис работает в одном процессе")
+        workers = 0
+    serve(app_config,
+          host=args.host or service_config.get('host', "0.0.0.0"),
+          port=args.port or service_config.get('port', 8080),
+          workers=workers,
+          model_ids=args.models or service_config.get('models',
+                                                      ["logreg", "bert"]),
+          threads_per_worker=service_config.get('threads_per_worker', 1))
+
+
+if __name__ == "__main__":
+    main()
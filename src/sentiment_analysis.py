@@ -1,14 +1,24 @@
+from functools import lru_cache
+from typing import Optional
 import streamlit as st
-from streamlit_extras.annotated_text import annotated_text
+from annotated_text.util import get_annotated_html
 from src.models.logreg_classifier import LogRegClassifier
+from src.models.incremental_tfidf import IncrementalDraftScorer
 from src.config_and_settings import SENTIMENT_THRESHOLD
+from src.metrics import METRICS
 
 def analyze_text_sentiment(text: str, 
-                           sentiment_model: LogRegClassifier) -> float:
-    """Analyzes text sentiment and returns a score."""
+                           sentiment_model: LogRegClassifier,
+                           draft_scorer: Optional[IncrementalDraftScorer]
+                           = None) -> float:
+    """Analyzes text sentiment and returns a score. A draft scorer of the
+    same model rescores only the words edited since its previous text."""
     if not text.strip():
         return 0.0
-    return sentiment_model.predict(text)
+    with METRICS.timer("sentiment_predict", sentiment_model.model_id):
+        if draft_scorer is not None:
+            return draft_scorer.score(text)
+        return sentiment_model.predict(text)
 
 
 def get_sentiment_parameters(score: float, 
@@ -49,16 +59,23 @@ def format_shap_annotation(token: str,
     return (token, label_tooltip, background_color)
 
 
+@lru_cache(maxsize=2048)
+def shap_annotated_html(shap_scores: tuple) -> str:
+    """HTML of the annotated text, built once per message: every rerun
+    redraws the whole chat history."""
+    abs_scores = [abs(s) for _, s in shap_scores]
+    max_abs_score = max(abs_scores) if abs_scores else 0
+    display_parts = []
+    for token, score_val in shap_scores:
+        formatted_annotation = format_shap_annotation(token,
+                                                        score_val,
+                                                        max_abs_score)
+        display_parts.append(formatted_annotation)
+    return get_annotated_html(*display_parts)
+
+
 def display_shap_annotated_text(shap_scores: list | None):
     """Displays annotated text based on SHAP values."""
     if shap_scores:
-        abs_scores = [abs(s) for _, s in shap_scores]
-        max_abs_score = max(abs_scores) if abs_scores else 0
-        display_parts = []
-        for token, score_val in shap_scores:
-            formatted_annotation = format_shap_annotation(token,
-                                                            score_val,
-                                                            max_abs_score)
-            display_parts.append(formatted_annotation)
-        if display_parts:
-            annotated_text(*display_parts)
+        html = shap_annotated_html(tuple(map(tuple, shap_scores)))
+        st.markdown(html, unsafe_allow_html=True)
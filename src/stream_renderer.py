@@ -0,0 +1,55 @@
+import time
+from typing import Callable
+
+
+class StreamRenderer:
+    """Accumulates streamed chunks and re-renders the text at most
+    `max_fps` times per second, or sooner once `flush_chars` new
+    characters are pending.
+
+    Every render sends the whole text to the browser, so rendering each
+    chunk costs O(n^2) bytes per reply; coalescing bounds the number of
+    renders by the reply duration instead of its length. Chunks are only
+    flushed when the next one arrives or on `close`, so a pause in the
+    stream delays at most the chunks received since the last frame.
+    """
+
+    def __init__(self,
+                 render: Callable[[str], None],
+                 max_fps: float = 12.0,
+                 flush_chars: int = 200,
+                 cursor: str = "▌",
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        self.render = render
+        self.min_interval_s = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.flush_chars = flush_chars
+        self.cursor = cursor
+        self.clock = clock
+
+        self.renders = 0
+        self._parts = []
+        self._pending_chars = 0
+        self._last_render = float("-inf")
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def append(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        self._pending_chars += len(chunk)
+        if (self._pending_chars >= self.flush_chars
+                or self.clock() - self._last_render >= self.min_interval_s):
+            self._flush(self.text + self.cursor)
+
+    def close(self) -> str:
+        """Renders the final text without the cursor and returns it."""
+        text = self.text
+        self._flush(text)
+        return text
+
+    def _flush(self, text: str) -> None:
+        self.render(text)
+        self.renders += 1
+        self._pending_chars = 0
+        self._last_render = self.clock()
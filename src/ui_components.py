@@ -1,14 +1,17 @@
 import logging 
+from concurrent.futures import Future, TimeoutError
 import streamlit as st
 from streamlit_extras.stylable_container import stylable_container
 from src.models.logreg_classifier import LogRegClassifier 
+from src.model_registry import ModelRegistry
 from src.sentiment_analysis import (get_sentiment_parameters, 
                                     display_shap_annotated_text)
 from src.config_and_settings import (
     SessionKeys, WELCOME_TITLE, WELCOME_SUBHEADER, 
     WELCOME_EXAMPLES_HEADER, WELCOME_EXAMPLES,
     SELECTED_BUTTON_CSS, UNSELECTED_BUTTON_CSS,
-    MODEL_ID_LOGREG, MODEL_ID_BERT
+    MODEL_ID_LOGREG, MODEL_ID_BERT, MODEL_ID_AUTO,
+    EXPLAIN_INLINE_WAIT_S, EXPLAIN_POLL_INTERVAL_S
 )
 
 def configure_page() -> None:
@@ -19,7 +22,7 @@ def configure_page() -> None:
         page_icon="💬"
     )
 
-def display_sentiment_model_selector():
+def display_sentiment_model_selector(model_registry: ModelRegistry):
 
     if "ui_selected" not in st.session_state:
         st.session_state.ui_selected = MODEL_ID_LOGREG
@@ -30,9 +33,12 @@ def display_sentiment_model_selector():
     bert_css = (SELECTED_BUTTON_CSS 
                 if st.session_state.ui_selected == MODEL_ID_BERT 
                 else UNSELECTED_BUTTON_CSS)
+    auto_css = (SELECTED_BUTTON_CSS 
+                if st.session_state.ui_selected == MODEL_ID_AUTO 
+                else UNSELECTED_BUTTON_CSS)
 
     st.caption("Анализатор настроения:")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
 
     with col1:
         with stylable_container(key=f"{MODEL_ID_LOGREG}_container", 
@@ -54,11 +60,37 @@ def display_sentiment_model_selector():
                          use_container_width=True, 
                          key=f"{MODEL_ID_BERT}_btn"):
                 if st.session_state.ui_selected != MODEL_ID_BERT:
+                    # loads on the first pick if it was not preloaded
+                    with st.spinner("Загрузка модели настроения..."):
+                        bert_model = model_registry.get(MODEL_ID_BERT, 
+                                                        timeout=None)
+                    if bert_model is None:
+                        st.error("Не удалось загрузить модель настроения")
+                    else:
+                        st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_BERT] = \
+                                bert_model
+                        st.session_state[SessionKeys.SELECTED_SENTIMENT_MODEL] = \
+                                bert_model
+                        st.session_state.ui_selected = MODEL_ID_BERT
+                        logging.info(f"Sentiment-модель изменена BERT")
+                        st.rerun()
+
+    with col3:
+        with stylable_container(key=f"{MODEL_ID_AUTO}_container", 
+                                css_styles=auto_css):
+            if st.button("🎯 **Авто:** Баланс", 
+                         use_container_width=True, 
+                         key=f"{MODEL_ID_AUTO}_btn"):
+                if st.session_state.ui_selected != MODEL_ID_AUTO:
+                    # LogReg, with uncertain texts rescored by BERT
                     st.session_state[SessionKeys.SELECTED_SENTIMENT_MODEL] = \
-                            st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_BERT]
-                    st.session_state.ui_selected = MODEL_ID_BERT
-                    logging.info(f"Sentiment-модель изменена BERT")
-                st.rerun()
+                            st.session_state[SessionKeys.SENTIMENT_MODELS_DICT][MODEL_ID_AUTO]
+                    st.session_state.ui_selected = MODEL_ID_AUTO
+                    logging.info(f"Sentiment-модель изменена AUTO")
+                    st.rerun()
+
+    if model_registry.status(MODEL_ID_BERT) == ModelRegistry.LOADING:
+        st.caption("⏳ Bert загружается в фоне...")
 
 
 def display_current_input_sentiment_analysis(score: float, 
@@ -84,9 +116,43 @@ def display_current_input_sentiment_analysis(score: float,
             st.slider("Level", -1.0, 1.0, float(score), 0.01, 
                       disabled=True, label_visibility="collapsed")
 
-    with st.spinner("Анализ важности слов..."):
-        shap_scores = sentiment_model.explain_shap_text(text)
-        display_shap_annotated_text(shap_scores)
+    display_draft_explanation(text, sentiment_model)
+
+
+def display_draft_explanation(text: str, 
+                              sentiment_model: LogRegClassifier) -> None:
+    """Displays word highlights for the draft, computed in the background."""
+    draft_explanation = st.session_state.get(SessionKeys.DRAFT_EXPLANATION)
+    if draft_explanation is None:
+        with st.spinner("Анализ важности слов..."):
+            shap_scores = sentiment_model.explain_shap_text(text)
+            display_shap_annotated_text(shap_scores)
+        return
+
+    future = draft_explanation.request(sentiment_model, text)
+    try:
+        shap_scores = future.result(timeout=EXPLAIN_INLINE_WAIT_S)
+    except TimeoutError:
+        display_pending_explanation(future)
+        return
+    except Exception as e:
+        logging.error(f"Ошибка анализа важности слов")
+        return
+    display_shap_annotated_text(shap_scores)
+
+
+@st.fragment(run_every=EXPLAIN_POLL_INTERVAL_S)
+def display_pending_explanation(future: Future) -> None:
+    """Waits for the draft explanation without blocking the page and
+    shows it in place, so neither the draft panel nor the chat rerun.
+    Polling stops with the next draft change, which no longer calls it."""
+    if not future.done():
+        st.caption("Анализ важности слов...")
+        return
+    try:
+        display_shap_annotated_text(future.result())
+    except Exception as e:
+        logging.error(f"Ошибка анализа важности слов")
 
 
 def display_chat_message_content(message_content: str, 
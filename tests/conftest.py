@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DATA_DIR = os.path.join(ROOT, "tests", "data")
+STOPWORDS_PATH = os.path.join(ROOT, "data", "stopwords.json")
+
+
+POSITIVE_TEXTS = [
+    "отличный день", "очень хороший фильм", "мне понравилось", "прекрасно",
+    "лучший сервис", "спасибо большое отлично", "рад видеть", "хорошо",
+    "отличная идея спасибо", "замечательный вечер", "классно получилось",
+]
+NEGATIVE_TEXTS = [
+    "ужасный день", "очень плохой фильм", "мне не понравилось", "ужасно",
+    "худший сервис", "плохо совсем", "грустно и скучно", "плохая идея",
+    "отвратительный вечер", "все сломалось", "не работает опять",
+]
+
+
+@pytest.fixture(scope="session")
+def tfidf_logreg_pipeline():
+    """A small fitted TfidfVectorizer -> LogisticRegression pipeline, set
+    up like the app's model (word uni- and bigrams, sublinear tf)."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+        ("clf", LogisticRegression()),
+    ])
+    pipeline.fit(POSITIVE_TEXTS + NEGATIVE_TEXTS,
+                 [1] * len(POSITIVE_TEXTS) + [0] * len(NEGATIVE_TEXTS))
+    return pipeline
+
+
+@pytest.fixture(scope="session")
+def logreg_model_path(tfidf_logreg_pipeline, tmp_path_factory):
+    import joblib
+
+    path = tmp_path_factory.mktemp("models") / "logreg.joblib"
+    joblib.dump(tfidf_logreg_pipeline, path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def logreg_classifier(logreg_model_path):
+    from src.models.logreg_classifier import LogRegClassifier
+    from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+
+    return LogRegClassifier(
+        preprocessor=LogRegPreprocessor(stopwords_path=STOPWORDS_PATH),
+        model_path=logreg_model_path)
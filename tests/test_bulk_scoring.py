@@ -0,0 +1,115 @@
+import json
+import sys
+import types
+
+import pytest
+
+from src import bulk_scoring
+
+
+class FakeModel:
+    is_ready = True
+
+    def predict_batch(self, texts):
+        return [len(text) / 100 for text in texts]
+
+    def explain_shap_text(self, text):
+        return [(word, 0.5) for word in text.split()]
+
+
+@pytest.fixture
+def fake_torch(monkeypatch):
+    torch = types.SimpleNamespace(threads=[])
+    torch.set_num_threads = torch.threads.append
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.setattr(bulk_scoring, "_build_model",
+                        lambda config_path, model_id: FakeModel())
+    return torch
+
+
+def test_logreg_worker_leaves_torch_alone(fake_torch):
+    bulk_scoring._init_worker("config.yaml", "logreg", threads=1)
+    assert fake_torch.threads == []
+
+
+@pytest.mark.parametrize("model_id", ["bert", "auto"])
+def test_torch_worker_sets_threads(fake_torch, model_id):
+    bulk_scoring._init_worker("config.yaml", model_id, threads=2)
+    assert fake_torch.threads == [2]
+
+
+def test_run_writes_scores_in_input_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_scoring, "_build_model",
+                        lambda config_path, model_id: FakeModel())
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    texts = [f"text {'x' * i}" for i in range(7)]
+    input_path.write_text("".join(json.dumps({"id": i, "text": text}) + "\n"
+                                  for i, text in enumerate(texts)),
+                          encoding="utf-8")
+
+    bulk_scoring.run(bulk_scoring.parse_args([
+        "--input", str(input_path), "--output", str(output_path),
+        "--workers", "0", "--chunk-size", "3", "--id-field", "id",
+        "--explain"]))
+
+    rows = [json.loads(line) for line in
+            output_path.read_text(encoding="utf-8").splitlines()]
+    assert [row["id"] for row in rows] == list(range(7))
+    assert [row["score"] for row in rows] == [len(t) / 100 for t in texts]
+    assert rows[0]["attributions"] == [["text", 0.5]]
+    progress = json.loads((tmp_path / "out.jsonl.progress").read_text())
+    assert progress["rows"] == 7 and progress["chunks"] == 3
+
+
+def write_input(path, n_rows):
+    path.write_text("".join(json.dumps({"id": i, "text": "x" * i}) + "\n"
+                            for i in range(n_rows)),
+                    encoding="utf-8")
+
+
+def run_scoring(input_path, output_path, chunk_size, resume=False):
+    argv = ["--input", str(input_path), "--output", str(output_path),
+            "--workers", "0", "--chunk-size", str(chunk_size),
+            "--id-field", "id"]
+    bulk_scoring.run(bulk_scoring.parse_args(
+        argv + (["--resume"] if resume else [])))
+    return output_path.read_text(encoding="utf-8")
+
+
+def interrupt_after(output_path, n_rows, chunks):
+    """Leaves the output as a run killed after `n_rows` checkpointed rows
+    and a half-written next chunk."""
+    lines = output_path.read_text(encoding="utf-8").splitlines(True)
+    kept = "".join(lines[:n_rows])
+    output_path.write_text(kept + lines[n_rows] + '{"row": 9',
+                           encoding="utf-8")
+    bulk_scoring.Checkpoint(str(output_path)).save(
+        chunks, n_rows, len(kept.encode("utf-8")))
+
+
+@pytest.mark.parametrize("resume_chunk_size", [3, 4, 1])
+def test_resume_with_another_chunk_size_continues_at_the_stored_row(
+        tmp_path, monkeypatch, resume_chunk_size):
+    monkeypatch.setattr(bulk_scoring, "_build_model",
+                        lambda config_path, model_id: FakeModel())
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(input_path, 10)
+    expected = run_scoring(input_path, output_path, chunk_size=3)
+
+    interrupt_after(output_path, n_rows=6, chunks=2)
+    assert run_scoring(input_path, output_path, resume_chunk_size,
+                       resume=True) == expected
+
+
+def test_resume_without_the_output_starts_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_scoring, "_build_model",
+                        lambda config_path, model_id: FakeModel())
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(input_path, 7)
+    expected = run_scoring(input_path, output_path, chunk_size=3)
+
+    output_path.unlink()
+    resumed = run_scoring(input_path, output_path, chunk_size=3, resume=True)
+    assert resumed == expected
+    assert "\0" not in resumed
@@ -0,0 +1,120 @@
+import pytest
+
+from src.models.cascade_classifier import CascadeClassifier
+
+
+class FakeModel:
+    """Scores texts from a table and records what it was asked."""
+
+    is_ready = True
+
+    def __init__(self, name, scores):
+        self.name = name
+        self.scores = scores
+        self.predicted = []
+        self.batches = []
+
+    def predict(self, text):
+        self.predicted.append(text)
+        return self.scores.get(text, 0.0)
+
+    def predict_batch(self, texts):
+        self.batches.append(list(texts))
+        return [self.scores.get(text, 0.0) for text in texts]
+
+    def explain_shap_text(self, text):
+        return [(text, self.name)]
+
+
+FAST_SCORES = {"отлично": 0.9, "ужасно": -0.8, "так себе": 0.2,
+               "сомнительно": -0.49, "на границе": 0.5}
+ACCURATE_SCORES = {"так себе": 0.7, "сомнительно": -0.95}
+
+
+@pytest.fixture()
+def fast():
+    return FakeModel("fast", FAST_SCORES)
+
+
+@pytest.fixture()
+def accurate():
+    return FakeModel("accurate", ACCURATE_SCORES)
+
+
+def make_cascade(fast, accurate):
+    return CascadeClassifier(fast, lambda: accurate, escalate_below=0.5)
+
+
+@pytest.mark.parametrize("text, expected, escalated", [
+    ("отлично", 0.9, False),
+    ("ужасно", -0.8, False),
+    ("на границе", 0.5, False),
+    ("так себе", 0.7, True),
+    ("сомнительно", -0.95, True),
+])
+def test_only_uncertain_scores_are_escalated(fast, accurate, text, expected,
+                                             escalated):
+    cascade = make_cascade(fast, accurate)
+    assert cascade.predict(text) == expected
+    assert accurate.predicted == ([text] if escalated else [])
+    assert (cascade.calls, cascade.escalations) == (1, int(escalated))
+
+
+def test_fast_score_is_used_until_the_accurate_model_loads(fast, accurate):
+    loaded = []
+    cascade = CascadeClassifier(fast, lambda: loaded[0] if loaded else None,
+                                escalate_below=0.5)
+    assert cascade.predict("так себе") == 0.2
+    assert cascade.predict_batch(["так себе", "отлично"]) == [0.2, 0.9]
+    assert cascade.explain_shap_text("так себе") == [("так себе", "fast")]
+    assert cascade.escalations == 0
+
+    loaded.append(accurate)
+    assert cascade.predict("так себе") == 0.7
+    assert cascade.escalations == 1
+
+
+def test_empty_text_is_not_scored(fast, accurate):
+    cascade = make_cascade(fast, accurate)
+    assert cascade.predict("  ") == 0.0
+    assert fast.predicted == [] and accurate.predicted == []
+
+
+def test_predict_batch_replaces_only_the_uncertain_rows(fast, accurate):
+    cascade = make_cascade(fast, accurate)
+    texts = ["отлично", "так себе", "", "ужасно", "сомнительно", " "]
+    assert cascade.predict_batch(texts) == [0.9, 0.7, 0.0, -0.8, -0.95, 0.0]
+
+    # empty texts score 0.0 with the fast model and are never escalated
+    assert accurate.batches == [["так себе", "сомнительно"]]
+    assert (cascade.calls, cascade.escalations) == (6, 2)
+    assert cascade.escalation_rate == pytest.approx(2 / 6)
+
+
+def test_certain_batch_does_not_ask_for_the_accurate_model(fast):
+    def provider():
+        raise AssertionError("not needed")
+
+    cascade = CascadeClassifier(fast, provider, escalate_below=0.5)
+    assert cascade.predict_batch(["отлично", "ужасно", ""]) == \
+        [0.9, -0.8, 0.0]
+    assert (cascade.calls, cascade.escalations) == (3, 0)
+
+
+def test_batch_and_single_predictions_agree(fast, accurate):
+    texts = list(FAST_SCORES) + ["", "незнакомый текст"]
+    single = make_cascade(fast, accurate)
+    batch = make_cascade(fast, accurate)
+    assert batch.predict_batch(texts) == [single.predict(text)
+                                          for text in texts]
+
+
+@pytest.mark.parametrize("text, model", [
+    ("отлично", "fast"),
+    ("так себе", "accurate"),
+    ("сомнительно", "accurate"),
+])
+def test_words_are_explained_by_the_model_whose_score_is_shown(
+        fast, accurate, text, model):
+    cascade = make_cascade(fast, accurate)
+    assert cascade.explain_shap_text(text) == [(text, model)]
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import NEGATIVE_TEXTS, POSITIVE_TEXTS, STOPWORDS_PATH
+from src.models.compact_tfidf import (META_FILE, CompactTfidfLogReg,
+                                      CompactVocabulary, is_compact_artifact,
+                                      save_compact)
+
+CHECK_TEXTS = POSITIVE_TEXTS + NEGATIVE_TEXTS + [
+    "", "совсем незнакомые слова", "Отличный ДЕНЬ!!! очень очень хороший",
+    "не понравилось, но спасибо", "фильм фильм фильм",
+]
+
+
+@pytest.fixture(scope="module")
+def compact_path(tfidf_logreg_pipeline, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("models") / "logreg.tfidf")
+    save_compact(tfidf_logreg_pipeline, path)
+    return path
+
+
+def test_round_trip_predicts_bit_identical_probabilities(
+        tfidf_logreg_pipeline, compact_path):
+    assert is_compact_artifact(compact_path)
+    compact = CompactTfidfLogReg.load(compact_path)
+    expected = tfidf_logreg_pipeline.predict_proba(CHECK_TEXTS)
+    np.testing.assert_array_equal(compact.predict_proba(CHECK_TEXTS),
+                                  expected)
+    assert compact.classes_.tolist() == \
+        tfidf_logreg_pipeline.classes_.tolist()
+
+
+def test_arrays_are_memory_mapped(compact_path):
+    compact = CompactTfidfLogReg.load(compact_path)
+    assert isinstance(compact.explainer.coef, np.memmap)
+    assert isinstance(compact.explainer.vocabulary.terms, np.memmap)
+
+
+def test_vocabulary_answers_like_the_vectorizer(tfidf_logreg_pipeline):
+    vocabulary_ = tfidf_logreg_pipeline.steps[0][1].vocabulary_
+    arrays = CompactVocabulary.build_arrays(vocabulary_)
+    vocabulary = CompactVocabulary(arrays["terms"], arrays["term_offsets"],
+                                   arrays["term_table"])
+
+    assert len(vocabulary) == len(vocabulary_)
+    assert {term: vocabulary[term] for term in vocabulary} == vocabulary_
+    for term, feature in vocabulary_.items():
+        assert vocabulary.get(term) == feature
+        assert term in vocabulary
+    for missing in ["", "несуществующее", "отличный_день", "день отличный"]:
+        assert vocabulary.get(missing) is None
+        assert missing not in vocabulary
+    with pytest.raises(KeyError):
+        vocabulary["несуществующее"]
+
+
+def test_logreg_classifier_loads_the_artifact_directory(
+        logreg_classifier, compact_path):
+    from src.models.logreg_classifier import LogRegClassifier
+    from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+
+    compact_classifier = LogRegClassifier(
+        preprocessor=LogRegPreprocessor(stopwords_path=STOPWORDS_PATH),
+        model_path=compact_path)
+    assert isinstance(compact_classifier.model, CompactTfidfLogReg)
+    assert compact_classifier.linear_explainer is \
+        compact_classifier.model.explainer
+    for text in CHECK_TEXTS:
+        assert compact_classifier.predict(text) == \
+            logreg_classifier.predict(text)
+        assert compact_classifier.explain_shap_text(text) == \
+            logreg_classifier.explain_shap_text(text)
+
+
+def test_unsupported_pipelines_are_rejected(tmp_path):
+    from sklearn.feature_extraction.text import (CountVectorizer,
+                                                 TfidfVectorizer)
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import LinearSVC
+
+    texts = POSITIVE_TEXTS + NEGATIVE_TEXTS
+    labels = [1] * len(POSITIVE_TEXTS) + [0] * len(NEGATIVE_TEXTS)
+    pipelines = [
+        Pipeline([("tfidf", CountVectorizer()),
+                  ("clf", LogisticRegression())]),
+        Pipeline([("tfidf", TfidfVectorizer(analyzer="char")),
+                  ("clf", LogisticRegression())]),
+        Pipeline([("tfidf", TfidfVectorizer()), ("clf", LinearSVC())]),
+    ]
+    for i, pipeline in enumerate(pipelines):
+        pipeline.fit(texts, labels)
+        path = str(tmp_path / f"model{i}")
+        with pytest.raises(ValueError):
+            save_compact(pipeline, path)
+        assert not is_compact_artifact(path)
+    with pytest.raises(ValueError):
+        save_compact(LogisticRegression(), str(tmp_path / "not_a_pipeline"))
+
+
+def test_other_format_version_is_rejected(tfidf_logreg_pipeline, tmp_path):
+    path = str(tmp_path / "logreg.tfidf")
+    save_compact(tfidf_logreg_pipeline, path)
+    meta_path = os.path.join(path, META_FILE)
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["format_version"] += 1
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        CompactTfidfLogReg.load(path)
@@ -0,0 +1,161 @@
+import threading
+
+import pytest
+
+from src.models.history_compaction import HistoryCompactor, turn_fingerprints
+
+
+def make_turns(n, prefix="m"):
+    return [("user" if i % 2 == 0 else "assistant", f"{prefix}{i}")
+            for i in range(n)]
+
+
+def joining_summarize(calls):
+    def summarize(previous_summary, turns):
+        calls.append((previous_summary, list(turns)))
+        contents = [content for _, content in turns]
+        return "+".join(([previous_summary] if previous_summary else [])
+                        + contents)
+    return summarize
+
+
+def test_fingerprints_identify_every_prefix():
+    turns = make_turns(4)
+    fingerprints = turn_fingerprints(turns)
+    assert len(set(fingerprints)) == 4
+    assert turn_fingerprints(turns[:2]) == fingerprints[:2]
+    edited = turns[:1] + [("assistant", "edited")] + turns[2:]
+    assert turn_fingerprints(edited)[0] == fingerprints[0]
+    assert turn_fingerprints(edited)[1:] != fingerprints[1:]
+
+
+def test_short_history_is_sent_verbatim():
+    compactor = HistoryCompactor(joining_summarize([]), keep_last_turns=6,
+                                 summary_step=4)
+    turns = make_turns(9)
+    assert compactor.compact(turns) == ("", turns)
+    assert compactor.schedule_update(turns) is None
+
+
+def test_older_turns_are_replaced_by_the_summary_once_ready():
+    calls = []
+    compactor = HistoryCompactor(joining_summarize(calls), keep_last_turns=6,
+                                 summary_step=4)
+    turns = make_turns(10)
+    # the summary is computed in the background: turns stay verbatim
+    # until it is ready
+    future = compactor.schedule_update(turns)
+    future.result()
+    assert calls == [("", turns[:4])]
+
+    summary, verbatim = compactor.compact(turns)
+    assert summary == "m0+m1+m2+m3"
+    assert verbatim == turns[4:]
+    # the same turns are summarized once
+    assert compactor.schedule_update(turns) is None
+    assert compactor.compact(turns + make_turns(1, "x")) == \
+        (summary, (turns + make_turns(1, "x"))[4:])
+
+
+def test_summary_is_folded_step_by_step():
+    calls = []
+    compactor = HistoryCompactor(joining_summarize(calls), keep_last_turns=2,
+                                 summary_step=2)
+    turns = make_turns(8)
+    compactor.schedule_update(turns[:4]).result()
+    compactor.schedule_update(turns[:6]).result()
+    compactor.schedule_update(turns).result()
+
+    assert calls == [("", turns[0:2]),
+                     ("m0+m1", turns[2:4]),
+                     ("m0+m1+m2+m3", turns[4:6])]
+    assert compactor.compact(turns) == ("m0+m1+m2+m3+m4+m5", turns[6:])
+
+
+def test_edited_history_misses_the_summary():
+    compactor = HistoryCompactor(joining_summarize([]), keep_last_turns=2,
+                                 summary_step=2)
+    turns = make_turns(4)
+    compactor.schedule_update(turns).result()
+    edited = [("user", "other")] + turns[1:]
+    assert compactor.compact(edited) == ("", edited)
+
+
+def test_pending_update_is_not_scheduled_twice():
+    release = threading.Event()
+
+    def slow_summarize(previous_summary, turns):
+        release.wait(5)
+        return "summary"
+
+    compactor = HistoryCompactor(slow_summarize, keep_last_turns=2,
+                                 summary_step=2)
+    turns = make_turns(4)
+    future = compactor.schedule_update(turns)
+    assert compactor.schedule_update(turns) is None
+    assert compactor.compact(turns) == ("", turns)
+    release.set()
+    future.result()
+    assert compactor.compact(turns) == ("summary", turns[2:])
+
+
+def test_failed_summary_can_be_retried():
+    attempts = []
+
+    def flaky_summarize(previous_summary, turns):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "summary"
+
+    compactor = HistoryCompactor(flaky_summarize, keep_last_turns=2,
+                                 summary_step=2)
+    turns = make_turns(4)
+    compactor.schedule_update(turns).result()
+    assert compactor.compact(turns) == ("", turns)
+
+    compactor.schedule_update(turns).result()
+    assert compactor.compact(turns) == ("summary", turns[2:])
+
+
+def test_least_recently_used_summaries_are_evicted():
+    compactor = HistoryCompactor(joining_summarize([]), keep_last_turns=2,
+                                 summary_step=2, max_summaries=2)
+    conversations = [make_turns(4, prefix) for prefix in "abc"]
+    for turns in conversations:
+        compactor.schedule_update(turns).result()
+
+    assert compactor.compact(conversations[0]) == ("", conversations[0])
+    for turns in conversations[1:]:
+        assert compactor.compact(turns)[0] != ""
+
+
+def test_gemini_chatbot_sends_the_summary_instead_of_older_turns():
+    pytest.importorskip("google.genai")
+    from src.models.fake_gemini_client import FakeGeminiClient
+    from src.models.gemini_handler import GeminiChatbot
+
+    client = FakeGeminiClient(latency_s=0)
+    chatbot = GeminiChatbot(api_key="", model_name="fake",
+                            history_keep_turns=2, history_summary_step=2,
+                            client=client)
+    history = [{"role": role, "content": content}
+               for role, content in make_turns(4)]
+    "".join(chatbot.generate_response("hi", "😐 Нейтральная", 0.0, history))
+
+    # the reply scheduled the summary of the turns before the last two;
+    # the compactor's single worker runs this no-op after it
+    chatbot.compactor._executor.submit(lambda: None).result()
+    history += [{"role": "user", "content": "hi"},
+                {"role": "assistant", "content": "reply"}]
+    "".join(chatbot.generate_response("again", "😐 Нейтральная", 0.0,
+                                      history))
+    first, second = [request for request in client.requests
+                     if request["method"] == "generate_content_stream"]
+    assert first["n_contents"] == 5
+    assert "Summary of the earlier conversation" not in \
+        first["system_instruction"]
+    # the last two turns and the new message
+    assert second["n_contents"] == 3
+    assert "Summary of the earlier conversation" in \
+        second["system_instruction"]
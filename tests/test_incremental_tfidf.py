@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from src.models.incremental_tfidf import IncrementalDraftScorer
+
+# vocabulary words of the conftest model and characters the preprocessing
+# rules act on (urls, mentions, emoticons, repeats, punctuation)
+PIECES = (list("абвгдеёжзхаАХ xyzRT@#:;()-=DdPp0123_.,!?/<>\t\n")
+          + ["http://", "www.", "😀", "ааа", "оооо", " отличный",
+             " день", " плохо", " не", " понравилось", " очень", " фильм",
+             " спасибо", " ужасно"])
+
+
+@pytest.fixture()
+def scorer(logreg_classifier):
+    scorer = IncrementalDraftScorer.from_classifier(logreg_classifier)
+    assert scorer is not None
+    return scorer
+
+
+def expected_score(classifier, text):
+    return classifier._predict(text) if text.strip() else 0.0
+
+
+def test_typing_matches_predict_exactly(scorer, logreg_classifier):
+    draft = ""
+    for word in "мне очень понравилось , отличный день спасибо".split():
+        for char in " " + word:
+            draft += char
+            assert scorer.score(draft) == \
+                expected_score(logreg_classifier, draft)
+
+
+def test_random_edits_match_predict_exactly(scorer, logreg_classifier):
+    rnd = random.Random(1)
+    for _ in range(60):
+        scorer.reset()
+        draft = ""
+        for _ in range(40):
+            r = rnd.random()
+            if r < 0.1 and draft:
+                draft = draft[:-rnd.randint(1, 3)]
+            elif r < 0.15 and draft:
+                i = rnd.randrange(len(draft))
+                draft = draft[:i] + rnd.choice(PIECES) + draft[i:]
+            else:
+                draft += rnd.choice(PIECES)
+            assert scorer.score(draft) == \
+                expected_score(logreg_classifier, draft), repr(draft)
+
+
+def test_appending_preprocesses_only_the_changed_words(scorer):
+    scorer.score("очень хороший")
+    before = scorer.preprocessed_words
+    scorer.score("очень хороший фильм")
+    assert scorer.preprocessed_words - before == 1
+    scorer.score("плохой хороший фильм")
+    assert scorer.full_recomputes == 1
+
+
+def test_scorer_is_built_only_for_tfidf_logistic_models():
+    class NotLogReg:
+        is_ready = True
+
+    assert IncrementalDraftScorer.from_classifier(NotLogReg()) is None
+    assert IncrementalDraftScorer.from_classifier(None) is None
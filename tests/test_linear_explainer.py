@@ -0,0 +1,44 @@
+import math
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from src.models.linear_explainer import TfidfLinearExplainer
+
+TEXTS = ["очень хороший фильм спасибо", "плохо совсем не работает",
+         "отличный день", "неизвестные слова", ""]
+
+
+def test_predict_proba_is_bit_identical(tfidf_logreg_pipeline):
+    explainer = TfidfLinearExplainer.from_pipeline(tfidf_logreg_pipeline)
+    expected = tfidf_logreg_pipeline.predict_proba(TEXTS)[:, 1]
+    assert [explainer.predict_proba(text) for text in TEXTS] \
+        == expected.tolist()
+
+
+def test_word_shares_add_up_to_probability_change(tfidf_logreg_pipeline):
+    explainer = TfidfLinearExplainer.from_pipeline(tfidf_logreg_pipeline)
+    words = ["очень", "хороший", "фильм", "спасибо"]
+    shares = explainer.explain(words)
+    proba = tfidf_logreg_pipeline.predict_proba([" ".join(words)])[0, 1]
+    base = 1.0 / (1.0 + math.exp(-explainer.intercept))
+    assert len(shares) == len(words)
+    assert math.isclose(sum(shares), proba - base, abs_tol=1e-12)
+    assert shares[1] > 0  # "хороший"
+
+
+def _fit(classifier, labels):
+    pipeline = Pipeline([("tfidf", TfidfVectorizer()), ("clf", classifier)])
+    texts = ["хорошо", "плохо", "нормально", "отлично", "ужасно", "так себе"]
+    return pipeline.fit(texts, labels)
+
+
+def test_from_pipeline_rejects_non_logistic_models():
+    assert TfidfLinearExplainer.from_pipeline(
+        _fit(LinearSVC(), [1, 0, 1, 1, 0, 0])) is None
+    assert TfidfLinearExplainer.from_pipeline(
+        _fit(LogisticRegression(), [0, 1, 2, 0, 1, 2])) is None
+    assert TfidfLinearExplainer.from_pipeline(np.zeros(3)) is None
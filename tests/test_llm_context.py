@@ -0,0 +1,115 @@
+import pytest
+
+from src.models.llm_context import ContextWindow
+
+
+class WordTokenizer:
+    """One token per word; counts the texts it tokenizes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def tokenize(self, text):
+        self.calls.append(text)
+        return text.split()
+
+    @staticmethod
+    def detokenize(tokens):
+        return " ".join(tokens)
+
+
+def make_window(**kwargs):
+    tokenizer = WordTokenizer()
+    window = ContextWindow(tokenizer.tokenize, tokenizer.detokenize, **kwargs)
+    return window, tokenizer
+
+
+def make_turns(n, words=10):
+    return [("user" if i % 2 == 0 else "assistant",
+             " ".join(f"t{i}w{j}" for j in range(words)))
+            for i in range(n)]
+
+
+def tokens(texts):
+    return sum(len(text.split()) for text in texts)
+
+
+def test_history_within_the_budget_is_kept_whole():
+    window, _ = make_window(history_budget_tokens=100)
+    turns = make_turns(10)
+    assert window.fit(turns) == [text for _, text in turns]
+
+
+@pytest.mark.parametrize("n_turns", [11, 20, 57, 200])
+def test_long_history_fits_the_budget(n_turns):
+    window, _ = make_window(history_budget_tokens=100)
+    turns = make_turns(n_turns)
+    history = window.fit(turns)
+
+    assert tokens(history) <= 100
+    # the newest turns are kept, in order
+    assert history == [text for _, text in turns[-len(history):]]
+    assert history[-2:] == [text for _, text in turns[-2:]]
+
+
+def test_latest_exchange_is_kept_over_the_budget():
+    window, _ = make_window(history_budget_tokens=15, keep_last_turns=2)
+    turns = make_turns(6)
+    assert window.fit(turns) == [text for _, text in turns[-2:]]
+
+
+def test_history_is_dropped_at_stable_user_boundaries():
+    window, _ = make_window(history_budget_tokens=100)
+    turns = make_turns(80)
+    starts = []
+    for n in range(1, len(turns) + 1):
+        history = window.fit(turns[:n])
+        start = n - len(history)
+        assert start == 0 or turns[start][0] == "user"
+        starts.append(start)
+
+    assert starts == sorted(starts)
+    # the start, and with it the prompt prefix, moves in steps
+    assert len(set(starts)) < len(starts) // 3
+
+
+def test_clip_bounds_a_huge_message():
+    window, _ = make_window(max_message_tokens=8)
+    huge = " ".join(f"w{i}" for i in range(10_000))
+    assert window.clip(huge) == "w0 w1 w2 w3 w4 w5 w6 w7…"
+    assert window.clip("короткое сообщение") == "короткое сообщение"
+
+
+def test_token_counts_are_cached_per_turn():
+    window, tokenizer = make_window(history_budget_tokens=100)
+    turns = make_turns(30)
+    window.fit(turns)
+    assert len(tokenizer.calls) == 30
+
+    window.fit(turns)
+    assert len(tokenizer.calls) == 30
+
+    new_turn = ("user", "новое сообщение")
+    window.fit(turns + [new_turn])
+    assert tokenizer.calls[30:] == [new_turn[1]]
+
+
+def test_system_prompt_and_latest_exchange_stay_in_the_prompt():
+    llm_cpu_handler = pytest.importorskip("src.models.llm_cpu_handler")
+    chatbot = object.__new__(llm_cpu_handler.LLMCPUChatbot)
+    chatbot.context_window, _ = make_window(history_budget_tokens=60,
+                                            max_message_tokens=20)
+    chat_history = [{"role": role, "content": text}
+                    for role, text in make_turns(40)]
+    system_prompt = "Отвечай коротко."
+
+    prompt = chatbot._format_prompt(" ".join(["слово"] * 500), "POSITIVE",
+                                    0.9, chat_history, system_prompt)
+
+    assert prompt.startswith(chatbot._format_system_prompt(system_prompt))
+    for entry in chat_history[-2:]:
+        assert chatbot._format_turn(entry["role"], entry["content"]) in prompt
+    assert chat_history[0]["content"] not in prompt
+    current = chatbot._format_turn("user", " ".join(["слово"] * 20) + "…",
+                                   "POSITIVE", 0.9)
+    assert prompt.endswith(current + "<|assistant|>\n")
@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("llama_cpp")
+
+from src.models.llm_prompt_cache import ConversationPromptCache
+
+SYSTEM = (1, 2, 3, 4)
+# "<|user|>\n[Sentiment: " - the same at the start of every first turn
+USER_HEADER = (20, 21, 22)
+
+
+class FakeState:
+    def __init__(self, name: str, size: int = 10) -> None:
+        self.name = name
+        self.llama_state_size = size
+
+
+def make_cache(**kwargs) -> ConversationPromptCache:
+    cache = ConversationPromptCache(**kwargs)
+    cache.pin(SYSTEM, FakeState("system"))
+    return cache
+
+
+def generate(cache: ConversationPromptCache, prompt: tuple,
+             reply: tuple, name: str, session=None) -> tuple:
+    """What LLMCPUChatbot and Llama do for one turn: name the session,
+    look the prompt up, then store the state of prompt + reply."""
+    cache.set_session(session if session is not None else name[0])
+    found = cache[prompt]
+    key = prompt + reply
+    cache[key] = FakeState(name)
+    return found, key
+
+
+def test_sessions_taking_turns_reuse_their_own_state():
+    cache = make_cache()
+    prompt_a1 = SYSTEM + USER_HEADER + (100, 101)
+    prompt_b1 = SYSTEM + USER_HEADER + (200, 201)
+
+    found, key_a1 = generate(cache, prompt_a1, (110, 111), "a1")
+    assert found.name == "system"
+    found, key_b1 = generate(cache, prompt_b1, (210, 211), "b1")
+    # any state sharing more than the system prompt may serve the lookup
+    assert found.name in ("system", "a1")
+
+    # B's first turn must not evict A's
+    assert cache[key_a1 + USER_HEADER + (102,)].name == "a1"
+    found, key_a2 = generate(cache, key_a1 + USER_HEADER + (102,),
+                             (112,), "a2")
+    assert found.name == "a1"
+    found, _ = generate(cache, key_b1 + USER_HEADER + (202,), (212,), "b2")
+    assert found.name == "b1"
+
+    # each conversation keeps only its latest state
+    assert sorted(state.name for _, state in cache._states.values()) \
+        == ["a2", "b2"]
+
+
+def test_state_looked_up_is_replaced_even_if_reply_was_retokenized():
+    cache = make_cache()
+    _, key_a1 = generate(cache, SYSTEM + USER_HEADER + (100,), (110, 111),
+                         "a1")
+    # the reply comes back in the next prompt tokenized differently
+    prompt_a2 = key_a1[:-1] + (119,) + USER_HEADER + (102,)
+    found, _ = generate(cache, prompt_a2, (112,), "a2")
+    assert found.name == "a1"
+    assert [state.name for _, state in cache._states.values()] == ["a2"]
+
+
+def test_without_session_only_prefix_states_are_replaced():
+    cache = make_cache()
+    cache.set_session(None)
+    key_a1 = SYSTEM + USER_HEADER + (100, 110)
+    key_b1 = SYSTEM + USER_HEADER + (200, 210)
+    cache[key_a1] = FakeState("a1")
+    cache[key_b1] = FakeState("b1")
+    cache[key_a1 + USER_HEADER + (102, 112)] = FakeState("a2")
+    assert sorted(state.name for _, state in cache._states.values()) \
+        == ["a2", "b1"]
+
+
+def test_least_recently_used_states_are_evicted_beyond_max_states():
+    cache = make_cache(max_states=2)
+    keys = []
+    for i in range(3):
+        _, key = generate(cache, SYSTEM + (100 + i,), (1,), f"s{i}",
+                          session=i)
+        keys.append(key)
+    assert [state.name for _, state in cache._states.values()] \
+        == ["s1", "s2"]
+    # a new conversation still starts from the pinned system prompt
+    assert cache[SYSTEM + (100,)].name == "system"
+
+
+def test_capacity_in_bytes_is_respected():
+    cache = make_cache(capacity_bytes=25)
+    for i in range(3):
+        generate(cache, SYSTEM + (100 + i,), (1,), f"s{i}", session=i)
+    assert cache.cache_size <= 25
+    assert [state.name for _, state in cache._states.values()] \
+        == ["s1", "s2"]
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from src.models.llm_scheduler import (GenerationScheduler, QueueFullError,
+                                      QueueTimeout)
+
+
+def occupy(scheduler):
+    """Submits a job that holds the worker until the returned event is
+    set, so the following jobs stay queued."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return ["busy"]
+
+    ticket = scheduler.submit("busy", job)
+    assert started.wait(5)
+    return ticket, release
+
+
+def recording(order, name, chunks=("x",)):
+    def job():
+        order.append(name)
+        return list(chunks)
+    return job
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = GenerationScheduler(max_per_session=3)
+    busy, release = occupy(scheduler)
+    order = []
+    tickets = [scheduler.submit(session, recording(order, name))
+               for session, name in [("a", "a1"), ("a", "a2"), ("a", "a3"),
+                                     ("b", "b1"), ("c", "c1"), ("b", "b2")]]
+    assert [ticket.position() for ticket in tickets] == [1, 4, 6, 2, 3, 5]
+
+    release.set()
+    assert list(busy.stream(poll_s=0.01)) == ["busy"]
+    for ticket in tickets:
+        assert list(ticket.stream(poll_s=0.01)) == ["x"]
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_admission_is_bounded_per_session_and_in_total():
+    scheduler = GenerationScheduler(max_queue=3, max_per_session=2)
+    _, release = occupy(scheduler)
+    try:
+        scheduler.submit("a", lambda: ["a1"])
+        scheduler.submit("a", lambda: ["a2"])
+        with pytest.raises(QueueFullError):
+            scheduler.submit("a", lambda: ["a3"])
+        scheduler.submit("b", lambda: ["b1"])
+        with pytest.raises(QueueFullError):
+            scheduler.submit("c", lambda: ["c1"])
+        assert scheduler.stats() == {"queued": 3, "sessions": 2,
+                                     "running": 1}
+    finally:
+        release.set()
+
+
+def test_jobs_never_overlap():
+    scheduler = GenerationScheduler(max_queue=64, max_per_session=64)
+    lock = threading.Lock()
+    running = []
+    overlaps = []
+
+    def job():
+        with lock:
+            running.append(1)
+            overlaps.append(len(running))
+        time.sleep(0.002)
+        with lock:
+            running.pop()
+        return ["done"]
+
+    tickets = [scheduler.submit(f"s{i % 4}", job) for i in range(20)]
+    for ticket in tickets:
+        assert list(ticket.stream(poll_s=0.01)) == ["done"]
+    assert len(overlaps) == 20 and max(overlaps) == 1
+
+
+def test_job_error_reaches_the_reader():
+    scheduler = GenerationScheduler()
+
+    def job():
+        yield "a"
+        raise RuntimeError("boom")
+
+    ticket = scheduler.submit("a", job)
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        for chunk in ticket.stream(poll_s=0.01):
+            received.append(chunk)
+    assert received == ["a"]
+
+
+def test_stream_is_cut_after_max_chunks():
+    scheduler = GenerationScheduler(max_chunks=3)
+    ticket = scheduler.submit("a", lambda: iter(range(10)))
+    assert list(ticket.stream(poll_s=0.01)) == [0, 1, 2]
+
+
+def test_abandoned_stream_frees_the_model():
+    scheduler = GenerationScheduler()
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                time.sleep(0.001)
+                yield "x"
+        finally:
+            closed.set()
+
+    stream = scheduler.submit("a", endless).stream(poll_s=0.01)
+    assert next(stream) == "x"
+    stream.close()
+    assert closed.wait(5)
+    assert list(scheduler.submit("b", lambda: ["b"]).stream(
+        poll_s=0.01)) == ["b"]
+
+
+def test_cancelled_ticket_is_not_run():
+    scheduler = GenerationScheduler()
+    busy, release = occupy(scheduler)
+    order = []
+    ticket = scheduler.submit("a", recording(order, "a"))
+    ticket.cancel()
+    assert ticket.position() == 0
+    release.set()
+    assert list(scheduler.submit("b", recording(order, "b")).stream(
+        poll_s=0.01)) == ["x"]
+    assert order == ["b"]
+
+
+def test_waiting_too_long_raises_queue_timeout():
+    scheduler = GenerationScheduler(max_wait_s=0.05)
+    _, release = occupy(scheduler)
+    positions = []
+    try:
+        ticket = scheduler.submit("a", lambda: ["late"])
+        with pytest.raises(QueueTimeout):
+            list(ticket.stream(on_position=positions.append, poll_s=0.01))
+    finally:
+        release.set()
+    assert positions == [1]
+    assert scheduler.stats()["queued"] == 0
@@ -0,0 +1,47 @@
+"""Golden outputs of LogRegPreprocessor.
+
+The expected texts were produced by the original rule-by-rule pipeline
+(one `re.sub` per rule); the single-pass engine must reproduce them
+exactly, one text at a time and in batches.
+"""
+import json
+import os
+
+import pytest
+
+from conftest import DATA_DIR, STOPWORDS_PATH
+from src.preprocessors.logreg_preprocessor import LogRegPreprocessor
+
+GOLDEN_PATH = os.path.join(DATA_DIR, "logreg_preprocessor_golden.jsonl")
+
+
+def load_golden():
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+GOLDEN = load_golden()
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    return LogRegPreprocessor(stopwords_path=STOPWORDS_PATH)
+
+
+@pytest.mark.parametrize("case", GOLDEN,
+                         ids=lambda case: repr(case["input"])[:40])
+def test_preprocess_matches_golden(preprocessor, case):
+    assert preprocessor.preprocess(case["input"]) == case["expected"]
+
+
+def test_preprocess_batch_matches_golden(preprocessor):
+    texts = [case["input"] for case in GOLDEN]
+    expected = [case["expected"] for case in GOLDEN]
+    assert preprocessor.preprocess_batch(texts) == expected
+
+
+def test_golden_corpus_covers_every_stage():
+    inputs = " ".join(case["input"] for case in GOLDEN)
+    for marker in ("http://", "www.", "@", "#", "rt", "(((", ":)", ":(",
+                   "0_0", "xd", "ахах", "ооо", "😀", "\n", "ё"):
+        assert marker in inputs.lower()
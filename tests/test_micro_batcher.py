@@ -0,0 +1,179 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from src.metrics import METRICS
+from src.models.micro_batcher import MicroBatcher
+
+
+class BlockingBatchFn:
+    """Records the batches; the first one waits for `release`, so the
+    requests submitted meanwhile queue up."""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        return [item * 10 for item in items]
+
+
+@pytest.fixture()
+def batch_fn():
+    batch_fn = BlockingBatchFn()
+    yield batch_fn
+    batch_fn.release.set()
+
+
+def test_lone_request_runs_at_once():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items],
+                           max_wait_ms=10_000)
+    try:
+        assert batcher(1, timeout=5) == 2
+    finally:
+        batcher.close()
+
+
+def test_batches_are_cut_at_max_batch_size(batch_fn):
+    batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_ms=1000)
+    try:
+        first = batcher.submit(0)
+        assert batch_fn.started.wait(5)
+        futures = [batcher.submit(i) for i in range(1, 8)]
+        batch_fn.release.set()
+
+        assert first.result(5) == 0
+        assert [future.result(5) for future in futures] == \
+            [i * 10 for i in range(1, 8)]
+        assert batch_fn.batches == [[0], [1, 2, 3], [4, 5, 6], [7]]
+    finally:
+        batcher.close()
+
+    stats = batcher.stats()
+    assert stats["batches_total"] == 4
+    assert stats["items_total"] == 8
+    assert stats["max_batch_size"] == 3
+    assert stats["batch_size_histogram"] == {1: 2, 3: 2}
+
+
+def test_batch_is_cut_when_the_wait_runs_out(batch_fn):
+    batcher = MicroBatcher(batch_fn, max_batch_size=100, max_wait_ms=20)
+    try:
+        batcher.submit(0)
+        assert batch_fn.started.wait(5)
+        futures = [batcher.submit(i) for i in (1, 2)]
+        batch_fn.release.set()
+        assert [future.result(5) for future in futures] == [10, 20]
+
+        # the batch of two waited 20 ms for a third request that never came
+        assert batch_fn.batches == [[0], [1, 2]]
+    finally:
+        batcher.close()
+
+
+def test_every_caller_gets_its_own_result():
+    batcher = MicroBatcher(lambda items: [item.upper() for item in items],
+                           max_wait_ms=5)
+    texts = [f"текст {i}" for i in range(50)]
+    results = {}
+
+    def call(text):
+        results[text] = batcher(text, timeout=5)
+
+    threads = [threading.Thread(target=call, args=(text,)) for text in texts]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        batcher.close()
+    assert results == {text: text.upper() for text in texts}
+
+
+def test_batch_error_reaches_every_caller_of_the_batch(batch_fn):
+    calls = []
+
+    def failing(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            return batch_fn(items)
+        raise ValueError("сбой модели")
+
+    batcher = MicroBatcher(failing, max_wait_ms=1000)
+    try:
+        batcher.submit(0)
+        assert batch_fn.started.wait(5)
+        futures = [batcher.submit(i) for i in (1, 2)]
+        batch_fn.release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="сбой модели"):
+                future.result(5)
+
+        # the worker keeps serving the next batches
+        batcher.batch_fn = lambda items: items
+        assert batcher(3, timeout=5) == 3
+    finally:
+        batcher.close()
+
+
+def test_cancelled_requests_are_skipped(batch_fn):
+    batcher = MicroBatcher(batch_fn, max_wait_ms=1000)
+    try:
+        batcher.submit(0)
+        assert batch_fn.started.wait(5)
+        cancelled = batcher.submit(1)
+        kept = batcher.submit(2)
+        assert cancelled.cancel()
+        batch_fn.release.set()
+
+        assert kept.result(5) == 20
+        with pytest.raises(CancelledError):
+            cancelled.result(5)
+        assert batch_fn.batches == [[0], [2]]
+    finally:
+        batcher.close()
+
+
+def test_closed_batcher_rejects_requests():
+    batcher = MicroBatcher(lambda items: items)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_queue_depth_and_batch_sizes_are_published(batch_fn, monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=1000,
+                           name="test-batcher")
+    try:
+        batcher.submit(0)
+        assert batch_fn.started.wait(5)
+        futures = [batcher.submit(i) for i in range(1, 6)]
+        rendered = METRICS.render()
+        assert 'micro_batch_queue_depth{batcher="test-batcher"} 5.0' \
+            in rendered
+
+        batch_fn.release.set()
+        for future in futures:
+            future.result(5)
+    finally:
+        batcher.close()
+        rendered = METRICS.render()
+        METRICS.reset()
+
+    assert "# TYPE micro_batch_size histogram" in rendered
+    assert "# TYPE micro_batch_queue_depth gauge" in rendered
+    assert 'micro_batch_size_count{batcher="test-batcher"} 3' in rendered
+    assert 'micro_batch_size_sum{batcher="test-batcher"} 6.0' in rendered
+    assert 'micro_batch_size_bucket{batcher="test-batcher",le="1"} 2' \
+        in rendered
+    assert 'micro_batch_size_bucket{batcher="test-batcher",le="4"} 3' \
+        in rendered
+    assert 'micro_batch_queue_depth{batcher="test-batcher"} 0.0' in rendered
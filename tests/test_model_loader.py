@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("google.genai")
+
+import src.config_and_settings as config_and_settings
+import src.model_loader as model_loader
+
+
+def gemini_config(use_fake_client):
+    return {"llm_chatbot": {
+        "use_model": "gemini_api",
+        "gemini_api_settings": {"model_name": "gemini-2.0-flash-lite",
+                                "temperature": 0.7,
+                                "max_output_tokens": 250,
+                                "use_fake_client": use_fake_client}}}
+
+
+def test_importing_settings_does_not_require_a_gemini_key():
+    # the key is only asked for when a Gemini chatbot is built
+    assert not hasattr(config_and_settings, "GEMINI_API_KEY")
+
+
+def test_missing_key_fails_only_the_gemini_chatbot(monkeypatch):
+    monkeypatch.setattr(model_loader, "get_gemini_key", lambda: None)
+    assert model_loader.build_llm_chatbot(gemini_config(False)) is None
+
+
+def test_fake_client_runs_without_a_key(monkeypatch):
+    monkeypatch.setattr(model_loader, "get_gemini_key", lambda: None)
+    chatbot = model_loader.build_llm_chatbot(gemini_config(True))
+    assert chatbot is not None and chatbot.is_ready
+
+
+def llm_cpu_config(model_url_repo):
+    return {"llm_chatbot": {
+        "use_model": "llm_cpu",
+        "llm_cpu_chatbot": {"model_local_dir": "/nonexistent/models",
+                            "model_url_repo": model_url_repo,
+                            "model_filename": "model.gguf"}}}
+
+
+@pytest.fixture
+def llm_cpu_handler(monkeypatch):
+    llm_cpu_handler = pytest.importorskip("src.models.llm_cpu_handler")
+    # loads run in a registry thread: no Streamlit calls there
+    monkeypatch.setattr(llm_cpu_handler, "st", None)
+    return llm_cpu_handler
+
+
+def test_missing_local_llm_reports_the_reason(llm_cpu_handler):
+    notes = []
+    assert model_loader.build_llm_chatbot(llm_cpu_config(""),
+                                          on_status=notes.append) is None
+    assert notes == ["модель не найдена и URL не предоставлен"]
+
+
+def test_failed_download_reports_progress_and_failure(llm_cpu_handler,
+                                                      monkeypatch):
+    def fail_download(self):
+        raise OSError("offline")
+
+    monkeypatch.setattr(llm_cpu_handler.LLMCPUChatbot, "_download_model",
+                        fail_download)
+    notes = []
+    assert model_loader.build_llm_chatbot(llm_cpu_config("org/repo"),
+                                          on_status=notes.append) is None
+    assert notes == ["загрузка с Hugging Face Hub (org/repo)",
+                     "загрузка модели с Hugging Face Hub не удалась"]
@@ -0,0 +1,48 @@
+import threading
+
+from src.model_registry import ModelRegistry
+
+
+def test_status_follows_the_load():
+    registry = ModelRegistry()
+    release = threading.Event()
+    registry.register("model", lambda: release.wait(5) and "loaded")
+    assert registry.status("model") == ModelRegistry.NOT_REQUESTED
+
+    registry.request("model")
+    assert registry.status("model") == ModelRegistry.LOADING
+    assert registry.get("model", timeout=0) is None
+    release.set()
+    assert registry.get("model", timeout=None) == "loaded"
+    assert registry.status("model") == ModelRegistry.READY
+
+
+def test_loader_returning_none_or_raising_fails_the_model():
+    def broken():
+        raise RuntimeError("boom")
+
+    registry = ModelRegistry()
+    registry.register("none", lambda: None)
+    registry.register("broken", broken)
+    assert registry.get("none", timeout=None) is None
+    assert registry.get("broken", timeout=None) is None
+    assert registry.status("none") == ModelRegistry.FAILED
+    assert registry.status("broken") == ModelRegistry.FAILED
+
+
+def test_loader_reports_its_progress_and_failure_reason():
+    registry = ModelRegistry()
+    seen = []
+
+    def loader():
+        registry.set_detail("llm", "загрузка с Hugging Face Hub (org/repo)")
+        seen.append(registry.detail("llm"))
+        registry.set_detail("llm", "загрузка модели не удалась")
+        return None
+
+    registry.register("llm", loader)
+    assert registry.detail("llm") == ""
+    registry.get("llm", timeout=None)
+    assert seen == ["загрузка с Hugging Face Hub (org/repo)"]
+    assert registry.status("llm") == ModelRegistry.FAILED
+    assert registry.detail("llm") == "загрузка модели не удалась"
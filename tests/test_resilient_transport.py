@@ -0,0 +1,212 @@
+import threading
+
+import pytest
+
+from src.models.resilient_transport import (CircuitBreaker, CircuitOpenError,
+                                            ResilientStreamer,
+                                            TransportTimeout, is_retryable)
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def chunks(*texts):
+    return lambda: iter(texts)
+
+
+def failing(error):
+    def open_stream():
+        raise error
+    return open_stream
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def make_streamer(breaker=None, **kwargs):
+    kwargs.setdefault("backoff_base_s", 0)
+    return ResilientStreamer(breaker=breaker, **kwargs)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (TimeoutError(), True),
+    (TransportTimeout(), True),
+    (ConnectionResetError(), True),
+    (HTTPError(503), True),
+    (HTTPError(429), True),
+    (HTTPError(400), False),
+    (ValueError(), False),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_breaker_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = half_open_breaker()
+    assert breaker.admit() == CircuitBreaker.HALF_OPEN
+    assert breaker.admit() is None
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.admit() == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_opens_the_circuit_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+    assert breaker.admit() == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_stream_retries_retryable_errors_before_the_first_chunk():
+    calls = []
+
+    def open_stream():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionResetError()
+        return iter(["a", "b"])
+
+    streamer = make_streamer(max_attempts=3)
+    assert list(streamer.stream(open_stream)) == ["a", "b"]
+    assert len(calls) == 3
+
+
+def test_stream_does_not_retry_a_client_error():
+    calls = []
+
+    def open_stream():
+        calls.append(1)
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        list(make_streamer(max_attempts=3).stream(open_stream))
+    assert len(calls) == 1
+
+
+def test_stream_cut_after_the_first_chunk_is_not_restarted():
+    calls = []
+
+    def open_stream():
+        calls.append(1)
+        yield "a"
+        raise ConnectionResetError()
+
+    received = []
+    with pytest.raises(ConnectionResetError):
+        for chunk in make_streamer(max_attempts=3).stream(open_stream):
+            received.append(chunk)
+    assert received == ["a"] and len(calls) == 1
+
+
+def test_first_chunk_timeout():
+    release = threading.Event()
+
+    def open_stream():
+        release.wait(5)
+        return iter(["late"])
+
+    streamer = make_streamer(first_chunk_timeout_s=0.05, max_attempts=1)
+    try:
+        with pytest.raises(TransportTimeout):
+            list(streamer.stream(open_stream))
+    finally:
+        release.set()
+
+
+def test_hedged_request_answers_when_the_first_is_slow():
+    release = threading.Event()
+    calls = []
+
+    def open_stream():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return iter(["slow"])
+        return iter(["fast"])
+
+    streamer = make_streamer(hedge_after_s=0.02, first_chunk_timeout_s=2)
+    try:
+        assert list(streamer.stream(open_stream)) == ["fast"]
+    finally:
+        release.set()
+
+
+def test_open_circuit_rejects_without_calling():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=60)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        list(make_streamer(breaker).stream(failing(AssertionError())))
+
+
+def test_retryable_failures_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=60)
+    streamer = make_streamer(breaker, max_attempts=1)
+    for _ in range(2):
+        with pytest.raises(ConnectionResetError):
+            list(streamer.stream(failing(ConnectionResetError())))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_successful_trial_closes_the_circuit():
+    breaker = half_open_breaker()
+    assert list(make_streamer(breaker).stream(chunks("a"))) == ["a"]
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_trial_with_a_client_error_frees_the_trial_slot():
+    breaker = half_open_breaker()
+    streamer = make_streamer(breaker)
+    with pytest.raises(HTTPError):
+        list(streamer.stream(failing(HTTPError(400))))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert list(streamer.stream(chunks("a"))) == ["a"]
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_abandoned_trial_stream_frees_the_trial_slot():
+    breaker = half_open_breaker()
+    streamer = make_streamer(breaker)
+    stream = streamer.stream(chunks("a", "b", "c"))
+    assert next(stream) == "a"
+    stream.close()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.admit() == CircuitBreaker.HALF_OPEN
+
+
+def test_abandoned_stream_of_a_closed_circuit_leaves_a_new_trial_alone():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0)
+    streamer = make_streamer(breaker)
+    stream = streamer.stream(chunks("a", "b"))
+    assert next(stream) == "a"
+
+    # meanwhile another request failed and a trial started
+    breaker.record_failure()
+    assert breaker.admit() == CircuitBreaker.HALF_OPEN
+    stream.close()
+    assert breaker.admit() is None
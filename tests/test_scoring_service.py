@@ -0,0 +1,168 @@
+import http.client
+import json
+import socket
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import STOPWORDS_PATH
+from src.metrics import METRICS
+from src.scoring_service import BadRequest, ScoringWorker, make_handler
+
+
+@pytest.fixture(scope="module")
+def worker(logreg_model_path):
+    app_config = {
+        "preprocessor": {"stopwords_path": STOPWORDS_PATH},
+        "sentiment_model": {"logreg_clf_path": logreg_model_path},
+    }
+    worker = ScoringWorker(app_config, ["logreg"], batch_max_wait_ms=1,
+                           max_texts_per_request=4, max_body_bytes=1024)
+    assert worker.registry.get("logreg", timeout=30) is not None
+    return worker
+
+
+@pytest.fixture(scope="module")
+def server(worker):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(worker))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, payload=None, body=None):
+    connection = http.client.HTTPConnection(*server.server_address,
+                                            timeout=10)
+    if body is None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    connection.request("POST", path, body=body)
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def raw_request(server, request: bytes) -> bytes:
+    with socket.create_connection(server.server_address, timeout=10) as sock:
+        sock.sendall(request)
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.mark.parametrize("request_, error", [
+    ([], "JSON-объект"),
+    ({"model": "bert", "texts": []}, "Неизвестная модель"),
+    ({"texts": "один текст"}, "списком строк"),
+    ({"texts": ["a", 1]}, "списком строк"),
+    ({"texts": ["a"] * 5}, "Не больше 4"),
+])
+def test_parse_request_rejects_malformed_requests(worker, request_, error):
+    with pytest.raises(BadRequest, match=error):
+        worker.parse_request(request_)
+
+
+def test_parse_request_defaults_to_the_first_model(worker):
+    assert worker.parse_request({"texts": ["a"]}) == ("logreg", ["a"])
+
+
+def test_score_matches_the_model(worker, logreg_classifier):
+    texts = ["отличный день", "ужасный сервис", ""]
+    assert worker.score("logreg", texts) == \
+        [logreg_classifier.predict(text) for text in texts]
+
+
+def test_score_and_explain_over_http(server, logreg_classifier):
+    status, response = post(server, "/score",
+                            {"texts": ["отличный день", "ужасно"]})
+    assert status == 200
+    assert response == {"model": "logreg",
+                        "scores": [logreg_classifier.predict("отличный день"),
+                                   logreg_classifier.predict("ужасно")]}
+
+    status, response = post(server, "/explain",
+                            {"model": "logreg", "texts": ["отличный день"]})
+    assert status == 200
+    assert response["attributions"] == [
+        [[token, value] for token, value
+         in logreg_classifier.explain_shap_text("отличный день")]]
+
+
+def test_readiness_and_unknown_paths(server):
+    connection = http.client.HTTPConnection(*server.server_address,
+                                            timeout=10)
+    connection.request("GET", "/readyz")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read()) == {"ready": True,
+                                           "models": {"logreg": "ready"}}
+    connection.close()
+
+    assert post(server, "/unknown", {"texts": []})[0] == 404
+
+
+def test_metrics_of_the_worker(server, monkeypatch):
+    connection = http.client.HTTPConnection(*server.server_address,
+                                            timeout=10)
+    connection.request("GET", "/metrics")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 404
+
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    try:
+        assert post(server, "/score", {"texts": ["отличный день"]})[0] == 200
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        body = response.read().decode("utf-8")
+    finally:
+        METRICS.reset()
+        connection.close()
+    assert response.status == 200
+    assert 'micro_batch_size_count{batcher="score-logreg"} 1' in body
+    assert 'micro_batch_queue_depth{batcher="score-logreg"}' in body
+
+
+def test_malformed_requests_get_400(server):
+    assert post(server, "/score", body=b"{not json")[0] == 400
+    assert post(server, "/score", {"texts": ["a"] * 5})[0] == 400
+
+
+@pytest.mark.parametrize("content_length", [b"abc", b"-5", b"1_0", b"1e3"])
+def test_malformed_content_length_gets_400(server, content_length):
+    response = raw_request(server,
+                           b"POST /score HTTP/1.1\r\nHost: test\r\n"
+                           b"Content-Length: " + content_length
+                           + b"\r\n\r\n{}")
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400")
+    assert b"Connection: close" in head
+    assert "Content-Length" in json.loads(body)["error"]
+
+
+def test_body_over_the_limit_gets_413(server):
+    status, response = post(server, "/score", {"texts": ["a" * 2000]})
+    assert status == 413
+    # the worker keeps serving requests within the limit
+    assert post(server, "/score", {"texts": ["a"]})[0] == 200
+
+
+def test_keep_alive_connection_serves_several_requests(server):
+    connection = http.client.HTTPConnection(*server.server_address,
+                                            timeout=10)
+    for text in ["отличный день", "ужасно", "хорошо"]:
+        connection.request("POST", "/score",
+                           body=json.dumps({"texts": [text]}))
+        response = connection.getresponse()
+        assert response.status == 200
+        response.read()
+    connection.close()
@@ -0,0 +1,48 @@
+from src.stream_renderer import StreamRenderer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_renderer(**kwargs):
+    frames = []
+    clock = FakeClock()
+    renderer = StreamRenderer(frames.append, clock=clock, **kwargs)
+    return renderer, frames, clock
+
+
+def test_chunks_are_coalesced_to_max_fps():
+    renderer, frames, clock = make_renderer(max_fps=10, flush_chars=1000)
+    for i in range(10):
+        clock.now = i * 0.03
+        renderer.append(str(i))
+    # the first chunk renders right away, then the first one 0.1 s later
+    assert frames == ["0▌", "01234▌", "012345678▌"]
+
+
+def test_pending_chars_force_a_render():
+    renderer, frames, clock = make_renderer(max_fps=1, flush_chars=5)
+    for chunk in ["ab", "cd", "ef", "gh"]:
+        renderer.append(chunk)
+    assert frames == ["ab▌", "abcdefgh▌"]
+
+
+def test_close_renders_pending_chunks_without_the_cursor():
+    renderer, frames, clock = make_renderer(max_fps=1, flush_chars=1000)
+    renderer.append("Hello")
+    renderer.append(", world")
+    assert frames == ["Hello▌"]
+    assert renderer.close() == "Hello, world"
+    assert frames[-1] == "Hello, world"
+    assert renderer.renders == 2
+
+
+def test_empty_reply_closes_to_an_empty_frame():
+    renderer, frames, _ = make_renderer()
+    assert renderer.close() == ""
+    assert frames == [""]